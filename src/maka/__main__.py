@@ -0,0 +1,338 @@
+'''
+Maka command line tool.
+
+The tool validates, reformats, converts, and summarizes Maka document files
+without a user interface, for example to check or convert an archive of field
+data files. Run it as `python -m maka`, with the `--help` option for usage.
+
+The tool imports no Qt modules, and defers importing document formats until it
+processes a file, so that it starts quickly. It reads caches of document files
+but does not write them, since it typically reads each file only once. Except
+for `validate`, which checks the text of document files, the commands read
+documents with the saved edits of their journals (see `DocumentJournal`).
+'''
+
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import maka.format.DocumentFileFormat as DocumentFileFormat
+
+
+_CONVERSION_FORMATS = ('text', 'json', 'csv')
+
+
+def _main(args=None):
+    
+    parser = _createArgumentParser()
+    args = parser.parse_args(args)
+    
+    if args.command == 'format' and not args.inPlace and args.outputDirPath is None:
+        parser.error('format requires either --in-place or --output-dir.')
+    
+    if args.jobs < 1:
+        parser.error('--jobs must be at least one.')
+    
+    results = _processFiles(args)
+    
+    ok = True
+    
+    for lines, fileOk, _ in results:
+        for line in lines:
+            print(line)
+        ok = ok and fileOk
+    
+    if args.command == 'summarize' and len(args.filePaths) > 1:
+        _printTotals(results)
+    
+    return 0 if ok else 1
+
+
+def _createArgumentParser():
+    
+    parser = argparse.ArgumentParser(
+        prog='python -m maka',
+        description='Validate, reformat, convert, and summarize Maka document files.')
+    
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1, metavar='N',
+        help='process up to N files in parallel (default 1)')
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+    
+    subparser = subparsers.add_parser(
+        'validate', help='report every line of each file that cannot be parsed')
+    _addFilePathsArgument(subparser)
+    
+    subparser = subparsers.add_parser(
+        'format', help='rewrite each file in the standard format of its document')
+    subparser.add_argument(
+        '-i', '--in-place', dest='inPlace', action='store_true',
+        help='rewrite files in place')
+    _addOutputDirArgument(subparser, required=False)
+    _addFilePathsArgument(subparser)
+    
+    subparser = subparsers.add_parser(
+        'convert',
+        help='convert each file to text, JSON, or CSV (one CSV file per observation type)')
+    subparser.add_argument(
+        '-t', '--to', dest='outputFormat', choices=_CONVERSION_FORMATS, required=True,
+        help='output format')
+    _addOutputDirArgument(subparser, required=True)
+    _addFilePathsArgument(subparser)
+    
+    subparser = subparsers.add_parser(
+        'summarize', help='count the observations of each file by type')
+    _addFilePathsArgument(subparser)
+    
+    return parser
+
+
+def _addOutputDirArgument(parser, required):
+    parser.add_argument(
+        '-o', '--output-dir', dest='outputDirPath', required=required, metavar='DIR',
+        help='directory to write output files to')
+
+
+def _addFilePathsArgument(parser):
+    parser.add_argument(
+        'filePaths', nargs='+', metavar='FILE', help='Maka document file')
+
+
+def _processFiles(args):
+    
+    if args.jobs == 1 or len(args.filePaths) == 1:
+        # Document formats may parse a large file in parallel themselves.
+        return [_processFile(args, filePath, None) for filePath in args.filePaths]
+    
+    else:
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        # We parse each file with a single process, since we are already
+        # processing files in parallel.
+        with ProcessPoolExecutor(args.jobs) as executor:
+            futures = [executor.submit(_processFile, args, filePath, 1)
+                       for filePath in args.filePaths]
+            return [future.result() for future in futures]
+
+
+def _processFile(args, filePath, numJobs):
+    
+    '''
+    Processes one file according to the command line arguments.
+    
+    :Returns:
+        a triple `(lines, ok, counts)`, where `lines` is a list of output lines,
+        `ok` is `True` if and only if the file was processed without problems,
+        and `counts` is a mapping from observation type names to observation
+        counts for the `summarize` command and `None` otherwise.
+    '''
+    
+    try:
+        return _COMMAND_FUNCTIONS[args.command](args, filePath, numJobs)
+    
+    except (OSError, ValueError, DocumentFileFormat.FileFormatError) as e:
+        
+        lineNum = getattr(e, 'lineNum', None)
+        location = filePath if lineNum is None else '{:s}:{:d}'.format(filePath, lineNum)
+        
+        return (['{:s}: error: {:s}'.format(location, str(e))], False, None)
+
+
+def _validate(args, filePath, numJobs):
+    
+    _, diagnostics = DocumentFileFormat.validateDocument(filePath, numJobs)
+    
+    lines = [_formatDiagnostic(filePath, d) for d in diagnostics]
+    
+    return (lines, len(diagnostics) == 0, None)
+
+
+def _formatDiagnostic(filePath, diagnostic):
+    
+    if diagnostic.column is None:
+        location = '{:s}:{:d}'.format(filePath, diagnostic.lineNum)
+    else:
+        location = '{:s}:{:d}:{:d}'.format(filePath, diagnostic.lineNum, diagnostic.column)
+    
+    return '{:s}: {:s}'.format(location, diagnostic.message)
+
+
+def _format(args, filePath, numJobs):
+    
+    document = DocumentFileFormat.readDocument(filePath, numJobs, writeCache=False)
+    
+    if args.inPlace:
+        outputFilePath = filePath
+    else:
+        outputFilePath = _getOutputFilePath(args, filePath, '')
+    
+    _writeTextFile(document, outputFilePath)
+    
+    return ([], True, None)
+
+
+def _getOutputFilePath(args, filePath, suffix):
+    
+    # We keep the extension of the input file for text output, and replace it
+    # for other output formats.
+    name = os.path.basename(filePath)
+    
+    if suffix != '':
+        name = os.path.splitext(name)[0] + suffix
+    
+    return os.path.join(args.outputDirPath, name)
+
+
+def _writeTextFile(document, filePath):
+    import maka.util.ExtensionManager as ExtensionManager
+    fileFormat = ExtensionManager.getExtensionInstance(
+        'DocumentFileFormat', 'Maka Document File Format')
+    fileFormat.writeDocument(document, filePath, document.documentFormat)
+
+
+def _convert(args, filePath, numJobs):
+    
+    document = DocumentFileFormat.readDocument(filePath, numJobs, writeCache=False)
+    
+    outputFormat = args.outputFormat
+    
+    if outputFormat == 'text':
+        _writeTextFile(document, _getOutputFilePath(args, filePath, ''))
+    
+    elif outputFormat == 'json':
+        _writeJsonFile(document, _getOutputFilePath(args, filePath, '.json'))
+    
+    else:
+        _writeCsvFiles(document, args, filePath)
+    
+    return ([], True, None)
+
+
+def _writeJsonFile(document, filePath):
+    
+    observations = [
+        {'type': obs.__class__.__name__,
+         'fields': dict(zip(_getFieldNames(obs.__class__),
+                            [_getJsonValue(v) for v in obs.fieldValues]))}
+        for obs in document.observations]
+    
+    data = {
+        'documentFormat': document.documentFormat.extensionName,
+        'observations': observations
+    }
+    
+    with open(filePath, 'w') as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+        file.write('\n')
+
+
+def _getFieldNames(obsClass):
+    from maka.data.Observation import FIELDS_ATTRIBUTE_NAME
+    return [field.name for field in getattr(obsClass, FIELDS_ATTRIBUTE_NAME)]
+
+
+def _getJsonValue(value):
+    
+    # Dates and times are the only field values that JSON cannot represent.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    else:
+        return value
+
+
+def _writeCsvFiles(document, args, filePath):
+    
+    observationsByClass = {}
+    for obs in document.observations:
+        observationsByClass.setdefault(obs.__class__, []).append(obs)
+    
+    for obsClass, observations in observationsByClass.items():
+        
+        suffix = '.{:s}.csv'.format(obsClass.__name__)
+        
+        with open(_getOutputFilePath(args, filePath, suffix), 'w', newline='') as file:
+            
+            writer = csv.writer(file)
+            writer.writerow(_getFieldNames(obsClass))
+            
+            for obs in observations:
+                writer.writerow([_getCsvValue(v) for v in obs.fieldValues])
+
+
+def _getCsvValue(value):
+    if value is None:
+        return ''
+    else:
+        return _getJsonValue(value)
+
+
+def _summarize(args, filePath, numJobs):
+    
+    document = DocumentFileFormat.readDocument(filePath, numJobs, writeCache=False)
+    
+    counts = _countObservations(document.observations)
+    
+    dates = [obs.date for obs in document.observations
+             if getattr(obs, 'date', None) is not None]
+    
+    lines = ['{:s}: {:d} observations{:s}'.format(
+        filePath, len(document.observations), _formatDateRange(dates))]
+    lines += _formatCounts(counts)
+    
+    return (lines, True, counts)
+
+
+def _countObservations(observations):
+    counts = {}
+    for obs in observations:
+        name = obs.__class__.__name__
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def _formatDateRange(dates):
+    
+    if len(dates) == 0:
+        return ''
+    
+    else:
+        return ' from {:s} to {:s}'.format(min(dates).isoformat(), max(dates).isoformat())
+
+
+def _formatCounts(counts):
+    return ['    {:s}: {:d}'.format(name, counts[name]) for name in sorted(counts)]
+
+
+def _printTotals(results):
+    
+    counts = {}
+    
+    for _, _, fileCounts in results:
+        if fileCounts is not None:
+            for name, count in fileCounts.items():
+                counts[name] = counts.get(name, 0) + count
+    
+    numObservations = sum(counts.values())
+    
+    print('Total: {:d} observations'.format(numObservations))
+    
+    for line in _formatCounts(counts):
+        print(line)
+
+
+_COMMAND_FUNCTIONS = {
+    'validate': _validate,
+    'format': _format,
+    'convert': _convert,
+    'summarize': _summarize
+}
+
+
+if __name__ == '__main__':
+    sys.exit(_main())
@@ -27,3 +27,28 @@ class CommandInterpreter(object):
         '''
         
         raise NotImplementedError()
+
+
+    def interpretCommandAsync(self, commandText):
+        
+        '''
+        Interprets the specified command text to create a new observation
+        asynchronously.
+        
+        The interpreter raises errors that it detects immediately, such as
+        command syntax errors, rather than reporting them through the returned
+        future.
+        
+        :Parameters:
+            commandText : `str`
+                the command text to be interpreted.
+                
+        :Returns:
+            a `concurrent.futures.Future` whose result is a new `Observation`
+            created from the command text.
+            
+        :Raises CommandInterpreterError:
+            if the command text is bad.
+        '''
+        
+        raise NotImplementedError()
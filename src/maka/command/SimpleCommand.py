@@ -1,4 +1,7 @@
+from concurrent.futures import Future
+
 from maka.command.CommandInterpreterError import CommandInterpreterError
+import maka.util.FutureUtils as FutureUtils
 
 
 class SimpleCommand(object):
@@ -43,6 +46,10 @@ class SimpleCommand(object):
     initialized so that when the command is executed the dictionaries
     are effectively consulted for default field values in accordance with
     the command class's method resolution order (MRO).
+    
+    A callable may also return a `concurrent.futures.Future` whose result
+    is the value or tuple of values, for example when the values are read
+    from a device. The command then returns a future observation.
     '''
     
     
@@ -107,8 +114,40 @@ class SimpleCommand(object):
     
                          
     def __call__(self, *args):
-        fieldValues = self._getFieldValues(args)
-        return self.observationClass(**fieldValues)
+        
+        '''
+        Executes this command with the specified arguments.
+        
+        :Returns:
+            a new observation, or a `concurrent.futures.Future` whose result is
+            a new observation if some default field values of this command are
+            obtained asynchronously.
+            
+        :Raises CommandInterpreterError:
+            if the arguments are bad. The exception of a future observation is
+            also a `CommandInterpreterError`.
+        '''
+        
+        fieldValues, pendingValues = self._getFieldValues(args)
+        
+        if len(pendingValues) == 0:
+            return self._createObservation(fieldValues)
+        
+        else:
+            # some field values not yet available
+            
+            future = FutureUtils.combineFutures(f for _, f in pendingValues)
+            
+            def createObservation(future):
+                for ((names, key), _), values in zip(pendingValues, future.result()):
+                    _setFieldValues(fieldValues, names, key, values)
+                return self._createObservation(fieldValues)
+                
+            return FutureUtils.transformFuture(future, createObservation)
+    
+    
+    def _createObservation(self, fieldValues):
+        return self.observationClass(**self._fieldValuesHook(fieldValues))
     
     
     def _checkNumArgs(self, args):
@@ -126,7 +165,20 @@ class SimpleCommand(object):
         
     def _getFieldValues(self, args):
         
+        '''
+        Gets the field values of an observation for the specified arguments.
+        
+        :Returns:
+            a pair `(fieldValues, pendingValues)`. `fieldValues` maps field names
+            to values. `pendingValues` is a list of `((names, key), future)`
+            pairs for field values that are not yet available, where `names`
+            are the names of the fields whose values are the results of `future`,
+            and `key` is either the tuple of field names of the corresponding
+            default value or `None` if `future`'s result is a single value.
+        '''
+        
         fieldValues = dict(self._parseArg(arg, i) for i, arg in enumerate(args))
+        pendingValues = []
         
         for key, value in self._defaultFieldValues.items():
             
@@ -142,10 +194,11 @@ class SimpleCommand(object):
                     # important for stateful callables such as serial number generators.
                     
                     values = value(self._interpreter) if callable(value) else value
-                        
-                    for i, name in enumerate(key):
-                        if name not in fieldValues:
-                            fieldValues[name] = values[i]
+                    
+                    if isinstance(values, Future):
+                        pendingValues.append(((names, key), values))
+                    else:
+                        _setFieldValues(fieldValues, names, key, values)
                             
             else:
                 # key is a single field name
@@ -153,10 +206,15 @@ class SimpleCommand(object):
                 if key not in fieldValues:
                     # named field does not yet have a value
                     
-                    fieldValues[key] = value(self._interpreter) if callable(value) else value
+                    value = value(self._interpreter) if callable(value) else value
+                    
+                    if isinstance(value, Future):
+                        pendingValues.append((([key], None), value))
+                    else:
+                        fieldValues[key] = value
                     
         # TODO: Combine callable value and field values hook mechanisms?
-        return self._fieldValuesHook(fieldValues)
+        return (fieldValues, pendingValues)
                 
                         
     def _parseArg(self, arg, i):
@@ -177,4 +235,17 @@ class SimpleCommand(object):
     
     def _fieldValuesHook(self, fieldValues):
         return fieldValues
+
+
+def _setFieldValues(fieldValues, names, key, values):
     
+    if key is None:
+        # single value
+        
+        fieldValues[names[0]] = values
+        
+    else:
+        # tuple of values for the fields named by `key`
+        
+        for name in names:
+            fieldValues[name] = values[key.index(name)]
@@ -1,9 +1,11 @@
 '''Module containing `CommandInterpreter` class.'''
 
 
+from concurrent.futures import Future
 import re
 
 from maka.command.CommandInterpreterError import CommandInterpreterError
+import maka.util.FutureUtils as FutureUtils
 import maka.util.TokenUtils as TokenUtils
 
 
@@ -44,8 +46,9 @@ class SimpleCommandInterpreter(object):
             a mapping from command names to commands.
             
             A command is a callable that accepts zero or more string arguments and
-            returns a new `Observation`. A command interpreter typically invokes a
-            command with arguments obtained by parsing command text.
+            returns either a new `Observation` or a `concurrent.futures.Future`
+            whose result is a new `Observation`. A command interpreter typically
+            invokes a command with arguments obtained by parsing command text.
         '''
         
         raise NotImplementedError()
@@ -64,6 +67,48 @@ class SimpleCommandInterpreter(object):
             a new `Observation` created from the command text.
         '''
         
+        result = self._executeCommand(command)
+        
+        if isinstance(result, Future):
+            # command completes asynchronously
+            
+            # We wait for the observation, since our caller expects it.
+            result = result.result()
+            
+        return result
+    
+    
+    def interpretCommandAsync(self, command):
+        
+        '''
+        Interprets the specified command text to create a new observation
+        asynchronously.
+        
+        Command syntax and argument errors are raised immediately. Errors
+        obtaining default field values asynchronously, for example reading
+        a theodolite, are reported through the returned future.
+        
+        :Parameters:
+            command : `str`
+                the command text to be interpreted.
+                
+        :Returns:
+            a `concurrent.futures.Future` whose result is a new `Observation`
+            created from the command text.
+            
+        :Raises CommandInterpreterError:
+            if the command text is bad.
+        '''
+        
+        result = self._executeCommand(command)
+        
+        if isinstance(result, Future):
+            return result
+        else:
+            return FutureUtils.createCompletedFuture(result)
+        
+        
+    def _executeCommand(self, command):
         callable, args = self._parseCommand(command)
         return callable(*args)
     
@@ -0,0 +1,61 @@
+'''
+Module containing function `swapAngles`.
+
+The function implements the Swap Angles edit operation without depending on
+Qt, so that it can be used and tested independently of the user interface.
+'''
+
+
+_ANGLE_OBSERVATION_CLASS_NAMES = frozenset(['TheoData', 'Fix'])
+'''names of the observation classes whose angles are swapped.'''
+
+
+def swapAngles(document):
+    
+    '''
+    Swaps the azimuths and declinations of a document's theodolite observations.
+    
+    The swap is performed by a single edit named "Swap Angles".
+    
+    :Parameters:
+        document : `Document`
+            the document whose angles to swap.
+    
+    :Returns:
+        the number of observations changed.
+    
+    :Raises ValueError:
+        if a swapped angle is out of range for its field.
+    '''
+    
+    obsClasses = getAngleObservationClasses(document)
+    return document.transformFields('Swap Angles', obsClasses, _swap)
+
+
+def getAngleObservationClasses(document):
+    
+    '''
+    Gets the classes of the observations of a document whose angles are swapped.
+    
+    The classes are those of the document class of the document's format. (The
+    documents that the application creates and reads are plain `Document`
+    instances, whose `observationClasses` is `None`.)
+    
+    :Returns:
+        a tuple of observation classes, empty if the document has no format.
+    '''
+    
+    documentFormat = document.documentFormat
+    
+    if documentFormat is None or documentFormat.documentClass is None:
+        obsClasses = document.observationClasses or ()
+    else:
+        obsClasses = documentFormat.documentClass.observationClasses or ()
+    
+    return tuple(sorted(
+        (c for c in obsClasses if c.__name__ in _ANGLE_OBSERVATION_CLASS_NAMES),
+        key=lambda c: c.__name__))
+
+
+def _swap(columns):
+    return {'azimuth': columns['declination'], 'declination': columns['azimuth']}
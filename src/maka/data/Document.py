@@ -1,4 +1,16 @@
+from collections import Counter, namedtuple
+from itertools import compress
+from operator import is_
+import pickle
+import sys
+
 from maka.data.EditHistory import Edit, EditHistory
+from maka.data.Observation import FIELDS_ATTRIBUTE_NAME
+import maka.data.FieldTransforms as FieldTransforms
+
+
+FieldChange = namedtuple('FieldChange', ('index', 'fieldName', 'oldValue', 'newValue'))
+'''a change to the value of one field of one document observation.'''
 
 
 class Document(object):
@@ -24,7 +36,9 @@ class Document(object):
         
         super(Document, self).__init__()
         
-        self.observations = [] if observations is None else observations
+        # The observations of a document are frozen so that edits and the edit
+        # history can share them rather than copying them.
+        self.observations = [] if observations is None else _freeze(observations)
         self.documentFormat = documentFormat
         self.fileFormat = fileFormat
         self.filePath = filePath
@@ -32,6 +46,22 @@ class Document(object):
         
         self._editHistory = EditHistory()
         self._editListeners = set()
+        self._fieldChangeListeners = set()
+        
+        # the transaction in progress, or `None` if there is none
+        self._transaction = None
+        
+        # Cache of formatted observations, aligned with `self.observations`. An
+        # item is `None` until its observation is first formatted. The cache
+        # is created when first needed, and belongs to the document format
+        # `self._formattedObservationsFormat`.
+        self._formattedObservations = None
+        self._formattedObservationsFormat = None
+        
+        
+    @property
+    def editHistory(self):
+        return self._editHistory
 
 
     def addEditListener(self, listener):
@@ -42,20 +72,234 @@ class Document(object):
         self._editListeners.remove(listener)
         
         
+    def addFieldChangeListener(self, listener):
+        
+        '''
+        Adds a listener for changes to the field values of this document's
+        observations.
+        
+        Document observations are frozen, so their field values change only
+        by edits that replace them. After an edit (including an undo or redo)
+        that replaces observations one for one with observations of the same
+        classes, the document calls each field change listener once with a
+        list of `FieldChange` tuples describing all of the field values that
+        the edit changed, in index and field order. This allows a listener to
+        update only what depends on the changed fields. Other edits, which
+        insert, delete, or change the classes of observations, are reported
+        only to edit listeners.
+        
+        The document compares the observations of an edit only if it has field
+        change listeners, so documents without them incur no cost.
+        
+        :Parameters:
+            listener : callable
+                a function that takes a list of `FieldChange` tuples.
+        '''
+        
+        self._fieldChangeListeners.add(listener)
+        
+        
+    def removeFieldChangeListener(self, listener):
+        self._fieldChangeListeners.remove(listener)
+        
+        
     def _notifyEditListeners(self, edit):
+        
         for listener in self._editListeners:
             listener(edit)
+            
+        if len(self._fieldChangeListeners) != 0:
+            
+            changes = _getFieldChanges(edit)
+            
+            if len(changes) != 0:
+                for listener in self._fieldChangeListeners:
+                    listener(changes)
 
 
-    def edit(self, name, startIndex, endIndex, observations):
+    def getFormattedObservations(self, startIndex, endIndex):
+        
+        '''
+        Gets formatted observations of this document.
+        
+        Formatted observations are cached, so an observation is formatted only
+        the first time it is requested. Edits invalidate the cache only for the
+        observations they replace.
         
-        edit = DocumentEdit(name, self, startIndex, endIndex, observations)
-        edit.do()
+        :Parameters:
+            startIndex : `int`
+                the index of the first observation to format.
+                
+            endIndex : `int`
+                one more than the index of the last observation to format.
+                
+        :Returns:
+            a list of the formatted observations.
+        '''
+        
+        lines = self._getFormattedObservationsCache()
+        result = lines[startIndex:endIndex]
+        
+        if None in result:
+            
+            formatObservation = self.documentFormat.formatObservation
+            observations = self.observations
+            
+            for i, line in enumerate(result):
+                if line is None:
+                    line = formatObservation(observations[startIndex + i])
+                    lines[startIndex + i] = line
+                    result[i] = line
+                    
+        return result
+    
+    
+    def getFormattedObservation(self, index):
+        return self.getFormattedObservations(index, index + 1)[0]
+    
     
+    def _getFormattedObservationsCache(self):
+        
+        lines = self._formattedObservations
+        
+        # We discard the cache if the document format has changed, or if the
+        # observation list has been modified other than by an edit.
+        if lines is None or self._formattedObservationsFormat is not self.documentFormat or \
+                len(lines) != len(self.observations):
+            
+            lines = [None] * len(self.observations)
+            self._formattedObservations = lines
+            self._formattedObservationsFormat = self.documentFormat
+            
+        return lines
+    
+    
+    def _replaceObservations(self, startIndex, endIndex, observations):
+        
+        lines = self._formattedObservations
+        
+        if lines is None:
+            self.observations[startIndex:endIndex] = observations
+            
+        else:
+            
+            oldObservations = self.observations[startIndex:endIndex]
+            self.observations[startIndex:endIndex] = observations
+            
+            # An edit may replace a range of observations with one that includes
+            # some of the same observations, for example when it changes only
+            # some of the observations of the range. We keep the formatted
+            # versions of those observations, which are frozen and so cannot
+            # have changed.
+            oldLines = dict(
+                (id(obs), line)
+                for obs, line in zip(oldObservations, lines[startIndex:endIndex])
+                if line is not None)
+            
+            lines[startIndex:endIndex] = [oldLines.get(id(obs)) for obs in observations]
+            
+            
+    def edit(self, name, startIndex, endIndex, observations):
+        
+        transaction = self._transaction
+        
+        if transaction is not None:
+            _checkEditIndices(startIndex, endIndex, len(self.observations))
+            transaction._edit(startIndex, endIndex, _freeze(tuple(observations)))
+            
+        else:
+            edit = DocumentEdit(name, self, startIndex, endIndex, observations)
+            edit.do()
+            self._recordEdit(edit)
+        
+        
+    def _recordEdit(self, edit):
         self._editHistory.append(edit)
         self._notifyEditListeners(edit)
         
         
+    def transaction(self, name):
+        
+        '''
+        Creates a context manager that groups edits of this document into one.
+        
+        Edits made with the `edit` method in a `with document.transaction(name):`
+        block are performed immediately, so that each sees the results of the
+        ones before it, but they are neither recorded nor reported individually.
+        When the block exits, the document records a single edit named `name`
+        that replaces the span of observations covering all of the edits,
+        which is undone and redone as a whole, and notifies its listeners of it
+        once. If the block raises an exception, its edits are rolled back and
+        the exception propagates. A transaction begun within another joins it.
+        
+        :Parameters:
+            name : `str`
+                the name of the recorded edit, for example `'Paste'`.
+                
+        :Returns:
+            the context manager.
+        '''
+        
+        return _Transaction(self, name)
+    
+    
+    def transformFields(self, name, obsClasses, transform, predicate=None):
+        
+        '''
+        Transforms field values of observations of this document with one edit.
+        
+        The observations are transformed by the `FieldTransforms` module's
+        `transformObservations` function, which is vectorized with NumPy if it
+        is available. For example::
+        
+            document.transformFields(
+                'Swap Angles', (Fix, TheoData),
+                lambda c: {'azimuth': c['declination'], 'declination': c['azimuth']})
+        
+        The edit spans the observations that the transform changed, and shares
+        the other observations of the span with the document.
+        
+        :Parameters:
+            name : `str`
+                the name of the edit.
+                
+            obsClasses : `Observation` class or tuple of `Observation` classes
+                the classes of the observations to transform.
+                
+            transform : callable
+                the transform, as for `transformObservations`.
+                
+            predicate : callable
+                the predicate, as for `transformObservations`, or `None`.
+                
+        :Returns:
+            the number of observations changed.
+            
+        :Raises ValueError:
+            if the transform fails, in which case the document is unchanged.
+            
+        :Raises TypeError:
+            if the transform yields a value of the wrong type for its field,
+            in which case the document is unchanged.
+        '''
+        
+        changes = FieldTransforms.transformObservations(
+            self.observations, obsClasses, transform, predicate)
+        
+        if len(changes) != 0:
+            
+            startIndex = changes[0][0]
+            endIndex = changes[-1][0] + 1
+            
+            observations = self.observations[startIndex:endIndex]
+            for i, obs in changes:
+                observations[i - startIndex] = obs
+                
+            self.edit(name, startIndex, endIndex, observations)
+            
+        return len(changes)
+    
+    
     @property
     def saved(self):
         return self._editHistory.documentSaved
@@ -76,31 +320,164 @@ class Document(object):
         
         
     def undo(self):
+        self._checkNoTransaction('undo')
         edit = self._editHistory.undo()
         self._notifyEditListeners(edit)
         return edit
         
         
     def redo(self):
+        self._checkNoTransaction('redo')
         edit = self._editHistory.redo()
         self._notifyEditListeners(edit)
         return edit
+    
+    
+    def _checkNoTransaction(self, operation):
+        if self._transaction is not None:
+            raise ValueError('Cannot {:s} edit during transaction.'.format(operation))
+
+
+class _Transaction(object):
+    
+    
+    '''
+    Context manager that groups the edits of a document into one.
+    
+    The transaction tracks the span of document observations changed by its
+    edits: the observations in the span before the transaction, starting at
+    `_startIndex` and ending at `_endIndex`, are `_oldObservations`, and the
+    span now comprises the `_numNewObservations` observations that start at
+    `_startIndex`. Observations before the span have the same indices as before
+    the transaction, and those after it have shifted uniformly.
+    '''
+    
+    
+    def __init__(self, document, name):
+        
+        super(_Transaction, self).__init__()
+        
+        self._document = document
+        self._name = name
+        self._outermost = False
+        
+        self._startIndex = None
+        self._endIndex = None
+        self._numNewObservations = 0
+        self._oldObservations = []
+        
+        
+    def __enter__(self):
+        
+        document = self._document
+        
+        if document._transaction is None:
+            document._transaction = self
+            self._outermost = True
+            
+        return self
+    
+    
+    def __exit__(self, excType, excValue, traceback):
+        
+        if not self._outermost:
+            # transaction joined another
+            return False
+        
+        document = self._document
+        document._transaction = None
+        
+        startIndex = self._startIndex
+        
+        if startIndex is None:
+            # no edits
+            return False
+        
+        endIndex = startIndex + self._numNewObservations
+        
+        if excType is not None:
+            # roll back
+            document._replaceObservations(startIndex, endIndex, self._oldObservations)
+            
+        else:
+            edit = DocumentEdit(
+                self._name, document, startIndex, self._endIndex,
+                document.observations[startIndex:endIndex], self._oldObservations)
+            document._recordEdit(edit)
+            
+        return False
+    
+    
+    def _edit(self, startIndex, endIndex, observations):
+        
+        document = self._document
+        currentObservations = document.observations
+        
+        if self._startIndex is None:
+            # first edit
+            self._startIndex = startIndex
+            self._endIndex = startIndex
+            
+        spanEndIndex = self._startIndex + self._numNewObservations
+        
+        # Extend the span to include the observations replaced by the edit.
+        if startIndex < self._startIndex:
+            self._oldObservations[0:0] = currentObservations[startIndex:self._startIndex]
+            self._startIndex = startIndex
+            
+        if endIndex > spanEndIndex:
+            self._oldObservations += currentObservations[spanEndIndex:endIndex]
+            self._endIndex += endIndex - spanEndIndex
+            spanEndIndex = endIndex
+            
+        document._replaceObservations(startIndex, endIndex, observations)
+        
+        self._numNewObservations = \
+            spanEndIndex - self._startIndex - (endIndex - startIndex) + len(observations)
+
+
+_MAX_COALESCED_OBSERVATIONS = 50
+'''the maximum number of single-observation insertions merged into one edit.'''
 
 
 class DocumentEdit(Edit):
     
     
-    def __init__(self, name, document, startIndex, endIndex, observations):
+    def __init__(
+            self, name, document, startIndex, endIndex, observations, oldObservations=None):
+        
+        '''
+        Initializes this edit.
+        
+        The `oldObservations` argument is for an edit that has already been
+        performed, for example by a transaction, whose replaced observations are
+        no longer in the document. Otherwise it is `None`, and the replaced
+        observations are those of the document from `startIndex` to `endIndex`.
+        '''
         
         super(DocumentEdit, self).__init__(name)
         
-        _checkEditIndices(startIndex, endIndex, len(document.observations))
+        if oldObservations is None:
+            _checkEditIndices(startIndex, endIndex, len(document.observations))
+            oldObservations = document.observations[startIndex:endIndex]
         
         self._document = document
         self._startIndex = startIndex
         self._endIndex = endIndex
-        self.oldObservations = _copy(document.observations, startIndex, endIndex)
-        self.newObservations = _copy(observations, 0, len(observations))
+        
+        # Document observations are frozen, so we can share rather than copy them.
+        # We freeze the new observations here so that neither the caller nor
+        # anybody else can modify them after the edit.
+        self._oldObservations = tuple(oldObservations)
+        self._newObservations = tuple(_freeze(observations))
+        self._numNewObservations = len(self._newObservations)
+        
+        self._size = None
+        self._coalesced = False
+        
+        # edit log and log key of spilled edit, or `None` if edit is not spilled
+        self._log = None
+        self._logKey = None
         
         
     @property
@@ -118,19 +495,170 @@ class DocumentEdit(Edit):
         return self._endIndex
     
     
+    @property
+    def oldObservations(self):
+        if self._log is None:
+            return self._oldObservations
+        else:
+            return self._readSpilledObservations()[0]
+        
+        
+    @property
+    def newObservations(self):
+        if self._log is None:
+            return self._newObservations
+        else:
+            return self._readSpilledObservations()[1]
+        
+        
     @property
     def inverse(self):
         name = self.name + ' Inverse'
         startIndex = self.startIndex
-        endIndex = startIndex + len(self.newObservations)
+        endIndex = startIndex + self._numNewObservations
         return DocumentEdit(name, self.document, startIndex, endIndex, self.oldObservations)
         
         
+    @property
+    def numNewObservations(self):
+        return self._numNewObservations
+        
+        
     def do(self):
-        self.document.observations[self.startIndex:self.endIndex] = \
-            _copy(self.newObservations, 0, len(self.newObservations))
+        self.document._replaceObservations(
+            self.startIndex, self.endIndex, self.newObservations)
+        
+        
+    @property
+    def size(self):
+        
+        if self._log is not None:
+            return 0
+        
+        if self._size is None:
+            # Since the observations are frozen, the size never changes.
+            self._size = _getSize(self._oldObservations) + \
+                _getSize(self._newObservations, self._oldObservations)
+            
+        return self._size
+    
+    
+    def merge(self, edit):
+        
+        '''
+        Merges this edit with the specified edit, which follows it.
+        
+        Only single-observation insertions are merged, into one insertion of all
+        of their observations. The insertions must be adjacent, so that they
+        could have been made by a single edit.
+        '''
+        
+        if not isinstance(edit, DocumentEdit) or edit.document is not self.document or \
+                self.spilled or edit.spilled:
+            return None
+        
+        if not (self._isSingleInsertion() or self._coalesced) or \
+                not edit._isSingleInsertion():
+            return None
+        
+        numObservations = self._numNewObservations
+        
+        if edit.startIndex != self.startIndex + numObservations or \
+                numObservations == _MAX_COALESCED_OBSERVATIONS:
+            return None
+        
+        observations = self._newObservations + edit._newObservations
+        name = 'Insert {:d} Observations'.format(len(observations))
+        
+        # Since both edits are insertions, the merged edit replaces no observations.
+        merged = DocumentEdit(name, self.document, self.startIndex, self.startIndex, observations)
+        merged._coalesced = True
+        
+        return merged
+    
+    
+    def _isSingleInsertion(self):
+        return self._startIndex == self._endIndex and self._numNewObservations == 1
+    
+    
+    @property
+    def spilled(self):
+        return self._log is not None
+    
+    
+    def discard(self):
+        if self._log is not None:
+            self._log.release(self._logKey)
+    
+    
+    def spill(self, log):
+        
+        '''
+        Writes the observations of this edit to an edit log.
+        
+        The classes and field values of the observations are pickled, so that
+        the observations read back from the log equal the original ones exactly.
+        Formatted text would not do, since formatting can round field values,
+        for example angles formatted as degrees, minutes, and seconds. An edit
+        cannot be spilled if the class or a field value of one of its
+        observations cannot be pickled.
+        '''
+        
+        if self._log is not None:
+            return True
+        
+        try:
+            data = pickle.dumps(
+                [[(obs.__class__, obs._values) for obs in observations]
+                 for observations in (self._oldObservations, self._newObservations)],
+                pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+        
+        self._logKey = log.write(data)
+        self._log = log
+        self._oldObservations = None
+        self._newObservations = None
+        self._size = None
+        
+        return True
+    
+    
+    def _readSpilledObservations(self):
+        pairs = pickle.loads(self._log.read(self._logKey))
+        return [tuple(cls.fromFieldValues(values) for cls, values in p) for p in pairs]
+        
+        
+def _getFieldChanges(edit):
+    
+    startIndex = edit.startIndex
+    
+    if edit.numNewObservations != edit.endIndex - startIndex:
+        # edit inserts or deletes observations
+        return []
+    
+    changes = []
+    
+    for i, (oldObs, newObs) in enumerate(zip(edit.oldObservations, edit.newObservations)):
+        
+        if newObs is oldObs:
+            continue
+        
+        cls = oldObs.__class__
+        
+        if newObs.__class__ is not cls:
+            # edit changes observation class
+            return []
         
+        names = [field.name for field in getattr(cls, FIELDS_ATTRIBUTE_NAME)]
         
+        for name, oldValue, newValue in zip(names, oldObs.fieldValues, newObs.fieldValues):
+            if newValue != oldValue:
+                changes.append(FieldChange(startIndex + i, name, oldValue, newValue))
+                
+    return changes
+
+
 def _checkEditIndices(startIndex, endIndex, maxIndex):
     
     _checkEditIndex(startIndex, maxIndex, 'start')
@@ -149,5 +677,62 @@ def _checkEditIndex(index, maxIndex, name):
         raise ValueError('Edit {:s} index must not exceed document length.'.format(name))
         
 
-def _copy(observations, startIndex, endIndex):
-    return tuple(observations[i].copy() for i in range(startIndex, endIndex))
+def _getSize(observations, countedObservations=()):
+    
+    # We estimate the size of the observations from the number of observations of
+    # each class and a per-class observation size, rather than by measuring every
+    # observation, since an edit can include hundreds of thousands of them. We
+    # skip observations that have already been counted, for example ones that an
+    # edit of a span of observations, only some of which it changes, shares with
+    # the observations it replaces. Such an edit keeps a shared observation at
+    # its position in the span, so we look for shared observations only there.
+    # We count with `Counter`, `map`, and `compress` rather than loops since
+    # they iterate in C.
+    size = sys.getsizeof(observations)
+    
+    classCounts = Counter(map(type, observations))
+    
+    if len(countedObservations) != 0:
+        shared = compress(observations, map(is_, observations, countedObservations))
+        classCounts.subtract(map(type, shared))
+            
+    for cls, count in classCounts.items():
+        if count > 0:
+            size += count * _getObservationSize(cls, observations)
+            
+    return size
+
+
+_observationSizes = {}
+'''mapping from observation classes to estimated observation sizes in bytes.'''
+
+
+def _getObservationSize(cls, observations):
+    
+    '''
+    Gets the estimated size of an observation of the specified class.
+    
+    The estimate is the size of the first observation of the class that we
+    encounter, including its field value tuple and field values. This
+    overestimates the size when field values are shared, for example interned
+    strings or small integers, and can misestimate it when field values vary
+    in size, but it is cheap.
+    '''
+    
+    size = _observationSizes.get(cls)
+    
+    if size is None:
+        
+        obs = next(obs for obs in observations if obs.__class__ is cls)
+        values = obs._values
+        size = sys.getsizeof(obs) + sys.getsizeof(values) + sum(map(sys.getsizeof, values))
+        
+        _observationSizes[cls] = size
+        
+    return size
+
+
+def _freeze(observations):
+    for obs in observations:
+        obs.freeze()
+    return observations
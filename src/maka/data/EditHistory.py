@@ -3,8 +3,8 @@ class Edit(object):
     
     def __init__(self, name):
         self._name = name
-        
-        
+    
+    
     @property
     def name(self):
         return self._name
@@ -19,17 +19,301 @@ class Edit(object):
         raise NotImplementedError()
     
     
-class EditHistory(object):
+    @property
+    def size(self):
+        
+        '''
+        the approximate number of bytes of memory held by this edit.
+        
+        An edit history uses edit sizes to enforce its memory budget. The default
+        size is zero.
+        '''
+        
+        return 0
+    
+    
+    def merge(self, edit):
+        
+        '''
+        Merges this edit with the specified edit, which follows it.
+        
+        :Parameters:
+            edit : `Edit`
+                the edit to merge with this one.
+        
+        :Returns:
+            an edit equivalent to this edit followed by the specified one, or `None`
+            if the edits cannot be merged. The default implementation returns `None`.
+        '''
+        
+        return None
+    
+    
+    @property
+    def spilled(self):
+        
+        '''`True` if and only if this edit has been spilled to an edit log.'''
+        
+        return False
+    
+    
+    def spill(self, log):
+        
+        '''
+        Moves the bulk of this edit's state to an edit log.
+        
+        A spilled edit must still be invertible and doable, but may read its state
+        back from the log to be so.
+        
+        :Parameters:
+            log : `EditLog`
+                the log to which to write this edit's state.
+        
+        :Returns:
+            `True` if this edit was spilled, or `False` if it could not be. The
+            default implementation returns `False`.
+        '''
+        
+        return False
+    
+    
+    def discard(self):
+        
+        '''
+        Notifies this edit that its edit history has discarded it.
+        
+        An edit that has been spilled should release its edit log records,
+        so that the log can reclaim their space. The default implementation
+        does nothing.
+        '''
+        
+        pass
+
+
+class EditLog(object):
+    
+    '''
+    Log of spilled edit state, stored in a temporary file.
+    
+    The file is created when the first record is written, and deleted when the log
+    is closed. Records are appended to the file. When the released records take up
+    more of the file than the records still in use, the log copies the records in
+    use to a new file, and when no records are in use it empties the file.
+    '''
     
     
     def __init__(self):
+        self._file = None
+        self._records = {}
+        self._nextKey = 0
+        self._fileSize = 0
+        self._recordsSize = 0
+    
+    
+    def write(self, data):
+        
+        '''
+        Appends a record to this log.
+        
+        :Parameters:
+            data : `bytes`
+                the record to append.
+        
+        :Returns:
+            a key with which to read the record.
+        '''
+        
+        if self._file is None:
+            
+            # We import `tempfile` here rather than at the top of this module
+            # since it takes a while to import and most edit logs are never written.
+            import tempfile
+            
+            self._file = tempfile.TemporaryFile()
+        
+        file = self._file
+        file.seek(self._fileSize)
+        file.write(data)
+        
+        key = self._nextKey
+        self._nextKey += 1
+        
+        self._records[key] = (self._fileSize, len(data))
+        self._fileSize += len(data)
+        self._recordsSize += len(data)
+        
+        return key
+    
+    
+    def read(self, key):
+        
+        '''
+        Reads a record from this log.
+        
+        :Parameters:
+            key : `object`
+                the key returned by the `write` method for the record.
+        
+        :Returns:
+            the record, `bytes`.
+        '''
+        
+        offset, length = self._records[key]
+        file = self._file
+        file.seek(offset)
+        return file.read(length)
+    
+    
+    def release(self, key):
+        
+        '''
+        Releases a record of this log, which can then no longer be read.
+        
+        :Parameters:
+            key : `object`
+                the key returned by the `write` method for the record.
+        '''
+        
+        _, length = self._records.pop(key)
+        self._recordsSize -= length
+        
+        if len(self._records) == 0:
+            self._file.seek(0)
+            self._file.truncate()
+            self._fileSize = 0
+            
+        elif self._fileSize - self._recordsSize > max(self._recordsSize, _MIN_COMPACTION_SIZE):
+            self._compact()
+    
+    
+    @property
+    def fileSize(self):
+        
+        '''the size in bytes of this log's file.'''
+        
+        return self._fileSize
+    
+    
+    def _compact(self):
+        
+        import tempfile
+        
+        oldFile = self._file
+        newFile = tempfile.TemporaryFile()
+        
+        records = {}
+        offset = 0
+        
+        for key, (oldOffset, length) in sorted(self._records.items(), key=lambda i: i[1][0]):
+            oldFile.seek(oldOffset)
+            newFile.write(oldFile.read(length))
+            records[key] = (offset, length)
+            offset += length
+            
+        oldFile.close()
+        
+        self._file = newFile
+        self._records = records
+        self._fileSize = offset
+    
+    
+    def close(self):
+        
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            
+        self._records = {}
+        self._fileSize = 0
+        self._recordsSize = 0
+
+
+_MIN_COMPACTION_SIZE = 1000000
+'''the minimum number of bytes of released records that an edit log compacts.'''
+
+
+class EditHistory(object):
+    
+    
+    '''
+    Undo/redo history of edits.
+    
+    By default, an edit history keeps every edit appended to it. The `configure`
+    method can bound the history by number of edits and by size, merge consecutive
+    edits, and spill older edits to an on-disk edit log.
+    '''
+    
+    
+    def __init__(self, **kwds):
+        self._maxNumEdits = None
+        self._maxSize = None
+        self._spill = False
+        self._coalesce = False
+        self._log = EditLog()
         self.clear()
+        self.configure(**kwds)
+    
+    
+    def configure(self, maxNumEdits=None, maxSize=None, spill=False, coalesce=False):
         
+        '''
+        Configures this edit history.
         
+        :Parameters:
+            maxNumEdits : `int` or `None`
+                the maximum number of edits to keep, or `None` for no maximum.
+                When there are more edits, the oldest ones are discarded.
+            
+            maxSize : `int` or `None`
+                the maximum total size in bytes of the edits held in memory, or
+                `None` for no maximum. When the edits are larger, the oldest ones
+                are spilled to the edit log if `spill` is `True`, and discarded
+                otherwise. The most recent edit is never discarded.
+            
+            spill : `bool`
+                `True` if edits should be spilled to the edit log rather than
+                discarded to stay within `maxSize`.
+            
+            coalesce : `bool`
+                `True` if each edit should be merged with the one before it when
+                possible (see `Edit.merge`).
+        
+        :Raises ValueError: if `maxNumEdits` is less than one or `maxSize` is negative.
+        '''
+        
+        if maxNumEdits is not None and maxNumEdits < 1:
+            raise ValueError('Maximum number of edits must be at least one.')
+        
+        if maxSize is not None and maxSize < 0:
+            raise ValueError('Maximum edit history size must be at least zero.')
+        
+        self._maxNumEdits = maxNumEdits
+        self._maxSize = maxSize
+        self._spill = spill
+        self._coalesce = coalesce
+        
+        self._enforceBudget()
+    
+    
     def clear(self):
         self._edits = []
         self._redoIndex = 0
         self._savedIndex = 0
+        self._size = 0
+        self._log.close()
+    
+    
+    @property
+    def numEdits(self):
+        return len(self._edits)
+    
+    
+    @property
+    def size(self):
+        
+        '''the approximate total size in bytes of the edits held in memory.'''
+        
+        return self._size
     
     
     @property
@@ -39,17 +323,110 @@ class EditHistory(object):
     
     def markDocumentSaved(self):
         self._savedIndex = self._redoIndex
-        
-        
+    
+    
     def append(self, edit):
         
         if self._redoIndex != len(self._edits):
+            self._size -= sum(e.size for e in self._edits[self._redoIndex:])
+            _discard(self._edits[self._redoIndex:])
             del self._edits[self._redoIndex:]
             if self._savedIndex is not None and self._savedIndex > len(self._edits):
                 self._savedIndex = None
+        
+        if not self._merge(edit):
+            self._edits.append(edit)
+            self._size += edit.size
+            self._redoIndex = len(self._edits)
+        
+        self._enforceBudget()
+    
+    
+    def _merge(self, edit):
+        
+        # We do not merge with an edit that was followed by a save, since the
+        # merged edit would take the saved state of the document with it.
+        if not self._coalesce or len(self._edits) == 0 or \
+                self._savedIndex == self._redoIndex:
+            return False
+        
+        lastEdit = self._edits[-1]
+        
+        if lastEdit.spilled:
+            return False
+        
+        mergedEdit = lastEdit.merge(edit)
+        
+        if mergedEdit is None:
+            return False
+        
+        self._edits[-1] = mergedEdit
+        self._size += mergedEdit.size - lastEdit.size
+        
+        return True
+    
+    
+    def _enforceBudget(self):
+        
+        maxNumEdits = self._maxNumEdits
+        if maxNumEdits is not None and len(self._edits) > maxNumEdits:
+            self._discardEdits(len(self._edits) - maxNumEdits)
+        
+        maxSize = self._maxSize
+        if maxSize is not None and self._size > maxSize:
+            if self._spill:
+                self._spillEdits(maxSize)
+            else:
+                self._discardEditsForSize(maxSize)
+    
+    
+    def _discardEdits(self, numEdits):
+        
+        # We discard only edits that can be undone, since the edits that can be
+        # redone depend on them.
+        numEdits = min(numEdits, self._redoIndex)
+        
+        self._size -= sum(e.size for e in self._edits[:numEdits])
+        _discard(self._edits[:numEdits])
+        del self._edits[:numEdits]
+        
+        self._redoIndex -= numEdits
+        
+        if self._savedIndex is not None:
+            self._savedIndex -= numEdits
+            if self._savedIndex < 0:
+                # saved state is no longer reachable by undoing
+                self._savedIndex = None
+    
+    
+    def _discardEditsForSize(self, maxSize):
+        
+        # We never discard the most recent edit, so that it can always be undone.
+        numEdits = 0
+        size = self._size
+        
+        for edit in self._edits[:self._redoIndex - 1]:
+            if size <= maxSize:
+                break
+            size -= edit.size
+            numEdits += 1
+        
+        self._discardEdits(numEdits)
+    
+    
+    def _spillEdits(self, maxSize):
+        
+        # We never spill the most recent edit, so that undoing it never requires
+        # reading the edit log.
+        for edit in self._edits[:-1]:
+            
+            if self._size <= maxSize:
+                break
             
-        self._edits.append(edit)
-        self._redoIndex = len(self._edits)
+            if not edit.spilled:
+                size = edit.size
+                if edit.spill(self._log):
+                    self._size += edit.size - size
     
     
     @property
@@ -59,7 +436,7 @@ class EditHistory(object):
             return None
         else:
             return self._edits[index].name
-        
+    
     
     @property
     def redoName(self):
@@ -67,23 +444,23 @@ class EditHistory(object):
             return self._edits[self._redoIndex].name
         except IndexError:
             return None
-        
-        
+    
+    
     def undo(self):
         
-        try:
-            edit = self._edits[self._redoIndex - 1]
-        except IndexError:
+        if self._redoIndex == 0:
             raise IndexError('No edits to undo.')
         
+        edit = self._edits[self._redoIndex - 1]
+        
         inverse = edit.inverse
         inverse.do()
         
         self._redoIndex -= 1
         
         return inverse
-        
-        
+    
+    
     def redo(self):
         
         try:
@@ -96,3 +473,8 @@ class EditHistory(object):
         self._redoIndex += 1
         
         return edit
+
+
+def _discard(edits):
+    for edit in edits:
+        edit.discard()
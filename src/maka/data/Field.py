@@ -7,9 +7,6 @@ import datetime
 import re
 
 
-_FIELD_VALUE_NAME_PREFIX = '_'
-
-
 class Field(object):
     
     '''
@@ -60,6 +57,10 @@ class Field(object):
         # specified as a class attribute of the owning observation type.
         self._name = kwds.get('name', None)
         
+        # The index of this field's value in the value lists of observations of the
+        # owning observation type. This is set when the type is created.
+        self._index = None
+        
         self._typeName = kwds.get('typeName', self.TYPE_NAME)
         self._units = kwds.get('units', self.UNITS)
         self._range = kwds.get('range', self.RANGE)
@@ -77,7 +78,10 @@ class Field(object):
     
     def _setName(self, name):
         self._name = name
-        self._valueName = _FIELD_VALUE_NAME_PREFIX + name
+        
+        
+    def _setIndex(self, index):
+        self._index = index
         
         
     @property
@@ -107,7 +111,7 @@ class Field(object):
     
     
     def __get__(self, obs, obs_class):
-        return getattr(obs, self._valueName) if obs is not None else self
+        return obs._values[self._index] if obs is not None else self
     
     
     def __set__(self, obs, value):
@@ -116,13 +120,18 @@ class Field(object):
         Set the value of this field on the specified observation with notification.
         
         The value is set if and only if the new value differs from the old one.
+        
+        :Raises AttributeError: if the observation is frozen.
         '''
         
-        oldValue = getattr(obs, self._valueName)
+        _checkNotFrozen(obs, self)
+        
+        oldValue = obs._values[self._index]
         
         if value != oldValue:
             self._setValue(obs, value)
-            obs.notifyFieldValueChanged(self.name, oldValue, value)
+            if obs._listeners is not None:
+                obs.notifyFieldValueChanged(self.name, oldValue, value)
         
         
     def _setValue(self, obs, value):
@@ -136,7 +145,7 @@ class Field(object):
         
         if value is not None:
             self._check(value)
-        setattr(obs, self._valueName, value)
+        obs._values[self._index] = value
         
         
     def _check(self, value):
@@ -283,16 +292,21 @@ class String(Field):
         
         The value is translated if translations have been specified for this field, and
         the value is set if and only if the new value differs from the old one.
+        
+        :Raises AttributeError: if the observation is frozen.
         '''
         
+        _checkNotFrozen(obs, self)
+        
         if self._translations is not None:
             value = self._translations.get(value, value)
             
-        oldValue = getattr(obs, self._valueName)
+        oldValue = obs._values[self._index]
         
         if value != oldValue:
             self._setValue(obs, value, False)
-            obs.notifyFieldValueChanged(self.name, oldValue, value)
+            if obs._listeners is not None:
+                obs.notifyFieldValueChanged(self.name, oldValue, value)
         
 
     def _setValue(self, obs, value, translate=True):
@@ -313,7 +327,7 @@ class String(Field):
         if value is not None:
             self._check(value)
             
-        setattr(obs, self._valueName, value)
+        obs._values[self._index] = value
         
         
 class Integer(Field):
@@ -427,7 +441,7 @@ class Float(Field):
     def _setValue(self, obs, value):
         if value is not None:
             self._check(value)
-        setattr(obs, self._valueName, _float(value))
+        obs._values[self._index] = _float(value)
         
         
     def _rangeCheck(self, value):
@@ -542,7 +556,7 @@ class Decimal(Field):
     def _setValue(self, obs, value):
         if value is not None:
             self._check(value)
-        setattr(obs, self._valueName, value)
+        obs._values[self._index] = value
         
         
     def _typeCheck(self, value):
@@ -598,6 +612,16 @@ class Time(Field):
     _valueClasses = (datetime.time,)
 
 
+def _checkNotFrozen(obs, field):
+    
+    # A frozen observation stores its field values in a tuple rather than a list.
+    # See `Observation.freeze`.
+    if obs._values.__class__ is tuple:
+        raise AttributeError(
+            'Cannot set field "{:s}" of frozen {:s} observation.'.format(
+                field.name, obs.__class__.__name__))
+        
+        
 def _createRangeString(min, minInclusive, max, maxInclusive, formatter):
     
     if min is None and max is None:
@@ -0,0 +1,450 @@
+'''
+Module containing function `transformObservations`.
+
+The function applies a field transform to many observations at once, for
+example to offset or swap the angles of all of the fixes of a document. If
+NumPy is available, the transform operates on NumPy arrays of field values, so
+that transforms written as arithmetic expressions are vectorized. Otherwise the
+transform operates on the field values of one observation at a time. NumPy is
+an optional dependency of Maka.
+'''
+
+
+from collections.abc import Mapping
+from contextlib import contextmanager
+from itertools import compress, count, repeat
+from operator import attrgetter, is_, itemgetter, ne
+import gc
+
+from maka.data.Field import Field, Float, Integer
+from maka.data.Observation import FIELDS_ATTRIBUTE_NAME
+
+
+_NAN = float('nan')
+
+
+def transformObservations(observations, obsClasses, transform, predicate=None):
+    
+    '''
+    Transforms field values of observations.
+    
+    Both the transform and the predicate take a mapping from field names to
+    field values. Numeric (i.e. integer and float) field values are floats,
+    with missing values represented by NaN rather than `None`. If NumPy is
+    available, the values of a field are a NumPy array with one element per
+    observation, and the transform and predicate are called once. Otherwise
+    the values of a field are a single value, and the transform and predicate
+    are called once per observation. A transform or predicate that uses only
+    arithmetic and comparison operators works either way. Field values are
+    extracted only for fields that the transform or predicate looks up.
+    
+    Transformed values are checked like values assigned to observation fields.
+    NaN values become `None`, and integral values of integer fields become
+    integers.
+    
+    :Parameters:
+        observations : sequence of `Observation`
+            the observations to transform.
+        
+        obsClasses : `Observation` class or tuple of `Observation` classes
+            the classes of the observations to transform. Observations that are
+            not instances of any of the classes are not transformed.
+        
+        transform : callable
+            a function that takes a field value mapping and returns a mapping
+            from the names of the fields to transform to their new values. A
+            new value can be a single value for all observations.
+        
+        predicate : callable
+            a function that takes a field value mapping and returns `True` for
+            observations to transform and `False` for others, or `None` to
+            transform all observations of the specified classes.
+    
+    :Returns:
+        a list of `(index, observation)` pairs for the observations whose field
+        values the transform changed, in index order. The new observations are
+        frozen.
+    
+    :Raises ValueError:
+        if the class of a selected observation lacks a looked-up field, or if a
+        transformed value is out of range for its field.
+        
+    :Raises TypeError:
+        if a transformed value is of the wrong type for its field.
+    '''
+    
+    # We import NumPy here rather than at the top of this module since it takes
+    # a while to import and most Maka sessions never transform fields.
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    
+    return _transformObservations(observations, obsClasses, transform, predicate, numpy)
+
+
+@contextmanager
+def _garbageCollectionPaused():
+    
+    # A transform can create an observation for every observation of a document.
+    # None of them is garbage, but creating so many objects would trigger full
+    # garbage collections, each of which visits every object of the process.
+    # Those collections can take more time than the transform itself.
+    
+    enabled = gc.isenabled()
+    gc.disable()
+    
+    try:
+        yield
+        
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _transformObservations(observations, obsClasses, transform, predicate, numpy):
+    with _garbageCollectionPaused():
+        return _transformObservationsAux(observations, obsClasses, transform, predicate, numpy)
+
+
+def _transformObservationsAux(observations, obsClasses, transform, predicate, numpy):
+    
+    if isinstance(obsClasses, list):
+        obsClasses = tuple(obsClasses)
+    
+    groups = _getClassGroups(observations, obsClasses)
+    
+    if numpy is None:
+        groups, columns = _transformRows(groups, transform, predicate)
+    else:
+        groups, columns = _transformColumns(groups, transform, predicate, numpy)
+    
+    if len(columns) == 0:
+        return []
+    
+    changes = []
+    start = 0
+    
+    for group in groups:
+        end = start + len(group.values)
+        changes += _transformGroup(group, [column[start:end] for column in columns.values()],
+                                   list(columns.keys()), numpy)
+        start = end
+    
+    # The groups are in class order, so we sort the changes into index order.
+    changes.sort(key=itemgetter(0))
+    
+    return changes
+
+
+class _ClassGroup(object):
+    
+    '''
+    Selected observations of one class.
+    
+    We transform the observations of each class separately, since observations
+    of different classes can have different fields with the same name, and
+    handle the field values of the observations of a class as a list of
+    tuples rather than as observations.
+    '''
+    
+    
+    def __init__(self, cls, indices, values):
+        self.cls = cls
+        self.indices = indices
+        self.values = values
+    
+    
+    def select(self, mask):
+        return _ClassGroup(
+            self.cls, list(compress(self.indices, mask)), list(compress(self.values, mask)))
+
+
+def _getClassGroups(observations, obsClasses):
+    
+    # We use `map` and `compress` rather than Python loops wherever we can,
+    # since they visit every observation of the document.
+    
+    indices = list(compress(count(), map(isinstance, observations, repeat(obsClasses))))
+    selected = list(map(observations.__getitem__, indices))
+    classes = list(map(attrgetter('__class__'), selected))
+    
+    groups = []
+    
+    for cls in sorted(set(classes), key=attrgetter('__name__')):
+        
+        if len(groups) == 0 and classes.count(cls) == len(classes):
+            # all selected observations are of one class
+            groupIndices = indices
+            groupObservations = selected
+            
+        else:
+            mask = list(map(is_, classes, repeat(cls)))
+            groupIndices = list(compress(indices, mask))
+            groupObservations = list(compress(selected, mask))
+            
+        # The field values of an observation that is not frozen are a list.
+        values = list(map(tuple, map(attrgetter('_values'), groupObservations)))
+        
+        groups.append(_ClassGroup(cls, groupIndices, values))
+        
+    return groups
+
+
+def _transformGroup(group, newColumns, names, numpy):
+    
+    cls = group.cls
+    values = group.values
+    fields = [_getField(cls, name) for name in names]
+    
+    if len(values) == 0:
+        return []
+    
+    # We replace the transformed columns of the transposed field values rather
+    # than field values of the observations one at a time, and then find the
+    # observations whose field values changed by comparing value tuples.
+    
+    valueColumns = list(zip(*values))
+    
+    for field, column in zip(fields, newColumns):
+        valueColumns[field._index] = _checkValues(field, column, numpy)
+        
+    newValues = list(zip(*valueColumns))
+    changed = list(map(ne, newValues, values))
+    
+    return zip(compress(group.indices, changed),
+               map(cls.fromFieldValues, compress(newValues, changed)))
+
+
+def _transformColumns(groups, transform, predicate, numpy):
+    
+    columns = _Columns(groups, numpy)
+    
+    if predicate is not None:
+        
+        size = sum(len(group.values) for group in groups)
+        mask = _broadcast(predicate(columns), size, numpy).astype(bool)
+        
+        selectedGroups = []
+        start = 0
+        
+        for group in groups:
+            end = start + len(group.values)
+            selectedGroups.append(group.select(mask[start:end].tolist()))
+            start = end
+            
+        groups = selectedGroups
+        columns = columns._select(groups, mask)
+    
+    size = sum(len(group.values) for group in groups)
+    
+    newColumns = dict(
+        (name, _broadcast(column, size, numpy))
+        for name, column in transform(columns).items())
+    
+    return (groups, newColumns)
+
+
+def _broadcast(values, size, numpy):
+    return numpy.broadcast_to(numpy.asarray(values), (size,))
+
+
+def _transformRows(groups, transform, predicate):
+    
+    selectedGroups = []
+    rows = []
+    
+    for group in groups:
+        
+        mask = []
+        
+        for values in group.values:
+            
+            row = _Row(group.cls, values)
+            selected = predicate is None or predicate(row)
+            
+            if selected:
+                rows.append(transform(row))
+                
+            mask.append(selected)
+            
+        selectedGroups.append(group.select(mask))
+    
+    names = rows[0].keys() if len(rows) != 0 else ()
+    columns = dict((name, [row[name] for row in rows]) for name in names)
+    
+    return (selectedGroups, columns)
+
+
+class _Columns(Mapping):
+    
+    '''Mapping from field names to NumPy arrays of field values, extracted as needed.'''
+    
+    
+    def __init__(self, groups, numpy):
+        self._groups = groups
+        self._numpy = numpy
+        self._columns = {}
+    
+    
+    def __getitem__(self, name):
+        
+        column = self._columns.get(name)
+        
+        if column is None:
+            column = self._extractColumn(name)
+            self._columns[name] = column
+        
+        return column
+    
+    
+    def _extractColumn(self, name):
+        
+        fields = [_getField(group.cls, name) for group in self._groups]
+        
+        values = []
+        for field, group in zip(fields, self._groups):
+            values += map(itemgetter(field._index), group.values)
+        
+        if all(_isNumeric(field) for field in fields):
+            # NumPy converts `None` to NaN in a float array.
+            return self._numpy.array(values, dtype=float)
+        
+        else:
+            column = self._numpy.empty(len(values), dtype=object)
+            column[:] = values
+            return column
+    
+    
+    def __iter__(self):
+        return iter(_getFieldNames(group.cls for group in self._groups))
+    
+    
+    def __len__(self):
+        return len(_getFieldNames(group.cls for group in self._groups))
+    
+    
+    def _select(self, groups, mask):
+        columns = _Columns(groups, self._numpy)
+        columns._columns = dict((name, column[mask]) for name, column in self._columns.items())
+        return columns
+
+
+class _Row(Mapping):
+    
+    '''Mapping from field names to the field values of one observation.'''
+    
+    
+    def __init__(self, cls, values):
+        self._cls = cls
+        self._values = values
+    
+    
+    def __getitem__(self, name):
+        
+        field = _getField(self._cls, name)
+        value = self._values[field._index]
+        
+        if _isNumeric(field):
+            return _NAN if value is None else float(value)
+        else:
+            return value
+    
+    
+    def __iter__(self):
+        return iter(_getFieldNames([self._cls]))
+    
+    
+    def __len__(self):
+        return len(_getFieldNames([self._cls]))
+
+
+def _getField(cls, name):
+    
+    field = getattr(cls, name, None)
+    
+    if not isinstance(field, Field):
+        raise ValueError(
+            'Observation class "{:s}" has no field "{:s}".'.format(cls.__name__, name))
+    
+    return field
+
+
+def _isNumeric(field):
+    return isinstance(field, (Float, Integer))
+
+
+def _getFieldNames(classes):
+    return sorted(set(f.name for cls in classes for f in getattr(cls, FIELDS_ATTRIBUTE_NAME)))
+
+
+def _checkValues(field, values, numpy):
+    
+    '''
+    Checks new values of a field.
+    
+    :Returns:
+        a list of the values, converted to field values.
+    
+    :Raises ValueError:
+        if a value is out of range for the field.
+        
+    :Raises TypeError:
+        if a value is of the wrong type for the field.
+    '''
+    
+    if numpy is not None:
+        
+        if values.dtype.kind == 'f' and _hasStandardFloatCheck(field):
+            # We screen the values for range errors all at once, and check
+            # only an offending value individually to raise the usual error.
+            
+            invalid = _getOutOfRangeMask(field, values, numpy)
+            
+            if invalid.any():
+                field._check(float(values[invalid][0]))
+            
+            return [None if v != v else v for v in values.tolist()]
+        
+        values = values.tolist()
+    
+    newValues = []
+    
+    for value in values:
+        
+        if isinstance(value, float):
+            if value != value:
+                value = None
+            elif isinstance(field, Integer) and value.is_integer():
+                value = int(value)
+        
+        elif isinstance(value, int) and not isinstance(value, bool) and isinstance(field, Float):
+            value = float(value)
+        
+        if value is not None:
+            field._check(value)
+        
+        newValues.append(value)
+    
+    return newValues
+
+
+def _hasStandardFloatCheck(field):
+    cls = field.__class__
+    return isinstance(field, Float) and cls._check is Float._check and \
+        cls._rangeCheck is Float._rangeCheck
+
+
+def _getOutOfRangeMask(field, values, numpy):
+    
+    # Comparisons with NaN are false, so NaN values, which become `None`,
+    # are never out of range.
+    invalid = numpy.zeros(len(values), dtype=bool)
+    
+    if field.min is not None:
+        invalid |= values < field.min if field.minInclusive else values <= field.min
+    
+    if field.max is not None:
+        invalid |= values > field.max if field.maxInclusive else values >= field.max
+    
+    return invalid
@@ -0,0 +1,273 @@
+'''
+Module containing `LazyDocument` class.
+
+A lazy document is a document whose observations are parsed from its text file
+only as they are accessed. When a lazy document is created, its file is memory
+mapped and indexed, i.e. the offsets of its nonempty lines are found, but no lines
+are parsed. A lazy document keeps the most recently accessed observations in a
+least recently used (LRU) cache, so its memory use is proportional to the size of
+the cache rather than to the number of observations.
+
+A lazy document can be edited. Observations that are edited into a lazy document
+are kept in memory, while the rest of its observations continue to be parsed from
+its file on demand.
+'''
+
+
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, compress, repeat
+import mmap
+import operator
+
+from maka.data.Document import Document
+
+
+_DEFAULT_CACHE_SIZE = 10000
+
+
+class LazyDocument(Document):
+    
+    
+    '''Document whose observations are parsed from its file on demand.'''
+    
+    
+    def __init__(
+            self, file, dataOffset, startLineNum, encoding, documentFormat=None,
+            fileFormat=None, filePath=None, cacheSize=_DEFAULT_CACHE_SIZE):
+        
+        '''
+        Initializes this document.
+        
+        :Parameters:
+            file : binary file
+                the document file. The file is memory mapped, so it need not remain
+                open after this document is initialized, but it must not be modified
+                in place for the life of this document.
+            
+            dataOffset : `int`
+                the offset in bytes of the first observation line of the file.
+            
+            startLineNum : `int`
+                the number of lines of the file before the first observation line.
+            
+            encoding : `str`
+                the text encoding of the file.
+            
+            cacheSize : `int`
+                the maximum number of parsed observations to keep in memory.
+        '''
+        
+        super(LazyDocument, self).__init__(
+            documentFormat=documentFormat, fileFormat=fileFormat, filePath=filePath)
+        
+        self.observations = LazyObservationList(
+            file, dataOffset, startLineNum, encoding, documentFormat.parseObservation,
+            filePath, cacheSize)
+    
+    
+    def getFormattedObservations(self, startIndex, endIndex):
+        
+        # We use the text of unedited observations as it appears in the file, so
+        # that we do not have to parse them to format them. We do not cache
+        # formatted observations as `Document` does, since that would eventually
+        # hold the text of the whole file in memory.
+        
+        observations = self.observations
+        formatObservation = self.documentFormat.formatObservation
+        
+        return [observations.getLine(i) or formatObservation(observations[i])
+                for i in range(startIndex, endIndex)]
+
+
+class LazyObservationList(object):
+    
+    
+    '''
+    Sequence of observations parsed from a memory-mapped file on demand.
+    
+    The list supports the sequence operations required of document observation
+    lists, including slice assignment and deletion for edits.
+    '''
+    
+    
+    def __init__(
+            self, file, dataOffset, startLineNum, encoding, parseObservation,
+            filePath=None, cacheSize=_DEFAULT_CACHE_SIZE):
+        
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._startLineNum = startLineNum
+        self._encoding = encoding
+        self._parseObservation = parseObservation
+        self._filePath = filePath
+        self._cacheSize = cacheSize
+        
+        file.seek(dataOffset)
+        self._dataOffset = dataOffset
+        
+        # The items of this list are encoded as integers. A nonnegative item is the
+        # offset of the file line of an unedited observation, while a negative item
+        # is the key of an edited observation in `self._editedObservations`.
+        self._items = _indexLines(file, dataOffset, self._mmap)
+        self._editedObservations = {}
+        self._nextEditedObservationKey = -1
+        
+        # LRU cache of parsed observations, keyed by line offset
+        self._cache = OrderedDict()
+    
+    
+    def __len__(self):
+        return len(self._items)
+    
+    
+    def __getitem__(self, index):
+        
+        if isinstance(index, slice):
+            return [self._getObservation(item) for item in self._items[index]]
+        
+        else:
+            return self._getObservation(self._items[index])
+    
+    
+    def _getObservation(self, item):
+        
+        if item < 0:
+            return self._editedObservations[item]
+        
+        cache = self._cache
+        
+        try:
+            obs = cache[item]
+        
+        except KeyError:
+            
+            obs = self._parseLine(item).freeze()
+            
+            cache[item] = obs
+            
+            if len(cache) > self._cacheSize:
+                cache.popitem(last=False)
+        
+        else:
+            cache.move_to_end(item)
+        
+        return obs
+    
+    
+    def _parseLine(self, offset):
+        
+        try:
+            return self._parseObservation(self._readLine(offset))
+        
+        except ValueError as e:
+            e.lineNum = self._getLineNum(offset)
+            e.filePath = self._filePath
+            raise
+    
+    
+    def _readLine(self, offset):
+        
+        m = self._mmap
+        endOffset = m.find(b'\n', offset)
+        
+        if endOffset == -1:
+            endOffset = len(m)
+        
+        return m[offset:endOffset].decode(self._encoding).rstrip('\r')
+    
+    
+    def _getLineNum(self, offset):
+        m = self._mmap
+        return self._startLineNum + m[self._dataOffset:offset].count(b'\n') + 1
+    
+    
+    def getLine(self, index):
+        
+        '''
+        Gets the file line of an observation of this list.
+        
+        :Returns:
+            the file line of the observation, without its terminator, or `None` if
+            the observation was edited into this list.
+        '''
+        
+        item = self._items[index]
+        return self._readLine(item) if item >= 0 else None
+    
+    
+    def __iter__(self):
+        for item in self._items:
+            yield self._getObservation(item)
+    
+    
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return False
+    
+    
+    def __ne__(self, other):
+        return not self.__eq__(other)
+    
+    
+    def __setitem__(self, index, observations):
+        
+        if not isinstance(index, slice):
+            index = slice(index, index + 1 if index != -1 else None)
+            observations = [observations]
+        
+        self._forgetEditedObservations(self._items[index])
+        
+        items = array('q')
+        
+        for obs in observations:
+            key = self._nextEditedObservationKey
+            self._nextEditedObservationKey -= 1
+            self._editedObservations[key] = obs
+            items.append(key)
+        
+        self._items[index] = items
+    
+    
+    def __delitem__(self, index):
+        
+        if not isinstance(index, slice):
+            index = slice(index, index + 1 if index != -1 else None)
+        
+        self._forgetEditedObservations(self._items[index])
+        
+        del self._items[index]
+    
+    
+    def _forgetEditedObservations(self, items):
+        for item in items:
+            if item < 0:
+                del self._editedObservations[item]
+
+
+def _indexLines(file, dataOffset, m):
+    
+    '''
+    Finds the offsets of the nonempty lines of a file.
+    
+    We do as much of the work as possible with iterators implemented in C, since
+    a file can have millions of lines.
+    '''
+    
+    lengths = array('q', map(len, file))
+    offsets = array('q', accumulate(lengths, initial=dataOffset))
+    
+    # A line longer than two characters (including its terminator) is nonempty.
+    # For shorter lines, we check. A line that ends the file without a terminator
+    # may also be only one character long.
+    selectors = bytearray(map(operator.gt, lengths, repeat(2)))
+    
+    i = selectors.find(0)
+    
+    while i != -1:
+        line = m[offsets[i]:offsets[i + 1]]
+        selectors[i] = len(line.rstrip(b'\r\n')) != 0
+        i = selectors.find(0, i + 1)
+    
+    return array('q', compress(offsets, selectors))
@@ -10,6 +10,8 @@ all fields of a new observation, and allows their values to be set via keyword a
 
 
 
+import copy
+
 from maka.data.Field import Field
 
 
@@ -105,6 +107,12 @@ class _Metaclass(type):
     
     The `__new__` method of this class creates observation type classes from the components
     of the class definitions.
+    
+    An observation stores its field values in a single list, in the order of the fields
+    of its type, and each field of a type knows the index of its value in the list.
+    Observation types are slotted, so observations have no per-instance dictionaries.
+    (We cannot instead give each field value a slot of its own, since observation types
+    with multiple parents each with their own slots would have conflicting layouts.)
     '''
     
     def __new__(cls, typeName, parents, attrs):
@@ -114,7 +122,9 @@ class _Metaclass(type):
         
         names = list(fields.keys())
         names.sort()
-        attrs[FIELDS_ATTRIBUTE_NAME] = [fields[name] for name in names]
+        attrs[FIELDS_ATTRIBUTE_NAME] = _indexFields([fields[name] for name in names], attrs)
+        
+        attrs.setdefault('__slots__', ())
             
         return type.__new__(cls, typeName, parents, attrs)
         
@@ -178,12 +188,39 @@ def _getNewFields(attrs):
     return fields
 
 
+def _indexFields(fields, attrs):
+    
+    '''
+    Tells fields the indices of their values in observation value lists.
+    
+    A field that already has an index is one that was inherited from a parent class
+    (or appears in another class definition), in which its value may have a different
+    index. We replace such a field with a copy of its own.
+    '''
+    
+    indexedFields = []
+    
+    for index, field in enumerate(fields):
+        
+        if field._index is not None:
+            field = copy.copy(field)
+            attrs[field.name] = field
+            
+        field._setIndex(index)
+        indexedFields.append(field)
+        
+    return indexedFields
+
+
 class Observation(object, metaclass=_Metaclass):
         
         
     '''Superclass of all observation classes.'''
     
     
+    __slots__ = ('_values', '_listeners')
+    
+    
     def __init__(self, **kwds):
         
         super(Observation, self).__init__()
@@ -192,6 +229,8 @@ class Observation(object, metaclass=_Metaclass):
         
         fields = getattr(self, FIELDS_ATTRIBUTE_NAME)
         
+        self._values = [None] * len(fields)
+        
         for field in fields:
             
             try:
@@ -206,6 +245,18 @@ class Observation(object, metaclass=_Metaclass):
         
         cls = self.__class__
         
+        if obj.__class__ is cls:
+            # `obj` and this observation have the same fields, in the same order
+            
+            values = self._values
+            objValues = obj._values
+            
+            if values.__class__ is objValues.__class__:
+                return objValues == values
+            else:
+                # one observation is frozen and the other is not
+                return tuple(objValues) == tuple(values)
+        
         if not isinstance(obj, cls):
             return False
             
@@ -233,15 +284,149 @@ class Observation(object, metaclass=_Metaclass):
         return cls.__name__ + '(' + ', '.join(fieldValues) + ')'
     
     
+    @property
+    def fieldValues(self):
+        
+        '''
+        the field values of this observation, a tuple.
+        
+        The values are in the order of the `FIELDS` of this observation's class.
+        '''
+        
+        return tuple(self._values)
+    
+    
+    @classmethod
+    def fromFieldValues(cls, values):
+        
+        '''
+        Creates a frozen observation from field values.
+        
+        This is a fast alternative to the initializer for field values that are
+        known to be valid, for example ones read from a cache of field values that
+        were checked when they were cached. The values are *not* checked.
+        
+        :Parameters:
+            values : `tuple`
+                the field values of the observation, in the order of the `FIELDS`
+                of this class.
+                
+        :Returns:
+            the new observation.
+        '''
+        
+        obs = cls.__new__(cls)
+        obs._listeners = None
+        obs._values = values
+        return obs
+    
+    
+    @property
+    def frozen(self):
+        
+        '''
+        `True` if and only if this observation is frozen.
+        
+        The field values of a frozen observation cannot be set. Since a frozen
+        observation cannot change, it can be shared by documents, edits, and
+        edit histories without being copied.
+        '''
+        
+        return self._values.__class__ is tuple
+    
+    
+    def freeze(self):
+        
+        '''
+        Freezes this observation so that its field values can no longer be set.
+        
+        An attempt to set a field value of a frozen observation raises an
+        `AttributeError`. Freezing an observation that is already frozen has
+        no effect. An observation cannot be unfrozen, but its `copy` is not
+        frozen.
+        
+        :Returns:
+            this observation.
+        '''
+        
+        # We store the field values of a frozen observation in a tuple rather than a
+        # list. This makes the observation a little smaller, and fields check the
+        # container class to determine whether or not an observation is frozen.
+        values = self._values
+        
+        if values.__class__ is not tuple:
+            self._values = tuple(values)
+            
+        return self
+    
+    
     def copy(self, **kwds):
+        
+        '''
+        Creates an unfrozen copy of this observation.
+        
+        :Parameters:
+            kwds : `dict`
+                new values for fields of the copy, keyed by field name.
+                
+        :Returns:
+            the new observation.
+        '''
+        
         cls = self.__class__
-        fields = getattr(cls, FIELDS_ATTRIBUTE_NAME)
-        fieldValues = dict((f.name, getattr(self, f.name)) for f in fields)
-        fieldValues.update(kwds)
-        return cls(**fieldValues)
+        
+        # Since the field values of this observation have already been checked, we
+        # copy them directly rather than initializing the copy via `__init__`. We
+        # check only the values of fields specified as keyword arguments.
+        obs = cls.__new__(cls)
+        obs._listeners = None
+        obs._values = list(self._values)
+        
+        for name, value in kwds.items():
+            
+            field = getattr(cls, name, None)
+            
+            if isinstance(field, Field):
+                field._setValue(obs, value)
+                
+        return obs
     
     
+    def addFieldChangeListener(self, listener):
+        
+        '''
+        Adds a listener for changes to the field values of this observation.
+        
+        :Parameters:
+            listener : callable
+                a function that takes the observation, the name of the changed
+                field, and the old and new field values. The function is called
+                after each assignment that changes a field value.
+        '''
+        
+        # An observation without listeners has no listener list, so that field
+        # assignments need check only for `None` to skip notification.
+        if self._listeners is None:
+            self._listeners = [listener]
+        else:
+            self._listeners.append(listener)
+            
+            
+    def removeFieldChangeListener(self, listener):
+        
+        listeners = self._listeners
+        
+        if listeners is None or listener not in listeners:
+            raise ValueError('Listener is not a field change listener of observation.')
+        
+        listeners.remove(listener)
+        
+        if len(listeners) == 0:
+            self._listeners = None
+            
+            
     def notifyFieldValueChanged(self, fieldName, oldValue, newValue):
-        pass
-#        print('observation field "{:s}" value changed from {:s} to {:s}'.format(
-#                  fieldName, str(oldValue), str(newValue)))
+        if self._listeners is not None:
+            # We iterate over a copy so that listeners can remove themselves.
+            for listener in tuple(self._listeners):
+                listener(self, fieldName, oldValue, newValue)
@@ -5,11 +5,9 @@ import maka.util.ExtensionManager as ExtensionManager
 _DEVICES_PREFERENCE_NAME = 'devices'
 _DEVICE_TYPE_KEY = 'deviceType'
 _DEVICE_CONFIG_KEY = 'deviceConfig'
+_POLLING_KEY = 'polling'
 
 
-_deviceClasses = None
-'''mapping from device types (i.e. extension names) to device classes (i.e. extensions).'''
-
 _devices = {}
 '''mapping from device names to device instances.'''
 
@@ -60,21 +58,46 @@ def _createDevice(name):
     
     device = deviceClass(**deviceConfig)
     
+    polling = deviceInfo.get(_POLLING_KEY)
+    
+    if polling is not None:
+        _startPolling(device, polling, name)
+        
     _devices[name] = device
     
     return device
     
     
+def _startPolling(device, polling, name):
+    
+    if not hasattr(device, 'startPolling'):
+        raise ValueError(
+            'Polling specified for {:s} is not supported by its device type.'.format(
+                _deviceString(name)))
+        
+    if not isinstance(polling, dict):
+        raise ValueError(
+            'Polling information provided for {:s} is not a JSON object.'.format(
+                _deviceString(name)))
+        
+    try:
+        device.startPolling(**polling)
+    except TypeError:
+        raise ValueError(
+            'Bad polling information provided for {:s}.'.format(_deviceString(name)))
+        
+        
 def _deviceString(deviceName):
     return 'device "{:s}" in preference "{:s}"'.format(deviceName, _DEVICES_PREFERENCE_NAME)
 
 
 def _getDeviceClass(name):
     
-    global _deviceClasses
+    # We get only the device class we need, so that we do not import the modules
+    # of other devices, which may depend on packages that are not installed.
+    deviceClass = ExtensionManager.getExtension('Device', name)
     
-    if _deviceClasses is None:
-        _deviceClasses = dict(
-            (c.extensionName, c) for c in ExtensionManager.getExtensions('Device'))
-        
-    return _deviceClasses[name]
+    if deviceClass is None:
+        raise KeyError(name)
+    
+    return deviceClass
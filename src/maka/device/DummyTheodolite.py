@@ -1,4 +1,7 @@
-class DummyTheodolite(object):
+from maka.device.Theodolite import Theodolite
+
+
+class DummyTheodolite(Theodolite):
     
     '''Dummy theodolite that always returns vertical and horizontal angles of `None`.'''
     
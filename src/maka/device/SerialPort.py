@@ -42,7 +42,8 @@ class SerialPort(object):
         numStopBits,          # 1, 1.5, 2
         readTimeout=None,
         writeTimeout=None,
-        exceptionClass=None):
+        exceptionClass=None,
+        interByteTimeout=None):
     
         self._exceptionClass = exceptionClass
         
@@ -57,7 +58,8 @@ class SerialPort(object):
             'parity': parity,
             'stopbits': stopBits,
             'timeout': readTimeout,
-            'writeTimeout': writeTimeout
+            'writeTimeout': writeTimeout,
+            'interCharTimeout': interByteTimeout
         })
         
         # We set the port name here rather than above since the latter would open the port.
@@ -122,6 +124,25 @@ class SerialPort(object):
     
     def read(self, numBytes):
         return self._try('read', self._serialPort.read, numBytes)
+    
+    
+    def readInto(self, buffer):
+        
+        '''
+        Reads bytes into a buffer.
+        
+        The read completes when the buffer is full, when the read timeout expires,
+        or when the inter-byte timeout expires after at least one byte is read.
+        
+        :Parameters:
+            buffer : `bytearray`
+                the buffer into which to read.
+                
+        :Returns:
+            the number of bytes read.
+        '''
+        
+        return self._try('read', self._serialPort.readinto, buffer)
         
 
     def close(self):
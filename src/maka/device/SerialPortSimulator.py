@@ -0,0 +1,207 @@
+'''
+Module containing class `SerialPortSimulator`.
+
+Note that this module depends on the pseudoterminal support of POSIX systems.
+'''
+
+
+import itertools
+import os
+import select
+import threading
+import time
+import tty
+
+
+class SerialPortSimulator(object):
+    
+    '''
+    Simulated serial device that replays recorded exchanges.
+    
+    The simulator creates a pseudoterminal and plays the part of a serial device
+    on its master side. A program communicates with the simulated device by
+    opening the pseudoterminal's slave device, whose name is `portName`, as it
+    would a serial port, for example with a `SerialPort`. This allows device
+    classes such as `SokkiaTheodolite` to be tested and benchmarked without
+    hardware.
+    
+    The simulator replays a *recording*, a sequence of `(command, reply)` pairs
+    of `bytes`. When the simulator has received the command of the next pair,
+    it sends the reply. A reply of `None` sends nothing, so that the reader
+    times out. Received data that do not match the next command are discarded
+    and appended to `unexpectedData`.
+    
+    If a baud rate is specified, the simulator delays each reply by the time
+    the command takes to arrive over a serial line of that rate plus the
+    response delay, and then sends the reply one byte at a time at that rate.
+    Otherwise it sends each reply immediately, which is useful for measuring
+    the overhead of a device class.
+    
+    A simulator is a context manager that starts itself on entry and stops
+    itself on exit.
+    '''
+    
+    
+    def __init__(
+            self, recording, baudRate=None, numBitsPerByte=10, responseDelay=0, repeat=False):
+        
+        '''
+        Initializes this simulator.
+        
+        :Parameters:
+            recording : sequence of `(command, reply)` pairs
+                the exchanges to replay.
+            
+            baudRate : `int`
+                the simulated baud rate, or `None` for no serial line timing.
+            
+            numBitsPerByte : `int`
+                the number of bits sent over the serial line per byte, including
+                start, parity, and stop bits. The default is that of eight data
+                bits, no parity, and one stop bit.
+            
+            responseDelay : `float`
+                the time in seconds that the simulated device takes to respond
+                to a command, for example to measure angles.
+            
+            repeat : `bool`
+                `True` if the recording should be replayed repeatedly, or `False`
+                if it should be replayed once.
+        '''
+        
+        super(SerialPortSimulator, self).__init__()
+        
+        self._recording = tuple(recording)
+        self._byteTime = None if baudRate is None else numBitsPerByte / baudRate
+        self._responseDelay = responseDelay
+        self._repeat = repeat
+        
+        self._masterFd = None
+        self._slaveFd = None
+        self._portName = None
+        self._thread = None
+        self._stopFds = None
+        
+        self.unexpectedData = []
+    
+    
+    @property
+    def portName(self):
+        return self._portName
+    
+    
+    def start(self):
+        
+        '''Starts this simulator.'''
+        
+        self._masterFd, self._slaveFd = os.openpty()
+        
+        # We keep the slave device open so that reading the master device does
+        # not fail while the program that uses the slave device has it closed.
+        # We put the device in raw mode so that it does not echo or translate
+        # the data that pass through it, as a serial port would not.
+        tty.setraw(self._slaveFd)
+        
+        self._portName = os.ttyname(self._slaveFd)
+        
+        self._stopFds = os.pipe()
+        
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    
+    def stop(self):
+        
+        '''Stops this simulator.'''
+        
+        if self._thread is not None:
+            
+            os.write(self._stopFds[1], b'\x00')
+            self._thread.join()
+            self._thread = None
+            
+            for fd in (self._masterFd, self._slaveFd) + self._stopFds:
+                os.close(fd)
+    
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+    
+    
+    def _run(self):
+        
+        recording = self._recording
+        
+        if self._repeat:
+            recording = itertools.cycle(recording)
+        
+        exchanges = iter(recording)
+        exchange = next(exchanges, None)
+        
+        data = b''
+        stopFd = self._stopFds[0]
+        
+        while True:
+            
+            readyFds, _, _ = select.select([self._masterFd, stopFd], [], [])
+            
+            if stopFd in readyFds:
+                return
+            
+            data += os.read(self._masterFd, 1024)
+            
+            while exchange is not None and len(data) != 0:
+                
+                command, reply = exchange
+                
+                if data.startswith(command):
+                    # received next command
+                    
+                    data = data[len(command):]
+                    self._sendReply(command, reply)
+                    exchange = next(exchanges, None)
+                
+                elif command.startswith(data):
+                    # received part of next command
+                    
+                    break
+                
+                else:
+                    # received something other than next command
+                    
+                    self.unexpectedData.append(data)
+                    data = b''
+            
+            if exchange is None and len(data) != 0:
+                self.unexpectedData.append(data)
+                data = b''
+    
+    
+    def _sendReply(self, command, reply):
+        
+        if reply is None:
+            return
+        
+        if self._byteTime is None:
+            time.sleep(self._responseDelay)
+            os.write(self._masterFd, reply)
+        
+        else:
+            
+            # We schedule each byte relative to the start of the reply rather
+            # than the previous byte, so that sleep overshoots do not accumulate.
+            startTime = time.monotonic() + len(command) * self._byteTime + self._responseDelay
+            
+            for i in range(len(reply)):
+                
+                delay = startTime + (i + 1) * self._byteTime - time.monotonic()
+                
+                if delay > 0:
+                    time.sleep(delay)
+                
+                os.write(self._masterFd, reply[i:i + 1])
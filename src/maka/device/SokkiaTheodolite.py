@@ -8,12 +8,32 @@ Note that this module depends on the PySerial serial communications Python exten
 
 
 from maka.device.SerialPort import SerialPort
+from maka.device.Theodolite import Theodolite
 from maka.device.TheodoliteError import TheodoliteError
 import maka.util.AngleUtils as AngleUtils
 
 
 _TILT_ERROR_MESSAGE = 'Tilt angle is outside of compensation range. Please re-level theodolite.'
 
+_FIELD_SIZE = 7
+'''the size in bytes of a theodolite data field, for example a dddmmss angle.'''
+
+_ERROR_SIZE = 4
+'''the size in bytes of a theodolite error report, an "E" and a three-digit code.'''
+
+_INTER_BYTE_TIMEOUT = .5
+'''
+the time in seconds after which a theodolite reply is considered complete if no
+more bytes arrive.
+
+A theodolite that reports an error sends a reply shorter than a data frame.
+Without an inter-byte timeout, reading the reply would wait for the read timeout.
+'''
+
+_LINE_TERMINATOR_BYTES = b'\r\n'
+'''the bytes with which a theodolite may terminate a reply.'''
+
+
 _THEODOLITE_ERROR_MESSAGES = {                     
     '100': 'Could not measure horizontal angle. Please re-index horizontal circle.',
     '101': 'Could not measure vertical angle. Please re-index vertical circle.',
@@ -29,7 +49,7 @@ as of 19 November 2013.
 '''
 
 
-class SokkiaTheodolite(object):
+class SokkiaTheodolite(Theodolite):
     
     '''Reads vertical and horizontal angles a Sokkia theodolite through a serial port.'''
     
@@ -94,11 +114,20 @@ class SokkiaTheodolite(object):
             if the specified serial port cannot be initialized.
         '''
         
-        self._readCommand = self._checkReadCommand(readCommand)
+        super(SokkiaTheodolite, self).__init__()
+        
+        self._readCommand = self._checkReadCommand(readCommand).encode('latin-1')
         self._dataFormat = self._checkDataFormat(dataFormat)
+        
         self._serialPort = SerialPort(
             serialPortName, baudRate, numDataBits, parity, numStopBits, readTimeout, writeTimeout,
-            TheodoliteError)
+            TheodoliteError, _INTER_BYTE_TIMEOUT)
+        
+        # A data frame comprises one field per data format character, with
+        # single spaces between fields. We read each frame into this buffer
+        # with a single call.
+        frameSize = len(self._dataFormat) * (_FIELD_SIZE + 1) - 1
+        self._frame = bytearray(frameSize)
         
         
     def _checkReadCommand(self, readCommand):
@@ -145,98 +174,135 @@ class SokkiaTheodolite(object):
         
         try:
             port.write(self._readCommand)
-            return self._readAngles()
+            frame = self._readFrame(port)
+        
         finally:
             port.close()
-                        
             
-    def _readAngles(self):
+        return _parseFrame(frame.decode('latin-1'), self._dataFormat)
+    
+    
+    def _readFrame(self, port):
         
-        # For error reporting in the `_read` method, we accumulate read data in `self._data`.
-        self._data = ''
+        numBytes = port.readInto(self._frame)
+        frame = self._frame[:numBytes]
         
-        for (i, c) in enumerate(self._dataFormat):
+        # The line terminator of the previous reply can arrive after we open
+        # the port, when reads follow each other closely. We discard
+        # it and read the rest of this reply.
+        numTerminatorBytes = numBytes - len(frame.lstrip(_LINE_TERMINATOR_BYTES))
+        
+        if numTerminatorBytes != 0 and numBytes == len(self._frame):
+            rest = bytearray(numTerminatorBytes)
+            numBytes = port.readInto(rest)
+            frame = frame[numTerminatorBytes:] + rest[:numBytes]
             
-            if i != 0:
-                # not first field
-                
-                # skip single space
-                self._read(1)
-                
-            if c == 'v':
-                # vertical angle
-                
-                v = self._readAngle('vertical')
-                
-            elif c == 'h':
-                # horizontal angle
-                
-                h = self._readAngle('horizontal')
-                
-            else:
-                # distance
-                
-                self._read(7)
-                
-        return (v, h)
+        else:
+            frame = frame[numTerminatorBytes:]
+            
+        return frame
+                        
+            
+def _parseFrame(data, dataFormat):
     
+    '''
+    Parses a data frame received from a theodolite.
     
-    def _read(self, numBytes):
+    :Parameters:
+        data : `str`
+            the data received, which may be incomplete if the read timed out.
+            
+        dataFormat : `str`
+            the theodolite data format.
+            
+    :Returns:
+        a pair `(verticalAngle, horizontalAngle)` of angles in radians.
         
-        data = self._serialPort.read(numBytes)
-        self._data += data
+    :Raises TheodoliteError:
+        if the data are incomplete, if they are not in the expected form,
+        or if the theodolite reports a measurement error.
+    '''
+    
+    i = 0
+    
+    for (j, c) in enumerate(dataFormat):
         
-        if len(data) != numBytes:
+        if j != 0:
+            # not first field
             
-            if len(self._data) == 0:
-                message = 'No data were received.'
-            else:
-                message = 'Data received were "{:s}".'.format(self._data)
+            # skip single space
+            i = _getFieldEnd(data, i, 1)
+            
+        if c == 'd':
+            # distance
+            
+            i = _getFieldEnd(data, i, _FIELD_SIZE)
+            
+        else:
+            # angle
+            
+            # The first character of the field is an "E" if the theodolite
+            # is reporting an error, or a digit if it is reporting an angle.
+            if data[i:i + 1] == 'E':
+                # theodolite is reporting an error
                 
-            raise TheodoliteError('Theodolite read timed out. {:s}'.format(message))
-        
-        return data
-        
-        
-    def _readAngle(self, description):
+                end = _getFieldEnd(data, i, _ERROR_SIZE)
+                errorCode = data[i + 1:end]
                 
-        # Read the next character from the theodolite. This will be an "E" if the theodolite
-        # is reporting an error, or a digit if it is reporting an angle.
-        c = self._read(1)
-        
-        if c == 'E':
-            # theodolite is reporting an error
-            
-            # Read three-digit error code.
-            errorCode = self._read(3)
+                message = _THEODOLITE_ERROR_MESSAGES.get(
+                    errorCode, 'No further explanation is available.')
+                
+                raise TheodoliteError(
+                    'Theodolite read returned error {:s}. {:s}'.format(errorCode, message))
             
-            message = _THEODOLITE_ERROR_MESSAGES.get(
-                errorCode, 'No further explanation is available.')
+            else:
+                # theodolite is reporting an angle
+                
+                end = _getFieldEnd(data, i, _FIELD_SIZE)
+                description = 'vertical' if c == 'v' else 'horizontal'
+                angle = _toRadians(data[i:end], description, data)
                 
-            raise TheodoliteError(
-                'Theodolite read returned error {:s}. {:s}'.format(errorCode, message))
+                if c == 'v':
+                    v = angle
+                else:
+                    h = angle
+                    
+                i = end
+                
+    return (v, h)
+
+
+def _getFieldEnd(data, start, size):
+    
+    end = start + size
+    
+    if end > len(data):
+        # read timed out before field was received
         
+        if len(data) == 0:
+            message = 'No data were received.'
         else:
-            # theodolite is reporting an angle
+            message = 'Data received were "{:s}".'.format(data)
             
-            # Read remaining digits of dddmmss angle and convert from degrees to radians.
-            return self._toRadians(c + self._read(6), description)
+        raise TheodoliteError('Theodolite read timed out. {:s}'.format(message))
+    
+    return end
+
 
+def _toRadians(angleString, description, data):
     
-    def _toRadians(self, angleString, description):
+    try:
+        degrees = int(angleString[0:3])
+        minutes = int(angleString[3:5])
+        seconds = int(angleString[5:7])
         
-        try:
-            degrees = int(angleString[0:3])
-            minutes = int(angleString[3:5])
-            seconds = int(angleString[5:7])
-            
-        except ValueError:
-            raise TheodoliteError(
-                'Bad {:s} angle "{:s}" in string "{:s}" received from theodolite.'.format(
-                    description, angleString, self._data))
-            
-        else:
-            return AngleUtils.degreesToRadians(degrees + minutes / 60. + seconds / 3600.)
+    except ValueError:
+        raise TheodoliteError(
+            'Bad {:s} angle "{:s}" in string "{:s}" received from theodolite.'.format(
+                description, angleString, data))
+        
+    else:
+        return AngleUtils.degreesToRadians(degrees + minutes / 60. + seconds / 3600.)
 
 
 class SokkiaDt4Theodolite(SokkiaTheodolite):
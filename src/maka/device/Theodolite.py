@@ -0,0 +1,200 @@
+'''Module containing `Theodolite` class.'''
+
+
+import threading
+import time
+
+
+class Theodolite(object):
+    
+    '''
+    Abstract theodolite.
+    
+    A theodolite reads angles either synchronously, via the `readAngles` method,
+    or asynchronously, via the `readAnglesAsync` method. Asynchronous reads are
+    performed one at a time, in the order in which they were requested, on a
+    worker thread that belongs to the theodolite, so that a user interface
+    remains responsive while a read is in progress.
+    
+    A theodolite can also poll itself, reading angles periodically on a
+    background thread and keeping the latest reading, so that the current
+    angles are available without waiting for the device. See the
+    `startPolling` and `getPolledAngles` methods.
+    
+    Asynchronous and polling reads are serialized. Calls to `readAngles` by
+    other threads while either is in use are not.
+    '''
+    
+    
+    extensionName = None
+    '''the extension name of this theodolite, of type `str`.'''
+    
+    
+    def __init__(self):
+        
+        super(Theodolite, self).__init__()
+        
+        self._executor = None
+        self._readLock = threading.Lock()
+        
+        self._pollingThread = None
+        self._pollingStopEvent = None
+        self._maxReadingAge = None
+        
+        self._latestReading = None
+        '''
+        the latest polling reading, a `(time, angles)` pair where `time` is
+        the `time.monotonic` time at which the read began, or `None`.
+        '''
+    
+    
+    def readAngles(self):
+        
+        '''
+        Reads vertical and horizontal angles from this theodolite.
+        
+        :Returns:
+            a pair `(verticalAngle, horizontalAngle)` of angles in radians.
+        
+        :Raises TheodoliteError:
+            if the angles cannot be read.
+        '''
+        
+        raise NotImplementedError()
+    
+    
+    def readAnglesAsync(self):
+        
+        '''
+        Reads vertical and horizontal angles from this theodolite asynchronously.
+        
+        :Returns:
+            a `concurrent.futures.Future` whose result is the pair of angles
+            returned by `readAngles`, or whose exception is the exception
+            raised by `readAngles`.
+        '''
+        
+        if self._executor is None:
+            
+            # We import `concurrent.futures` here rather than at the top of this
+            # module since programs that read angles synchronously do not need it.
+            from concurrent.futures import ThreadPoolExecutor
+            
+            # A single worker thread serializes access to the device.
+            self._executor = ThreadPoolExecutor(1)
+        
+        return self._executor.submit(self._readAnglesExclusively)
+    
+    
+    def _readAnglesExclusively(self):
+        with self._readLock:
+            return self.readAngles()
+    
+    
+    @property
+    def polling(self):
+        return self._pollingThread is not None
+    
+    
+    def startPolling(self, interval=1, maxReadingAge=None):
+        
+        '''
+        Starts polling this theodolite.
+        
+        While polling, a background thread reads angles from this theodolite
+        periodically and keeps the latest reading, which is available via the
+        `getPolledAngles` method.
+        
+        :Parameters:
+            interval : `float`
+                the time in seconds between the starts of successive reads.
+                
+            maxReadingAge : `float`
+                the maximum age in seconds of a reading returned by
+                `getPolledAngles`, or `None` for twice `interval`.
+                
+        :Raises ValueError:
+            if `interval` or `maxReadingAge` is not positive.
+        '''
+        
+        if maxReadingAge is None:
+            maxReadingAge = 2 * interval
+            
+        _checkPositive(interval, 'polling interval')
+        _checkPositive(maxReadingAge, 'maximum reading age')
+        
+        self.stopPolling()
+        
+        self._maxReadingAge = maxReadingAge
+        self._pollingStopEvent = threading.Event()
+        
+        # The thread is a daemon so that it does not keep the application
+        # running after the user quits.
+        self._pollingThread = threading.Thread(
+            target=self._poll, args=(interval, self._pollingStopEvent), daemon=True)
+        self._pollingThread.start()
+        
+        
+    def _poll(self, interval, stopEvent):
+        
+        while not stopEvent.is_set():
+            
+            startTime = time.monotonic()
+            
+            try:
+                angles = self._readAnglesExclusively()
+                
+            except Exception:
+                # We ignore read errors, since a failed read only means that the
+                # latest reading ages. Fix commands report errors when there is
+                # no fresh reading and they read this theodolite themselves.
+                pass
+            
+            else:
+                self._latestReading = (startTime, angles)
+                
+            stopEvent.wait(max(interval - (time.monotonic() - startTime), 0))
+            
+            
+    def stopPolling(self):
+        
+        '''
+        Stops polling this theodolite.
+        
+        A read in progress completes in the background.
+        '''
+        
+        if self._pollingThread is not None:
+            self._pollingStopEvent.set()
+            self._pollingThread = None
+            self._pollingStopEvent = None
+            self._latestReading = None
+            
+            
+    def getPolledAngles(self):
+        
+        '''
+        Gets the angles of the latest polling reading of this theodolite.
+        
+        :Returns:
+            the `(verticalAngle, horizontalAngle)` pair of the latest reading,
+            or `None` if this theodolite is not polling or the latest reading
+            is older than the maximum reading age.
+        '''
+        
+        reading = self._latestReading
+        
+        if reading is None or not self.polling:
+            return None
+        
+        readingTime, angles = reading
+        
+        if time.monotonic() - readingTime > self._maxReadingAge:
+            return None
+        
+        return angles
+
+
+def _checkPositive(value, description):
+    if not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError('Theodolite {:s} must be a positive number.'.format(description))
@@ -0,0 +1,636 @@
+'''
+Module containing `ColumnarCacheFileFormat` class.
+
+A columnar cache file holds the observations of a document read from a text
+document file in a binary form that can be loaded much faster than the text can be
+parsed. The observations are grouped by class, and the values of each field of a
+class are stored in a typed column:
+
+    integers        64-bit integers, with a null mask
+    floats          64-bit floats, with a null mask
+    dates           32-bit proleptic Gregorian ordinals, with zero for `None`
+    times           64-bit microseconds since midnight, with -1 for `None`
+    strings         32-bit indices into a table of distinct strings, with -1 for `None`
+
+Decimal field values, which are strings, are stored like string field values.
+
+A cache file comprises a magic number, the length of a JSON metadata object, the
+metadata, and a sequence of binary blobs described by the metadata. The metadata
+include the size, modification time, and SHA-1 hash of the text document file from
+which the cache was created, so that a cache that no longer matches its text file
+is never used.
+
+Cache files are stored in the `documents` subdirectory of the Maka cache directory,
+with names derived from the absolute paths of their text files. The total size of
+the cache files is bounded by the `"documentCache.maxSize"` preference: after
+writing a cache file, the format deletes the least recently used other cache
+files until the total size is within the bound.
+'''
+
+
+
+
+import array
+import datetime
+import hashlib
+import json
+import os
+import struct
+import sys
+
+from maka.data.Document import Document
+from maka.data.Field import Date, Decimal, Float, Integer, String, Time
+from maka.data.Observation import FIELDS_ATTRIBUTE_NAME
+from maka.format.DocumentFileFormat import (
+    DocumentFileFormat, UnrecognizedFileFormatError)
+from maka.util.Preferences import preferences as prefs
+import maka.util.CacheUtils as CacheUtils
+import maka.util.FileUtils as FileUtils
+import maka.util.ExtensionManager as ExtensionManager
+
+
+_MAGIC = b'MAKACOL1'
+_LENGTH_FORMAT = '<Q'
+_LENGTH_SIZE = struct.calcsize(_LENGTH_FORMAT)
+_HEADER_SIZE = len(_MAGIC) + _LENGTH_SIZE
+
+_CACHE_SUBDIR_NAME = 'documents'
+_CACHE_FILE_NAME_EXTENSION = '.cache'
+
+_DEFAULT_MAX_CACHE_SIZE = 500000000
+'''the default maximum total size in bytes of the cache files.'''
+
+_INTEGER = 'integer'
+_FLOAT = 'float'
+_DATE = 'date'
+_TIME = 'time'
+_STRING = 'string'
+
+_MICROSECONDS_PER_SECOND = 1000000
+_MICROSECONDS_PER_MINUTE = 60 * _MICROSECONDS_PER_SECOND
+_MICROSECONDS_PER_HOUR = 60 * _MICROSECONDS_PER_MINUTE
+
+
+class ColumnarCacheFileFormat(DocumentFileFormat):
+    
+    
+    '''
+    Document file format that reads documents from columnar cache files.
+    
+    A file is recognized by this format if and only if it has an up-to-date
+    cache file. Since reading a document from its cache is much faster than
+    parsing it, this format is probed before other formats.
+    
+    Documents read by this format have the file and document formats of the
+    text document files from which they were cached, so that they are saved
+    as text.
+    '''
+    
+    
+    extensionName = 'Maka Columnar Cache File Format'
+    
+    probePriority = 1
+    
+    isCache = True
+    
+    
+    def __init__(self, cacheDirPath=None, maxCacheSize=None):
+        
+        super(ColumnarCacheFileFormat, self).__init__()
+        
+        # If no cache directory or maximum cache size is specified, we get it
+        # from the preferences each time we need it, since the shared instance
+        # of this format outlives any particular preference value.
+        self._cacheDirPath = cacheDirPath
+        self._maxCacheSize = maxCacheSize
+    
+    
+    def getCacheFilePath(self, filePath):
+        
+        cacheDirPath = self._cacheDirPath
+        
+        if cacheDirPath is None:
+            cacheDirPath = CacheUtils.getCacheDirPath()
+        
+        digest = hashlib.sha1(os.path.abspath(filePath).encode('utf-8')).hexdigest()
+        
+        return os.path.join(
+            cacheDirPath, _CACHE_SUBDIR_NAME, digest + _CACHE_FILE_NAME_EXTENSION)
+    
+    
+    def isFileRecognized(self, filePath):
+        
+        # We check only the size and modification time of the text file here.
+        # `readDocument` also checks its hash.
+        
+        try:
+            with open(self.getCacheFilePath(filePath), 'rb') as file:
+                metadata = _readMetadata(file)
+            return metadata['source'][:2] == list(_getFileState(filePath))
+        
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+    
+    
+    def readDocument(self, filePath, numJobs=None):
+        
+        '''
+        Reads a document from the cache file of the specified text document file.
+        
+        Since a cache file is not parsed, `numJobs` is ignored.
+        
+        :Raises UnrecognizedFileFormatError:
+            if the text document file has no cache file, or its cache file is not
+            up to date or is invalid.
+        '''
+        
+        try:
+            
+            with open(self.getCacheFilePath(filePath), 'rb') as file:
+                data = file.read()
+            
+            metadata = _readMetadata(data)
+            
+            if metadata['source'] != _getSourceState(filePath):
+                raise ValueError('Cache is out of date.')
+            
+            document = _decodeDocument(data, metadata, filePath)
+        
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            raise UnrecognizedFileFormatError(
+                'Could not read cache for file "{:s}": {:s}'.format(filePath, str(e)))
+        
+        _markUsed(self.getCacheFilePath(filePath))
+        
+        return document
+    
+    
+    def readObservations(self, filePath):
+        
+        # A cache does not record the text file line numbers of observations, and
+        # reading observations one at a time from a text file requires only
+        # constant memory anyway, so we defer to the text file's format.
+        raise UnrecognizedFileFormatError(
+            'Cache for file "{:s}" does not support reading observations '
+            'one at a time.'.format(filePath))
+    
+    
+    def getSourceState(self, filePath):
+        
+        '''
+        Gets the state of a text document file that its cache file records.
+        
+        A caller that reads a document from a text file to cache it should get
+        the state of the file before reading it, so that a file that changes
+        while it is read is not cached with its new state.
+        
+        :Raises OSError:
+            if the file cannot be read.
+        '''
+        
+        return _getSourceState(filePath)
+    
+    
+    def writeCache(self, document, filePath, sourceState=None):
+        
+        '''
+        Writes the cache file of the specified text document file.
+        
+        The cache is written only if all of the fields of all of the document's
+        observations are of supported types. Errors writing the cache file are
+        ignored, since a missing cache only makes reading slower. After writing
+        the cache file, this method evicts least recently used cache files to
+        keep the total size of the cache files within the maximum.
+        
+        :Parameters:
+            document : `Document`
+                the document read from the text document file.
+            
+            filePath : `str`
+                the path of the text document file.
+            
+            sourceState : `list`
+                the state of the text document file returned by `getSourceState`
+                before the document was read, or `None` to get the state now.
+        
+        :Returns:
+            `True` if the cache was written, or `False` otherwise.
+        '''
+        
+        cacheFilePath = self.getCacheFilePath(filePath)
+        
+        try:
+            
+            if sourceState is None:
+                sourceState = _getSourceState(filePath)
+            
+            data = _encodeDocument(document, sourceState)
+            
+            if len(data) > self._getMaxCacheSize():
+                return False
+            
+            FileUtils.writeFileAtomically(cacheFilePath, data)
+        
+        except (OSError, ValueError, OverflowError):
+            return False
+        
+        _evictCacheFiles(os.path.dirname(cacheFilePath), cacheFilePath, self._getMaxCacheSize())
+        
+        return True
+    
+    
+    def _getMaxCacheSize(self):
+        
+        if self._maxCacheSize is not None:
+            return self._maxCacheSize
+        
+        else:
+            return prefs.get('documentCache', {}).get('maxSize', _DEFAULT_MAX_CACHE_SIZE)
+
+
+def _markUsed(cacheFilePath):
+    
+    # We record the use of a cache file in its modification time, which unlike
+    # its access time is updated on all file systems.
+    try:
+        os.utime(cacheFilePath)
+    except OSError:
+        pass
+
+
+def _evictCacheFiles(dirPath, keptFilePath, maxSize):
+    
+    '''
+    Deletes least recently used cache files until the total size of the cache
+    files in a directory is at most `maxSize`, keeping `keptFilePath`.
+    '''
+    
+    files = []
+    
+    try:
+        
+        with os.scandir(dirPath) as entries:
+            for entry in entries:
+                if entry.name.endswith(_CACHE_FILE_NAME_EXTENSION):
+                    status = entry.stat()
+                    files.append((status.st_mtime_ns, status.st_size, entry.path))
+    
+    except OSError:
+        return
+    
+    totalSize = sum(size for _, size, _ in files)
+    
+    for _, size, path in sorted(files):
+        
+        if totalSize <= maxSize:
+            break
+        
+        if path != keptFilePath:
+            
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            
+            totalSize -= size
+
+
+def _getFileState(filePath):
+    status = os.stat(filePath)
+    return (status.st_size, status.st_mtime_ns)
+
+
+def _getSourceState(filePath):
+    
+    size, modificationTime = _getFileState(filePath)
+    
+    digest = hashlib.sha1()
+    
+    with open(filePath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    
+    return [size, modificationTime, digest.hexdigest()]
+
+
+def _readMetadata(source):
+    
+    '''Reads cache metadata from either a binary file or cache file contents.'''
+    
+    if isinstance(source, bytes):
+        header = source[:_HEADER_SIZE]
+    else:
+        header = source.read(_HEADER_SIZE)
+    
+    if len(header) != _HEADER_SIZE or not header.startswith(_MAGIC):
+        raise ValueError('Not a Maka columnar cache file.')
+    
+    (length,) = struct.unpack(_LENGTH_FORMAT, header[len(_MAGIC):])
+    
+    if isinstance(source, bytes):
+        text = source[_HEADER_SIZE:_HEADER_SIZE + length]
+    else:
+        text = source.read(length)
+    
+    metadata = json.loads(text.decode('utf-8'))
+    metadata['dataOffset'] = _HEADER_SIZE + length
+    
+    return metadata
+
+
+def _getColumnType(field):
+    
+    # `Decimal` field values are strings.
+    if isinstance(field, (String, Decimal)):
+        return _STRING
+    elif isinstance(field, Integer):
+        return _INTEGER
+    elif isinstance(field, Float):
+        return _FLOAT
+    elif isinstance(field, Date):
+        return _DATE
+    elif isinstance(field, Time):
+        return _TIME
+    else:
+        raise ValueError(
+            'Cannot cache field "{:s}" of unsupported type.'.format(field.name))
+
+
+def _getFieldDescriptions(cls):
+    return [[field.name, _getColumnType(field)]
+            for field in getattr(cls, FIELDS_ATTRIBUTE_NAME)]
+
+
+def _encodeDocument(document, sourceState):
+    
+    # Group observation field values by class.
+    classes = []
+    classNums = {}
+    classIndices = array.array('H')
+    valuesByClass = []
+    
+    for obs in document.observations:
+        
+        cls = obs.__class__
+        classNum = classNums.get(cls)
+        
+        if classNum is None:
+            classNum = classNums[cls] = len(classes)
+            classes.append(cls)
+            valuesByClass.append([])
+        
+        classIndices.append(classNum)
+        valuesByClass[classNum].append(obs.fieldValues)
+    
+    blobs = [classIndices.tobytes()]
+    strings = {}
+    classDescriptions = []
+    
+    for cls, values in zip(classes, valuesByClass):
+        
+        fields = _getFieldDescriptions(cls)
+        columns = list(zip(*values))
+        blobNums = []
+        
+        for (_, columnType), column in zip(fields, columns):
+            for blob in _ENCODERS[columnType](column, strings):
+                blobNums.append(len(blobs))
+                blobs.append(blob)
+        
+        classDescriptions.append({
+            'name': cls.__name__,
+            'numObservations': len(values),
+            'fields': fields,
+            'blobs': blobNums
+        })
+    
+    # Strings are stored in order of their indices.
+    stringTable = [None] * len(strings)
+    for s, i in strings.items():
+        stringTable[i] = s
+    blobs.append(json.dumps(stringTable).encode('utf-8'))
+    
+    metadata = {
+        'byteOrder': sys.byteorder,
+        'source': sourceState,
+        'fileFormat': document.fileFormat.extensionName,
+        'documentFormat': document.documentFormat.extensionName,
+        'classes': classDescriptions,
+        'blobSizes': [len(blob) for blob in blobs]
+    }
+    
+    metadata = json.dumps(metadata).encode('utf-8')
+    
+    return b''.join(
+        [_MAGIC, struct.pack(_LENGTH_FORMAT, len(metadata)), metadata] + blobs)
+
+
+def _encodeNumbers(typeCode, column):
+    mask = bytes(v is None for v in column)
+    values = array.array(typeCode, (0 if v is None else v for v in column))
+    return (values.tobytes(), mask)
+
+
+def _encodeIntegers(column, strings):
+    return _encodeNumbers('q', column)
+
+
+def _encodeFloats(column, strings):
+    return _encodeNumbers('d', column)
+
+
+def _encodeDates(column, strings):
+    return (array.array('i', (0 if d is None else d.toordinal() for d in column)).tobytes(),)
+
+
+def _encodeTimes(column, strings):
+    return (array.array('q', (_encodeTime(t) for t in column)).tobytes(),)
+
+
+def _encodeTime(t):
+    
+    if t is None:
+        return -1
+    
+    if t.tzinfo is not None:
+        raise ValueError('Cannot cache time with time zone.')
+    
+    return t.hour * _MICROSECONDS_PER_HOUR + t.minute * _MICROSECONDS_PER_MINUTE + \
+        t.second * _MICROSECONDS_PER_SECOND + t.microsecond
+
+
+def _encodeStrings(column, strings):
+    return (array.array('i', (_encodeString(s, strings) for s in column)).tobytes(),)
+
+
+def _encodeString(s, strings):
+    
+    if s is None:
+        return -1
+    
+    i = strings.get(s)
+    
+    if i is None:
+        i = strings[s] = len(strings)
+    
+    return i
+
+
+_ENCODERS = {
+    _INTEGER: _encodeIntegers,
+    _FLOAT: _encodeFloats,
+    _DATE: _encodeDates,
+    _TIME: _encodeTimes,
+    _STRING: _encodeStrings
+}
+
+
+def _decodeDocument(data, metadata, filePath):
+    
+    fileFormat = _getExtension('DocumentFileFormat', metadata['fileFormat'])
+    documentFormat = _getExtension('DocumentFormat', metadata['documentFormat'])
+    
+    blobs = _getBlobs(data, metadata)
+    swap = metadata['byteOrder'] != sys.byteorder
+    
+    # Append `None` to the string table so that index -1 yields `None`.
+    strings = json.loads(blobs[-1].tobytes().decode('utf-8'))
+    strings.append(None)
+    
+    obsClasses = dict((c.__name__, c) for c in documentFormat.documentClass.observationClasses)
+    
+    observationsByClass = []
+    
+    for description in metadata['classes']:
+        
+        cls = obsClasses[description['name']]
+        
+        if _getFieldDescriptions(cls) != description['fields']:
+            raise ValueError(
+                'Fields of observation class "{:s}" have changed.'.format(cls.__name__))
+        
+        numObservations = description['numObservations']
+        classBlobs = iter([blobs[i] for i in description['blobs']])
+        
+        columns = [_DECODERS[columnType](classBlobs, swap, strings)
+                   for _, columnType in description['fields']]
+        
+        if len(columns) != 0:
+            values = zip(*columns)
+        else:
+            values = [()] * numObservations
+        
+        observationsByClass.append(list(map(cls.fromFieldValues, values)))
+    
+    # Interleave the observations of the different classes in their document order.
+    nexts = [iter(observations).__next__ for observations in observationsByClass]
+    classIndices = _getArray('H', blobs[0], swap)
+    observations = [nexts[i]() for i in classIndices]
+    
+    return Document(
+        observations,
+        documentFormat=documentFormat,
+        fileFormat=fileFormat,
+        filePath=filePath)
+
+
+def _getExtension(typeName, extensionName):
+    
+    extension = ExtensionManager.getExtensionInstance(typeName, extensionName)
+    
+    if extension is None:
+        raise ValueError('Unknown extension "{:s}".'.format(extensionName))
+    
+    return extension
+
+
+def _getBlobs(data, metadata):
+    
+    view = memoryview(data)
+    offset = metadata['dataOffset']
+    blobs = []
+    
+    for size in metadata['blobSizes']:
+        blobs.append(view[offset:offset + size])
+        offset += size
+    
+    if offset != len(data):
+        raise ValueError('Cache file has wrong size.')
+    
+    return blobs
+
+
+def _getArray(typeCode, blob, swap):
+    a = array.array(typeCode)
+    a.frombytes(blob)
+    if swap:
+        a.byteswap()
+    return a
+
+
+def _decodeNumbers(typeCode, blobs, swap):
+    
+    values = _getArray(typeCode, next(blobs), swap).tolist()
+    mask = next(blobs)
+    
+    if 1 in mask:
+        values = [None if isNone else v for v, isNone in zip(values, mask)]
+    
+    return values
+
+
+def _decodeIntegers(blobs, swap, strings):
+    return _decodeNumbers('q', blobs, swap)
+
+
+def _decodeFloats(blobs, swap, strings):
+    return _decodeNumbers('d', blobs, swap)
+
+
+def _decodeDates(blobs, swap, strings):
+    
+    # Field values tend to repeat, so we create each distinct date only once.
+    dates = {0: None}
+    
+    def decode(ordinal):
+        try:
+            return dates[ordinal]
+        except KeyError:
+            date = dates[ordinal] = datetime.date.fromordinal(ordinal)
+            return date
+    
+    return list(map(decode, _getArray('i', next(blobs), swap)))
+
+
+def _decodeTimes(blobs, swap, strings):
+    
+    times = {-1: None}
+    
+    def decode(microseconds):
+        
+        try:
+            return times[microseconds]
+        
+        except KeyError:
+            
+            hours, remainder = divmod(microseconds, _MICROSECONDS_PER_HOUR)
+            minutes, remainder = divmod(remainder, _MICROSECONDS_PER_MINUTE)
+            seconds, remainder = divmod(remainder, _MICROSECONDS_PER_SECOND)
+            
+            time = times[microseconds] = datetime.time(hours, minutes, seconds, remainder)
+            return time
+    
+    return list(map(decode, _getArray('q', next(blobs), swap)))
+
+
+def _decodeStrings(blobs, swap, strings):
+    return list(map(strings.__getitem__, _getArray('i', next(blobs), swap)))
+
+
+_DECODERS = {
+    _INTEGER: _decodeIntegers,
+    _FLOAT: _decodeFloats,
+    _DATE: _decodeDates,
+    _TIME: _decodeTimes,
+    _STRING: _decodeStrings
+}
@@ -0,0 +1,30 @@
+'''Module containing `Diagnostic` class.'''
+
+
+from collections import namedtuple
+
+
+class Diagnostic(namedtuple('Diagnostic', ('lineNum', 'column', 'message'))):
+    
+    
+    '''
+    Description of a problem found while validating a document.
+    
+    A diagnostic is a `(lineNum, column, message)` tuple. `lineNum` is the one-based
+    document line number of the problem, and `column` is the one-based character
+    position of the problem within its line, or `None` if the problem concerns the
+    line as a whole.
+    '''
+    
+    
+    __slots__ = ()
+    
+    
+    def __str__(self):
+        
+        if self.column is None:
+            return 'line {:d}: {:s}'.format(self.lineNum, self.message)
+        
+        else:
+            return 'line {:d}, column {:d}: {:s}'.format(
+                self.lineNum, self.column, self.message)
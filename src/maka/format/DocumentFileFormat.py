@@ -1,3 +1,4 @@
+from maka.util.Preferences import preferences as prefs
 import maka.util.ExtensionManager as ExtensionManager
 
 
@@ -10,36 +11,183 @@ class UnrecognizedFileFormatError(FileFormatError):
 
 
 def getDocumentFileFormat(filePath):
-    _processFile(filePath, lambda format: format)
+    return _processFile(filePath, lambda format: format)
     
     
 def _processFile(filePath, function):
     
-    # TODO: Make file format extensions singletons, so we don't have to keep re-instantiating them.
-    for formatClass in ExtensionManager.getExtensions('DocumentFileFormat'):
-        format = formatClass()
+    for format in _getFileFormats():
+        
         if format.isFileRecognized(filePath):
-            return function(format)
+            
+            try:
+                return function(format)
+            
+            except UnrecognizedFileFormatError:
+                # format recognized file but could not process it after all, as can
+                # happen for a cache format whose cache turns out to be out of date
+                
+                continue
             
     # If we get here, no file format recognized this file.
     raise UnrecognizedFileFormatError(
         'File "{:s}" is not of a known document type.'.format(filePath))
     
     
-def readDocument(filePath):
-    return _processFile(filePath, lambda format: format.readDocument(filePath))
+def _getFileFormats():
+    
+    # We probe file formats in order of decreasing priority, and in order of
+    # extension name among formats of the same priority. File formats are
+    # stateless, so we share one instance of each.
+    formats = [
+        ExtensionManager.getExtensionInstance('DocumentFileFormat', name)
+        for name in ExtensionManager.getExtensionNames('DocumentFileFormat')]
+    
+    return sorted(formats, key=lambda f: (-f.probePriority, f.extensionName))
+    
+    
+def readDocument(filePath, numJobs=None, writeCache=None, applyJournal=True):
+    
+    '''
+    Reads a document file.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the file to read.
+            
+        numJobs : `int`
+            the maximum number of processes with which to parse the document,
+            or `None` to let the document format decide.
+            
+        writeCache : `bool`
+            `True` to cache a document that is not read from a cache, so that
+            it can be read faster next time, `False` not to, or `None` to cache
+            it according to the `"documentCache.enabled"` preference. Programs
+            that only read a document once, such as command line tools, should
+            not cache it.
+            
+        applyJournal : `bool`
+            `True` to apply the saved edits of the file's document journal, if
+            it has one that is not stale, to the document, or `False` to read
+            the file alone. A journal is never cached.
+    '''
+    
+    if writeCache is None:
+        writeCache = prefs.get('documentCache', {}).get('enabled', True)
+        
+    document = _processFile(
+        filePath, lambda format: _readDocument(format, filePath, numJobs, writeCache))
+    
+    if applyJournal:
+        
+        # We import this here rather than at the top of this module since the
+        # `DocumentJournal` module imports this one.
+        import maka.format.DocumentJournal as DocumentJournal
+        
+        DocumentJournal.applyJournal(document)
+        
+    return document
+
+
+def _readDocument(format, filePath, numJobs, writeCache):
+    
+    if not writeCache or format.isCache:
+        return format.readDocument(filePath, numJobs)
+    
+    cacheFormats = [f for f in _getFileFormats() if f.isCache]
+    
+    # We get the states of the file that the caches record before reading the
+    # file, so that if the file changes while we read it the caches are out of
+    # date rather than holding old contents under the new state.
+    sourceStates = []
+    for cacheFormat in cacheFormats:
+        try:
+            sourceStates.append(cacheFormat.getSourceState(filePath))
+        except OSError:
+            sourceStates.append(None)
+    
+    document = format.readDocument(filePath, numJobs)
+    
+    # Cache the document so that we can read it faster next time.
+    for cacheFormat, sourceState in zip(cacheFormats, sourceStates):
+        if sourceState is not None:
+            cacheFormat.writeCache(document, filePath, sourceState)
+            
+    return document
+            
+        
+def readLazyDocument(filePath):
+    
+    '''
+    Reads a document file lazily.
+    
+    Unlike `readDocument`, this function does not apply the saved edits of the
+    file's document journal, since that would require parsing the document. A
+    caller should fold the journal into the file (see `DocumentJournal.foldJournal`)
+    before reading the file lazily.
+    '''
+    
+    return _processFile(filePath, lambda format: _readLazyDocument(format, filePath))
+
+
+def _readLazyDocument(format, filePath):
+    
+    if format.isCache:
+        # A cache format reads all of a document's observations into memory, which
+        # is what a lazy document is for avoiding, so we defer to the file's own
+        # format.
+        raise UnrecognizedFileFormatError()
+    
+    return format.readLazyDocument(filePath)
+            
+        
+def validateDocument(filePath, numJobs=None):
+    return _processFile(filePath, lambda format: format.validateDocument(filePath, numJobs))
+            
+        
+def readObservations(filePath):
+    return _processFile(filePath, lambda format: format.readObservations(filePath))
             
         
 class DocumentFileFormat(object):
     
     extensionName = None
     
+    probePriority = 0
+    '''
+    file format probe priority. Formats with higher priorities are asked to recognize
+    files before ones with lower priorities.
+    '''
+    
+    isCache = False
+    '''
+    `True` if and only if this format reads documents from caches of other files.
+    A cache format must implement `getSourceState(filePath)` and
+    `writeCache(document, filePath, sourceState)` methods.
+    '''
+    
     # TODO: Handle Unicode. How should we indicate encoding in Maka data files?
     
     def isFileRecognized(self, filePath):
         raise NotImplementedError()
     
-    def readDocument(self, filePath):
+    # The `numJobs` argument of the following methods is the maximum number of
+    # processes with which to parse the document, or `None` to let the document
+    # format decide. Formats that do not parse documents ignore it.
+    
+    def readDocument(self, filePath, numJobs=None):
+        raise NotImplementedError()
+    
+    def validateDocument(self, filePath, numJobs=None):
+        # By default, a format can only find the first problem with a document,
+        # and raises an exception for it. A cache is valid if it can be read.
+        return (self.readDocument(filePath, numJobs), [])
+    
+    def readLazyDocument(self, filePath):
+        # By default, a format reads all of a document's observations up front.
+        return self.readDocument(filePath)
+    
+    def readObservations(self, filePath):
         raise NotImplementedError()
     
     def writeDocument(self, document, filePath):
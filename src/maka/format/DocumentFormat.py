@@ -10,7 +10,15 @@ class DocumentFormat(object):
         raise NotImplementedError()
     
     
-    def parseDocument(self, lines, startLineNum):
+    def parseDocument(self, lines, startLineNum, numJobs=None):
+        raise NotImplementedError()
+    
+    
+    def parseDocumentIncrementally(self, lines, startLineNum):
+        raise NotImplementedError()
+    
+    
+    def validateDocument(self, lines, startLineNum, numJobs=None):
         raise NotImplementedError()
 
 
@@ -22,5 +30,6 @@ class DocumentFormat(object):
         return self.getObservationFormat(obs.__class__.__name__).formatObservation(obs)
 
 
-    # TODO: Add parseObservation method?
+    def parseObservation(self, line):
+        raise NotImplementedError()
     
\ No newline at end of file
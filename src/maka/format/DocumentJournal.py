@@ -0,0 +1,520 @@
+'''
+Module containing `DocumentJournal` class.
+
+A document journal is an append-only sidecar file that records the edits of a
+document saved to a file, so that saving the document costs time proportional to
+the size of the edits made since the last save rather than to the size of the
+document. The document file and its journal together hold the saved state of the
+document. The journal is periodically *compacted*, i.e. the document is written to
+its file in full and the journal emptied.
+
+Since edits are appended to the journal as they are made, including unsaved ones,
+the journal also allows recovery of unsaved edits after a crash.
+
+Since a saved document is not all in its file, `DocumentFileFormat.readDocument`
+applies the saved edits of a file's journal to the documents it reads, so that
+other readers of the file, such as the Maka command line tool, see the saved
+document.
+
+A journal file comprises a header followed by entries. The header identifies the
+state of the document file to which the journal applies:
+
+    maka journal 1
+    base <document file size> <document file modification time in nanoseconds>
+
+Each entry is either an edit entry:
+
+    edit <start index> <end index> <number of lines>
+    <formatted observation>
+    ...
+
+or a save entry, which marks the point in the journal at which the document was
+saved:
+
+    save
+
+An incomplete entry at the end of a journal, for example one that was being
+written when the application crashed, is ignored.
+
+A journal whose header does not match its document file is *stale*. A journal
+becomes stale if another program changes the document file, or if the application
+crashes while compacting the journal, after writing the document file but before
+starting the new journal. In the latter case, the saved edits of the journal are
+already in the document file. The edits of a stale journal are never applied.
+'''
+
+
+
+
+import os
+
+from maka.format.DocumentFileFormat import FileFormatError
+import maka.format.DocumentFileFormat as DocumentFileFormat
+import maka.util.FileUtils as FileUtils
+
+
+_JOURNAL_FILE_NAME_SUFFIX = '.journal'
+_HEADER_LINE = 'maka journal 1'
+_BASE_PREFIX = 'base '
+_EDIT_PREFIX = 'edit '
+_SAVE_LINE = 'save'
+_STALE_JOURNAL_FILE_NAME_SUFFIX = '.stale'
+
+_DEFAULT_MAX_NUM_ENTRIES = 1000
+
+
+def getJournalFilePath(filePath):
+    return filePath + _JOURNAL_FILE_NAME_SUFFIX
+
+
+def journalExists(filePath):
+    return os.path.exists(getJournalFilePath(filePath))
+
+
+def isJournalStale(filePath):
+    
+    '''
+    Checks whether the journal of a document file is stale.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the document file.
+    
+    :Returns:
+        `True` if the journal does not match the document file, or `False` if
+        it does.
+    '''
+    
+    journalFilePath = getJournalFilePath(filePath)
+    
+    with open(journalFilePath, encoding='utf-8', newline='\n') as file:
+        
+        try:
+            _checkHeader(file, filePath, journalFilePath)
+        except FileFormatError:
+            return True
+        
+    return False
+
+
+def deleteJournal(filePath):
+    os.remove(getJournalFilePath(filePath))
+
+
+def setAsideJournal(filePath):
+    
+    '''
+    Renames the journal of a document file, so that it is kept but is no longer
+    the file's journal.
+    
+    The journal is renamed by appending `.stale` and, if necessary to make the
+    name unique, a number to its name.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the document file.
+    
+    :Returns:
+        the new path of the journal.
+    '''
+    
+    journalFilePath = getJournalFilePath(filePath)
+    newFilePath = journalFilePath + _STALE_JOURNAL_FILE_NAME_SUFFIX
+    
+    i = 1
+    while os.path.exists(newFilePath):
+        i += 1
+        newFilePath = '{:s}{:s}.{:d}'.format(journalFilePath, _STALE_JOURNAL_FILE_NAME_SUFFIX, i)
+        
+    os.rename(journalFilePath, newFilePath)
+    
+    return newFilePath
+
+
+def applyJournal(document):
+    
+    '''
+    Applies the saved edits of the journal of a document's file to the document.
+    
+    The document must have just been read from its file. The saved edits are
+    applied to its observations directly rather than as edits, so they cannot be
+    undone. A stale journal is ignored, since its edits are either already in the
+    document file or do not apply to it.
+    
+    :Parameters:
+        document : `Document`
+            the document read from its file.
+    
+    :Returns:
+        `True` if the document's file has a journal that is not stale, or
+        `False` otherwise.
+    
+    :Raises FileFormatError: if the journal is not a valid journal.
+    '''
+    
+    filePath = document.filePath
+    
+    if not journalExists(filePath) or isJournalStale(filePath):
+        return False
+    
+    savedEntries, _ = _readJournal(filePath, document.documentFormat)
+    _replay(savedEntries, document.observations, filePath)
+    
+    return True
+
+
+class DocumentJournal(object):
+    
+    
+    '''
+    Journal of the edits of a document saved to a file.
+    
+    A journal records the edits of its document from the time it is started until it
+    is closed. The document must have a file path, a file format, and a document
+    format.
+    '''
+    
+    
+    def __init__(self, document, maxNumEntries=_DEFAULT_MAX_NUM_ENTRIES):
+        
+        '''
+        Initializes this journal.
+        
+        :Parameters:
+            document : `Document`
+                the document whose edits to record.
+            
+            maxNumEntries : `int`
+                the number of journal entries at which `save` compacts the journal.
+        
+        :Raises ValueError: if the document has no file path or no document format.
+        '''
+        
+        super(DocumentJournal, self).__init__()
+        
+        if document.filePath is None:
+            raise ValueError('Cannot journal document that has no file path.')
+        
+        if document.documentFormat is None:
+            raise ValueError('Cannot journal document that has no document format.')
+        
+        self._document = document
+        self._maxNumEntries = maxNumEntries
+        self._file = None
+        self._numEntries = 0
+    
+    
+    @property
+    def document(self):
+        return self._document
+    
+    
+    @property
+    def filePath(self):
+        return getJournalFilePath(self._document.filePath)
+    
+    
+    @property
+    def numEntries(self):
+        return self._numEntries
+    
+    
+    def start(self):
+        
+        '''
+        Starts recording document edits in a new, empty journal.
+        
+        The document must have been saved to its file in full, and any existing
+        journal for the file is replaced.
+        '''
+        
+        self._openNewJournal()
+        self._document.addEditListener(self._onDocumentEdit)
+    
+    
+    def _openNewJournal(self):
+        
+        if self._file is not None:
+            self._file.close()
+        
+        # We write the header of the new journal atomically, so that the old
+        # journal is replaced by the new one rather than truncated. Otherwise a
+        # crash could leave a journal without a header.
+        FileUtils.writeFileAtomically(
+            self.filePath, _formatHeader(self._document.filePath).encode('utf-8'))
+        
+        self._file = open(self.filePath, 'a', encoding='utf-8', newline='\n')
+        self._sync()
+        
+        self._numEntries = 0
+    
+    
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    
+    def _onDocumentEdit(self, edit):
+        
+        # The edit has been performed, so its new observations are in the document,
+        # which may already have formatted them.
+        startIndex = edit.startIndex
+        lines = self._document.getFormattedObservations(
+            startIndex, startIndex + edit.numNewObservations)
+        
+        self._file.write('{:s}{:d} {:d} {:d}\n'.format(
+            _EDIT_PREFIX, edit.startIndex, edit.endIndex, len(lines)))
+        self._file.write(''.join(line + '\n' for line in lines))
+        
+        # We flush but do not sync here, so that unsaved edits survive an application
+        # crash but do not cost a disk write each.
+        self._file.flush()
+        
+        self._numEntries += 1
+    
+    
+    def save(self):
+        
+        '''
+        Saves the document by appending a save entry to this journal.
+        
+        The journal is compacted instead if it has at least the maximum number of
+        entries.
+        '''
+        
+        if self._numEntries >= self._maxNumEntries:
+            self.compact()
+        
+        else:
+            self._file.write(_SAVE_LINE + '\n')
+            self._sync()
+            self._numEntries += 1
+            self._document.markSaved()
+    
+    
+    def compact(self):
+        
+        '''
+        Saves the document by writing it to its file in full and emptying this journal.
+        
+        The document file is written before the journal is emptied. If the
+        application crashes in between, the journal is stale, and the document
+        file holds the saved document.
+        '''
+        
+        document = self._document
+        document.fileFormat.writeDocument(document, document.filePath, document.documentFormat)
+        document.markSaved()
+        
+        self._openNewJournal()
+    
+    
+    def close(self):
+        
+        '''
+        Stops recording document edits and deletes this journal.
+        
+        Any edits saved in the journal are first folded into the document file. Edits
+        that have not been saved are discarded.
+        '''
+        
+        self._document.removeEditListener(self._onDocumentEdit)
+        
+        self._file.close()
+        self._file = None
+        
+        if self._document.saved:
+            if self._numEntries != 0:
+                document = self._document
+                document.fileFormat.writeDocument(
+                    document, document.filePath, document.documentFormat)
+            os.remove(self.filePath)
+        
+        else:
+            foldJournal(self._document.filePath)
+
+
+def _formatHeader(filePath):
+    size, modificationTime = _getFileState(filePath)
+    return '{:s}\n{:s}{:d} {:d}\n'.format(_HEADER_LINE, _BASE_PREFIX, size, modificationTime)
+
+
+def _getFileState(filePath):
+    status = os.stat(filePath)
+    return (status.st_size, status.st_mtime_ns)
+
+
+def foldJournal(filePath):
+    
+    '''
+    Folds the saved edits of the journal of a document file into the file.
+    
+    The journal is deleted after its saved edits are folded into the document file.
+    Unsaved edits are discarded.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the document file.
+    
+    :Raises FileFormatError: if the journal is stale or is not a valid journal.
+    '''
+    
+    document = DocumentFileFormat.readDocument(filePath, applyJournal=False)
+    savedEntries, _ = _readJournal(filePath, document.documentFormat)
+    
+    if len(savedEntries) != 0:
+        _replay(savedEntries, document.observations, filePath)
+        document.fileFormat.writeDocument(document, filePath, document.documentFormat)
+    
+    os.remove(getJournalFilePath(filePath))
+
+
+def recoverDocument(filePath, maxNumEntries=_DEFAULT_MAX_NUM_ENTRIES):
+    
+    '''
+    Recovers a document from a document file and its journal.
+    
+    The saved edits of the journal are folded into the document file, and the
+    unsaved edits are applied to the recovered document as ordinary, undoable
+    edits. The journal of the recovered document is started before the unsaved
+    edits are applied, so that it records them again.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the document file.
+        
+        maxNumEntries : `int`
+            the number of journal entries at which the journal is compacted.
+    
+    :Returns:
+        the recovered document and its journal, a `(Document, DocumentJournal)` pair.
+    
+    :Raises FileFormatError: if the journal is stale or is not a valid journal.
+    '''
+    
+    document = DocumentFileFormat.readDocument(filePath, applyJournal=False)
+    savedEntries, unsavedEntries = _readJournal(filePath, document.documentFormat)
+    
+    if len(savedEntries) != 0:
+        _replay(savedEntries, document.observations, filePath)
+        document.fileFormat.writeDocument(document, filePath, document.documentFormat)
+    
+    journal = DocumentJournal(document, maxNumEntries)
+    journal.start()
+    
+    for startIndex, endIndex, observations in unsavedEntries:
+        _checkEntryIndices(startIndex, endIndex, len(document.observations), filePath)
+        document.edit('Recovered Edit', startIndex, endIndex, observations)
+    
+    return (document, journal)
+
+
+def _readJournal(filePath, documentFormat):
+    
+    '''
+    Reads the journal of a document file.
+    
+    :Returns:
+        a pair of lists of `(startIndex, endIndex, observations)` edit entries. The
+        first list contains the saved edits and the second list the unsaved ones.
+    '''
+    
+    journalFilePath = getJournalFilePath(filePath)
+    
+    with open(journalFilePath, encoding='utf-8', newline='\n') as file:
+        
+        _checkHeader(file, filePath, journalFilePath)
+        
+        savedEntries = []
+        entries = []
+        
+        for entry in _readEntries(file, documentFormat, journalFilePath):
+            if entry is None:
+                savedEntries.extend(entries)
+                entries = []
+            else:
+                entries.append(entry)
+    
+    return (savedEntries, entries)
+
+
+def _checkHeader(file, filePath, journalFilePath):
+    
+    expectedHeader = _formatHeader(filePath)
+    header = file.readline() + file.readline()
+    
+    if not header.startswith(_HEADER_LINE + '\n'):
+        raise FileFormatError(
+            'File "{:s}" does not start with Maka journal header.'.format(journalFilePath))
+    
+    if header != expectedHeader:
+        raise FileFormatError(
+            'Journal "{:s}" does not match current contents of file "{:s}".'.format(
+                journalFilePath, filePath))
+
+
+def _readEntries(file, documentFormat, journalFilePath):
+    
+    '''
+    Generates the complete entries of a journal file.
+    
+    Yields `None` for a save entry and a `(startIndex, endIndex, observations)`
+    tuple for an edit entry. Stops at the first incomplete entry.
+    '''
+    
+    while True:
+        
+        line = file.readline()
+        
+        if not line.endswith('\n'):
+            # end of file or incomplete line
+            return
+        
+        line = line[:-1]
+        
+        if line == _SAVE_LINE:
+            yield None
+        
+        elif line.startswith(_EDIT_PREFIX):
+            
+            try:
+                startIndex, endIndex, numLines = \
+                    [int(s) for s in line[len(_EDIT_PREFIX):].split()]
+            except ValueError:
+                _raiseJournalError(line, journalFilePath)
+            
+            lines = [file.readline() for _ in range(numLines)]
+            
+            if not all(l.endswith('\n') for l in lines):
+                # incomplete entry
+                return
+            
+            try:
+                observations = documentFormat.parseDocument([l[:-1] for l in lines])
+            except ValueError as e:
+                raise FileFormatError(
+                    'Could not parse edit of journal "{:s}": {:s}'.format(
+                        journalFilePath, str(e)))
+            
+            yield (startIndex, endIndex, observations)
+        
+        else:
+            _raiseJournalError(line, journalFilePath)
+
+
+def _raiseJournalError(line, journalFilePath):
+    raise FileFormatError(
+        'Bad entry "{:s}" in journal "{:s}".'.format(line, journalFilePath))
+
+
+def _replay(entries, observations, filePath):
+    for startIndex, endIndex, newObservations in entries:
+        _checkEntryIndices(startIndex, endIndex, len(observations), filePath)
+        observations[startIndex:endIndex] = [obs.freeze() for obs in newObservations]
+
+
+def _checkEntryIndices(startIndex, endIndex, maxIndex, filePath):
+    if not 0 <= startIndex <= endIndex <= maxIndex:
+        raise FileFormatError(
+            'Bad edit indices {:d} and {:d} in journal "{:s}".'.format(
+                startIndex, endIndex, getJournalFilePath(filePath)))
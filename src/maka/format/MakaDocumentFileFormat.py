@@ -1,7 +1,9 @@
 from maka.data.Document import Document
+from maka.data.LazyDocument import LazyDocument
 from maka.format.DocumentFileFormat import (
     DocumentFileFormat, FileFormatError, UnrecognizedFileFormatError)
 import maka.util.ExtensionManager as ExtensionManager
+import maka.util.FileUtils as FileUtils
 
 
 # For the time being we retain "aardvark data" rather than switching to "maka data"
@@ -38,21 +40,24 @@ class MakaDocumentFileFormat(DocumentFileFormat):
                 return True
         
         
-    def readDocument(self, filePath):
+    def readDocument(self, filePath, numJobs=None):
         
         with _openTextFile(filePath) as file:
             
             _checkFileHeader(file, filePath)
             (docFormat, lineNum) = _getDocFormat(file, filePath)
-                
-            lines = file.read().splitlines()
-        
+            
+            # We read all of the lines before parsing them so that the document
+            # format can parse a large document in parallel.
+            lines = [line.rstrip('\n') for line in file]
+            
         try:
-            observations = docFormat.parseDocument(lines, lineNum)
+            observations = docFormat.parseDocument(lines, lineNum, numJobs)
+            
         except ValueError as e:
             e.filePath = filePath
             raise
-            
+        
         document = Document(
             observations,
             documentFormat=docFormat,
@@ -62,17 +67,122 @@ class MakaDocumentFileFormat(DocumentFileFormat):
         return document
     
     
-    def writeDocument(self, document, filePath, documentFormat):
+    def validateDocument(self, filePath, numJobs=None):
         
-        # TODO: Handle I/O exceptions.
-        with open(filePath, 'w') as file:
+        '''
+        Reads a document, continuing past observations that cannot be parsed.
+        
+        See `SimpleDocumentFormat.validateDocument` for details.
+        
+        :Returns:
+            a pair `(document, diagnostics)`, where `document` contains the
+            observations of the file that could be parsed and `diagnostics` is a
+            list of `Diagnostic` instances describing the lines that could not.
+            
+        :Raises FileFormatError:
+            if the file header is missing or invalid.
+        '''
+        
+        with _openTextFile(filePath) as file:
+            _checkFileHeader(file, filePath)
+            (docFormat, lineNum) = _getDocFormat(file, filePath)
+            lines = [line.rstrip('\n') for line in file]
+            
+        (observations, diagnostics) = docFormat.validateDocument(lines, lineNum, numJobs)
+        
+        document = Document(
+            observations,
+            documentFormat=docFormat,
+            fileFormat=self,
+            filePath=filePath)
+        
+        return (document, diagnostics)
+    
+    
+    def readLazyDocument(self, filePath, cacheSize=None):
+        
+        '''
+        Reads a document whose observations are parsed on demand.
+        
+        See the `LazyDocument` class for details. If the file's lines are not
+        terminated with either '\\n' or '\\r\\n', the file cannot be memory mapped
+        by line, and this method reads the document with `readDocument` instead.
+        
+        :Parameters:
+            cacheSize : `int` or `None`
+                the maximum number of parsed observations the document should keep
+                in memory, or `None` for the default.
+        '''
+        
+        with _openTextFile(filePath) as file:
+            _checkFileHeader(file, filePath)
+            (docFormat, lineNum) = _getDocFormat(file, filePath)
+            
+        with open(filePath, 'rb') as file:
+            
+            headerLines = [file.readline() for _ in range(lineNum)]
             
-            _writeHeader(file, documentFormat)
+            if not all(line.endswith(b'\n') for line in headerLines):
+                return self.readDocument(filePath)
             
-            # TODO: Handle format exceptions.
-            file.write(documentFormat.formatDocument(document.observations))
+            kwds = {} if cacheSize is None else {'cacheSize': cacheSize}
+            
+            return LazyDocument(
+                file, file.tell(), lineNum, _getEncoding(), documentFormat=docFormat,
+                fileFormat=self, filePath=filePath, **kwds)
+    
+    
+    def readObservations(self, filePath):
+        
+        '''
+        Reads the observations of a document file one at a time.
+        
+        Unlike `readDocument`, this generator reads and parses the file one line
+        at a time, so it requires only constant memory regardless of file size.
+        
+        :Returns:
+            an iterator over `(lineNum, observation)` pairs, one for each observation
+            of the file, where `lineNum` is the one-based file line number of the
+            observation.
+            
+        :Raises ValueError:
+            if a line of the file cannot be parsed. The `lineNum` and `filePath`
+            attributes of the exception are set to the line number and file path.
+        '''
+        
+        with _openTextFile(filePath) as file:
+            
+            _checkFileHeader(file, filePath)
+            (docFormat, lineNum) = _getDocFormat(file, filePath)
+            
+            for pair in _parseLines(docFormat, file, lineNum, filePath):
+                yield pair
+    
+    
+    def writeDocument(self, document, filePath, documentFormat):
+        
+        # TODO: Handle format exceptions.
+        text = _formatHeader(documentFormat) + _formatObservations(document, documentFormat)
+        
+        # We write the file atomically so that a crash during a save cannot leave a
+        # partially written file, and so that the file of a lazy document, which is
+        # memory mapped, is replaced rather than overwritten.
+        # TODO: Handle I/O exceptions.
+        FileUtils.writeFileAtomically(filePath, text.encode(_getEncoding()))
 
             
+def _formatObservations(document, documentFormat):
+    
+    if documentFormat is document.documentFormat:
+        # document may already have formatted some or all of its observations
+        
+        lines = document.getFormattedObservations(0, len(document.observations))
+        return ''.join(line + '\n' for line in lines)
+    
+    else:
+        return documentFormat.formatDocument(document.observations)
+    
+    
 def _checkFileHeader(file, filePath):
     if file.readline().strip() != _FIRST_HEADER_LINE:
         raise UnrecognizedFileFormatError(
@@ -99,12 +209,26 @@ def _getDocFormat(file, filePath):
         _raiseFileFormatError('Format specification', 2, filePath)
 
                 
+def _parseLines(docFormat, file, lineNum, filePath):
+    
+    lines = (line.rstrip('\n') for line in file)
+    
+    try:
+        for pair in docFormat.parseDocumentIncrementally(lines, lineNum):
+            yield pair
+            
+    except ValueError as e:
+        e.filePath = filePath
+        raise
+
+                
 def _openTextFile(filePath):  
     
-    # We open the file with universal newlines support so that we will correctly
-    # recognize lines whether they are terminated with '\n' (the Unix convention),
-    # '\r' (the old Macintosh convention), or '\r\n' (the Windows convention).
-    return open(filePath, 'U')  
+    # We open the file with universal newlines support (the default for text files
+    # in Python 3) so that we will correctly recognize lines whether they are
+    # terminated with '\n' (the Unix convention), '\r' (the old Macintosh
+    # convention), or '\r\n' (the Windows convention).
+    return open(filePath, newline=None)  
 
 
 def _raiseFileFormatError(prefix, lineNum, filePath):
@@ -118,14 +242,15 @@ def _getDocFormatAux(name, messagePrefix, lineNum, filePath):
     if name == '':
         _raiseFileFormatError(messagePrefix + ' name', lineNum, filePath)
 
-    formatClass = _getExtension('DocumentFormat', name, 'document format', lineNum, filePath)
+    docFormat = _getExtension('DocumentFormat', name, 'document format', lineNum, filePath)
         
-    return (formatClass(), lineNum)
+    return (docFormat, lineNum)
 
 
 def _getExtension(typeName, extensionName, description, lineNum, filePath):
     
-    extension = ExtensionManager.getExtension(typeName, extensionName)
+    # Document formats take a while to create, so we use shared instances.
+    extension = ExtensionManager.getExtensionInstance(typeName, extensionName)
     
     if extension is None:
         raise ValueError(
@@ -136,6 +261,16 @@ def _getExtension(typeName, extensionName, description, lineNum, filePath):
         return extension
 
 
-def _writeHeader(file, docFormat):
+def _formatHeader(docFormat):
     formatLine = '{:s}"{:s}"'.format(_GRAMMAR_PREFIX, docFormat.extensionName)
-    file.write('{:s}\n{:s}\n\n'.format(_FIRST_HEADER_LINE, formatLine))
+    return '{:s}\n{:s}\n\n'.format(_FIRST_HEADER_LINE, formatLine)
+
+
+def _getEncoding():
+    
+    # We import `locale` here rather than at the top of this module since it
+    # takes a while to import and is not needed to read documents eagerly.
+    import locale
+    
+    # the encoding `open` uses for text files by default
+    return locale.getpreferredencoding(False)
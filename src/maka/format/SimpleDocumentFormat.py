@@ -3,12 +3,15 @@
 from collections import defaultdict
 import calendar
 import datetime
+import os
 import re
 
+from maka.format.Diagnostic import Diagnostic
 from maka.format.DocumentFormat import DocumentFormat
 from maka.format.FieldFormat import FieldFormat
 from maka.format.ObservationFormat import ObservationFormat
 from maka.util.TokenUtils import NONE_TOKEN as FORMATTED_NONE
+import maka.util.ExtensionManager as ExtensionManager
 import maka.util.TokenUtils as TokenUtils
 
 
@@ -22,6 +25,24 @@ _EDITING_NONE = ''
 _QUOTABLE_CHARS_RE = re.compile(r'[\s\\"]')
 
 
+PARALLEL_PARSE_MIN_NUM_LINES = 100000
+'''
+The minimum number of lines for which `SimpleDocumentFormat.parseDocument` parses
+in parallel when the number of jobs is not specified.
+'''
+
+_MIN_PARSE_CHUNK_SIZE = 10000
+'''the minimum number of lines parsed by one parallel parse task.'''
+
+_NUM_PARSE_CHUNKS_PER_JOB = 4
+'''
+the number of parallel parse tasks per worker process.
+
+Splitting the lines into more tasks than there are processes balances the load
+when some chunks of a document take longer to parse than others.
+'''
+
+
 class StringFormat(FieldFormat):
     
     '''
@@ -391,6 +412,11 @@ class SimpleObservationFormat(ObservationFormat):
         
         self._fieldFormats = dict((name, format) for name, format in self._items if name != '')
         
+        # Compile functions specialized for this format's items, so we needn't interpret
+        # the items for every observation we format or parse.
+        self._formatObservation = _compileFormatFunction(self._items)
+        self._parseTokensQuickly = _compileParseFunction(self._items, obsClass)
+        
         
     @property
     def items(self):
@@ -403,7 +429,7 @@ class SimpleObservationFormat(ObservationFormat):
     
     
     def formatObservation(self, obs):
-        return ' '.join(_applyObsFormatItem(i, obs) for i in self._items)
+        return self._formatObservation(obs)
     
     
     def parseObservation(self, s):
@@ -412,6 +438,22 @@ class SimpleObservationFormat(ObservationFormat):
         
     def _parseTokens(self, tokens, s):
         
+        if self._parseTokensQuickly is not None:
+            
+            try:
+                return self._parseTokensQuickly(tokens)
+            
+            except ValueError:
+                # The compiled parse function does not construct informative error
+                # messages, so we parse the tokens again the slow way to raise an
+                # exception with the appropriate message.
+                pass
+            
+        return self._parseTokensSlowly(tokens, s)
+        
+        
+    def _parseTokensSlowly(self, tokens, s):
+        
         items = self._items
         
         if len(tokens) != len(items):
@@ -420,7 +462,7 @@ class SimpleObservationFormat(ObservationFormat):
                  '({:d} instead of {:d}).').format(
                     s, self.observationClass.__name__, len(tokens), len(items)))
             
-        parsedTokens = [self._parseToken(tokens[i], item, name)
+        parsedTokens = [self._parseToken(tokens, i, item, name, s)
                          for i, (name, item) in enumerate(items)]
         
         fields = dict((name, value) for (name, value) in parsedTokens if name != '')
@@ -428,11 +470,13 @@ class SimpleObservationFormat(ObservationFormat):
         return self.observationClass(**fields)
     
     
-    def _parseToken(self, token, item, name):
+    def _parseToken(self, tokens, i, item, name, s):
         try:
-            return (name, item.parse(token))
+            return (name, item.parse(tokens[i]))
         except ValueError as e:
-            raise ValueError('For observation field "{:s}": {:s}'.format(name, str(e)))
+            e = ValueError('For observation field "{:s}": {:s}'.format(name, str(e)))
+            e.column = TokenUtils.getTokenColumns(s)[i]
+            raise e
     
     
     def getFieldFormat(self, fieldName):
@@ -453,14 +497,18 @@ class is used to format the named observation field, and each literal is include
 
 def _parseObsFormatString(formatString, obsClass, fieldFormats):
     
-    try:
-        items = [_parseObsFormatItem(item, obsClass, fieldFormats)
-                 for item in formatString.split()]
+    items = []
+    
+    for item in formatString.split():
         
-    except ValueError as e:
-        raise ValueError(
-            'Error parsing item "{:s}" of observation format "{:s}": {:s}'.format(
-                item, formatString, str(e)))
+        try:
+            items.append(_parseObsFormatItem(item, obsClass, fieldFormats))
+            
+        except ValueError as e:
+            raise ValueError(
+                'Error parsing item "{:s}" of observation format "{:s}": {:s}'.format(
+                    item, formatString, str(e)))
+            
     
     keyIndices = [
         i for i, (_, item) in enumerate(items) if isinstance(item, Literal) and item.isKey]
@@ -533,14 +581,121 @@ def _getFormatClass(fieldClass, fieldFormats):
             'No format class found for field type "{:s}".'.format(fieldClass.__name__))
         
         
-def _applyObsFormatItem(item, obs):
+def _compileFormatFunction(items):
     
-    (name, item) = item
+    '''
+    Compiles a function that formats an observation according to the specified items.
     
-    if name == '':
-        return item.format()
-    else:
-        return item.format(getattr(obs, name))
+    The body of the compiled function is a single expression that concatenates the
+    formatted field values with the literal text that separates them, for example:
+    
+        _format0(obs.observationNum) + ' ' + _format1(obs.date) + ' Fix Dec ' + ...
+        
+    where `_format0`, `_format1`, and so on are the `format` methods of the field formats.
+    '''
+    
+    namespace = {}
+    terms = []
+    text = ''
+    
+    for i, (name, item) in enumerate(items):
+        
+        if i != 0:
+            text += ' '
+            
+        if name == '':
+            # literal
+            
+            text += item.text
+            
+        else:
+            # field
+            
+            if len(text) != 0:
+                terms.append(repr(text))
+                text = ''
+                
+            formatName = '_format{:d}'.format(i)
+            namespace[formatName] = item.format
+            terms.append('{:s}(obs.{:s})'.format(formatName, name))
+            
+    if len(text) != 0 or len(terms) == 0:
+        terms.append(repr(text))
+        
+    source = 'def formatObservation(obs):\n    return ' + ' + '.join(terms)
+    
+    return _compileFunction(source, namespace, 'formatObservation')
+
+
+def _compileParseFunction(items, obsClass):
+    
+    '''
+    Compiles a function that creates an observation from tokens according to the
+    specified items.
+    
+    The compiled function checks the literal tokens and parses the field tokens
+    inline, for example:
+    
+        def parseTokens(tokens):
+            (t0, t1, t2, t3, t4, t5) = tokens
+            if t3 != 'TheoData' or t4 != 'Dec':
+                raise ValueError()
+            return _obsClass(observationNum=_parse0(t0), date=_parse1(t1), ...)
+            
+    The function raises a `ValueError` without a message if the tokens do not match
+    the items, so the caller should obtain an informative message some other way.
+    
+    :Returns:
+        the compiled function, or `None` if the items cannot be parsed by such a
+        function since some field appears more than once in them.
+    '''
+    
+    names = [name for name, _ in items if name != '']
+    
+    if len(frozenset(names)) != len(names):
+        return None
+    
+    namespace = {'_obsClass': obsClass}
+    tokenNames = []
+    literalTests = []
+    args = []
+    
+    for i, (name, item) in enumerate(items):
+        
+        tokenName = 't{:d}'.format(i)
+        tokenNames.append(tokenName)
+        
+        if name == '':
+            # literal
+            
+            literalTests.append('{:s} != {:s}'.format(tokenName, repr(item.text)))
+            
+        else:
+            # field
+            
+            parseName = '_parse{:d}'.format(i)
+            namespace[parseName] = item.parse
+            args.append('{:s}={:s}({:s})'.format(name, parseName, tokenName))
+            
+    lines = [
+        'def parseTokens(tokens):',
+        '    ({:s},) = tokens'.format(', '.join(tokenNames))
+    ]
+    
+    if len(literalTests) != 0:
+        lines += [
+            '    if {:s}:'.format(' or '.join(literalTests)),
+            '        raise ValueError()'
+        ]
+        
+    lines.append('    return _obsClass({:s})'.format(', '.join(args)))
+    
+    return _compileFunction('\n'.join(lines), namespace, 'parseTokens')
+
+
+def _compileFunction(source, namespace, name):
+    exec(source, namespace)
+    return namespace[name]
                     
             
 class SimpleDocumentFormat(DocumentFormat):
@@ -555,6 +710,10 @@ class SimpleDocumentFormat(DocumentFormat):
         
         super(SimpleDocumentFormat, self).__init__()
         
+        # whether this format is the registered extension of its extension
+        # name, which we determine the first time we need to know
+        self._isRegistered = None
+        
         obsClasses = dict((c.__name__, c) for c in self.documentClass.observationClasses)
         
         # Create map from observation class names to observation formats.
@@ -563,40 +722,184 @@ class SimpleDocumentFormat(DocumentFormat):
              _createObsFormat(className, obsClasses, formatString, self.fieldFormats))
             for className, formatString in self.observationFormats.items())
         
-        # Create list of (keyIndex, keys) pairs and map from keys to observation formats.
-        keySets = defaultdict(set)
-        obsFormats = {}
-        for f in self._obsFormatsByName.values():
-            key = f._items[f._keyIndex][1].text
-            keySets[f._keyIndex].add(key)
-            obsFormats[key] = f
-        self._keySets = [(keyIndex, frozenset(keys)) for keyIndex, keys in keySets.items()]
-        self._keySets.sort(key=lambda x: len(x[1]), reverse=False)
-        self._obsFormatsByKey = obsFormats
+        self._obsFormatsByKey = _createObsFormatDispatchTable(self._obsFormatsByName.values())
         
         
     def formatDocument(self, obsSeq):
         return ''.join([self.formatObservation(obs) + '\n' for obs in obsSeq])
     
     
-    def parseDocument(self, lines, startLineNum=0):
+    def parseDocument(self, lines, startLineNum=0, numJobs=None):
+        
+        '''
+        Parses document lines.
+        
+        Lines can be parsed either serially or, for large documents, in parallel
+        by a pool of worker processes. The results are the same either way,
+        including the line number of the first line that cannot be parsed.
+        Each worker process creates its own instance of this format from the
+        format's extension name, so only formats that are registered with the
+        extension manager are parsed in parallel. Worker processes are spawned
+        rather than forked, since a process forked from a multithreaded process
+        such as the Maka GUI can deadlock on a lock held by another thread.
+        
+        :Parameters:
+            lines : iterable of `str`
+                the lines to parse, without line terminators. Only lists and
+                tuples are parsed in parallel.
+                
+            startLineNum : `int`
+                the number of lines preceding `lines` in the document.
+                
+            numJobs : `int` or `None`
+                the maximum number of worker processes with which to parse the
+                lines, or `None` to parse with one process per CPU when there are
+                at least `PARALLEL_PARSE_MIN_NUM_LINES` lines. One parses the
+                lines serially.
+                
+        :Returns:
+            a list of the parsed observations.
+            
+        :Raises ValueError:
+            if a line cannot be parsed. The `lineNum` attribute of the exception is
+            set to the one-based document line number of the line.
+        '''
+        
+        numJobs = self._getNumParseJobs(lines, numJobs)
+        
+        if numJobs == 1:
+            return [obs for _, obs in self.parseDocumentIncrementally(lines, startLineNum)]
+        
+        else:
+            return _parseDocumentInParallel(
+                self.extensionName, lines, startLineNum, numJobs, False)
+    
+    
+    def validateDocument(self, lines, startLineNum=0, numJobs=None):
+        
+        '''
+        Parses document lines, continuing past lines that cannot be parsed.
+        
+        This method is like `parseDocument`, except that rather than raising an
+        exception for the first line that cannot be parsed it describes every such
+        line with a diagnostic.
+        
+        :Parameters:
+            lines : iterable of `str`
+                the lines to validate, without line terminators.
+                
+            startLineNum : `int`
+                the number of lines preceding `lines` in the document.
+                
+            numJobs : `int` or `None`
+                the maximum number of worker processes with which to validate the
+                lines. See `parseDocument`.
+                
+        :Returns:
+            a pair `(observations, diagnostics)` of lists of the observations
+            of the lines that could be parsed and the `Diagnostic` instances for
+            the lines that could not, both in line order.
+        '''
+        
+        numJobs = self._getNumParseJobs(lines, numJobs)
+        
+        if numJobs != 1:
+            return _parseDocumentInParallel(
+                self.extensionName, lines, startLineNum, numJobs, True)
         
         observations = []
+        diagnostics = []
+        
         lineNum = startLineNum
         
         for line in lines:
             
+            lineNum += 1
+            
             if len(line) > 0:
                 
                 try:
                     observations.append(self._parseObs(line))
+                    
                 except ValueError as e:
-                    e.lineNum = lineNum + 1
-                    raise
+                    diagnostics.append(
+                        Diagnostic(lineNum, getattr(e, 'column', None), str(e)))
+                    
+        return (observations, diagnostics)
+    
+    
+    def _getNumParseJobs(self, lines, numJobs):
+        
+        if not isinstance(lines, (list, tuple)) or not self._isRegisteredExtension():
+            # lines are not a sequence we can split, or worker processes could not
+            # create this format
+            
+            return 1
+        
+        if numJobs is None:
+            
+            if len(lines) < PARALLEL_PARSE_MIN_NUM_LINES:
+                return 1
+            
+            numJobs = os.cpu_count() or 1
+            
+        # We do not start more processes than there are chunks of lines to parse.
+        return max(min(numJobs, len(lines) // _MIN_PARSE_CHUNK_SIZE), 1)
+    
+    
+    def _isRegisteredExtension(self):
+        
+        if self._isRegistered is None:
+            self._isRegistered = ExtensionManager.getExtension(
+                'DocumentFormat', self.extensionName) is self.__class__
+            
+        return self._isRegistered
+    
+    
+    def parseDocumentIncrementally(self, lines, startLineNum=0):
+        
+        '''
+        Parses document lines one at a time.
+        
+        This generator consumes `lines` lazily, so it can parse a document of any
+        size in constant memory when `lines` is itself an iterator, for example a
+        file object.
+        
+        :Parameters:
+            lines : iterable of `str`
+                the lines to parse, without line terminators.
+                
+            startLineNum : `int`
+                the number of lines preceding `lines` in the document.
                 
+        :Returns:
+            an iterator over `(lineNum, observation)` pairs, one for each nonempty
+            line, where `lineNum` is the one-based document line number.
+            
+        :Raises ValueError:
+            if a line cannot be parsed. The `lineNum` attribute of the exception is
+            set to the one-based document line number of the line.
+        '''
+        
+        lineNum = startLineNum
+        
+        for line in lines:
+            
             lineNum += 1
             
-        return observations
+            if len(line) > 0:
+                
+                try:
+                    obs = self._parseObs(line)
+                except ValueError as e:
+                    e.lineNum = lineNum
+                    raise
+                
+                yield (lineNum, obs)
+    
+    
+    def parseObservation(self, line):
+        return self._parseObs(line)
     
     
     def _parseObs(self, s):
@@ -604,14 +907,15 @@ class SimpleDocumentFormat(DocumentFormat):
         tokens = TokenUtils.tokenizeString(s)
         n = len(tokens)
         
-        for i, key_set in self._keySets:
+        for i, obsFormats in self._obsFormatsByKey:
             
             # In the following, we assume that if a token matches a key, the token
             # is a literal.
             
-            if i < n and tokens[i] in key_set:
-                obsFormat = self._obsFormatsByKey[tokens[i]]
-                return obsFormat._parseTokens(tokens, s)
+            if i < n:
+                obsFormat = obsFormats.get(tokens[i])
+                if obsFormat is not None:
+                    return obsFormat._parseTokens(tokens, s)
             
         # If we get here, no key token was found.
         raise ValueError('Observation type could not be determined.')
@@ -625,6 +929,90 @@ class SimpleDocumentFormat(DocumentFormat):
                 'Could not find format for observation type "{:s}".'.format(obsClassName))
         
 
+def _parseDocumentInParallel(extensionName, lines, startLineNum, numJobs, validate):
+    
+    # We import this here rather than at the top of this module since it takes
+    # a while and is needed only for large documents.
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    
+    numChunks = numJobs * _NUM_PARSE_CHUNKS_PER_JOB
+    chunkSize = max(-(-len(lines) // numChunks), _MIN_PARSE_CHUNK_SIZE)
+    
+    # We spawn rather than fork the worker processes since the parsing process
+    # may have other threads, for example if it is the Maka GUI.
+    context = multiprocessing.get_context('spawn')
+    
+    with ProcessPoolExecutor(numJobs, mp_context=context) as executor:
+        
+        futures = [
+            executor.submit(
+                _parseChunk, extensionName, lines[i:i + chunkSize], startLineNum + i,
+                validate)
+            for i in range(0, len(lines), chunkSize)]
+        
+        observations = []
+        diagnostics = []
+        
+        try:
+            
+            # We collect the results in order, so if more than one chunk fails to
+            # parse we raise the error of the first one, just as a serial parse would.
+            for future in futures:
+                
+                if validate:
+                    chunkObservations, chunkDiagnostics = future.result()
+                    observations += chunkObservations
+                    diagnostics += chunkDiagnostics
+                    
+                else:
+                    observations += future.result()
+                
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        
+    return (observations, diagnostics) if validate else observations
+
+
+def _parseChunk(extensionName, lines, startLineNum, validate):
+    
+    # A worker process creates the document format the first time it parses a
+    # chunk, and reuses it for later chunks.
+    docFormat = ExtensionManager.getExtensionInstance('DocumentFormat', extensionName)
+    
+    if validate:
+        return docFormat.validateDocument(lines, startLineNum, numJobs=1)
+    else:
+        return docFormat.parseDocument(lines, startLineNum, numJobs=1)
+
+
+def _createObsFormatDispatchTable(obsFormats):
+    
+    '''
+    Creates a table for looking up observation formats by key.
+    
+    The table is a tuple of `(keyIndex, obsFormats)` pairs, where `obsFormats`
+    is a dictionary mapping keys to the observation formats whose keys are
+    at token index `keyIndex`. To find the format for a tokenized observation,
+    we look up the token at each key index in the corresponding dictionary,
+    so the time required does not grow with the number of observation formats.
+    The pairs are ordered by increasing number of keys.
+    '''
+    
+    obsFormatsByKey = defaultdict(dict)
+    
+    for f in obsFormats:
+        key = f._items[f._keyIndex][1].text
+        obsFormatsByKey[f._keyIndex][key] = f
+        
+    table = list(obsFormatsByKey.items())
+    table.sort(key=lambda x: len(x[1]))
+    
+    return tuple(table)
+
+
 def _createObsFormat(obsClassName, obsClasses, formatString, fieldFormats):
     
     try:
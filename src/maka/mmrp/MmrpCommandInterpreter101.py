@@ -20,6 +20,7 @@ from maka.mmrp.MmrpDocument101 import (
 from maka.util.SerialNumberGenerator import SerialNumberGenerator
 import maka.device.DeviceManager as DeviceManager
 import maka.util.AngleUtils as AngleUtils
+import maka.util.FutureUtils as FutureUtils
 
 
 class MmrpCommandInterpreter101(SimpleCommandInterpreter):
@@ -40,8 +41,7 @@ class MmrpCommandInterpreter101(SimpleCommandInterpreter):
         self._commentIdGenerator = _createCommentIdGenerator(doc)
         
         self._theodolite = None
-        self._savedDeclination = None
-        self._savedAzimuth = None
+        self._savedTheodoliteAngles = (None, None)
         
         
     def _createCommands(self):
@@ -84,21 +84,81 @@ class MmrpCommandInterpreter101(SimpleCommandInterpreter):
     
     
     def _getTheodoliteAngles(self):
+        
+        '''
+        Gets the current theodolite angles.
+        
+        If the theodolite is polling and its latest reading is fresh, we use
+        that reading. Otherwise we read the theodolite asynchronously.
+        
+        :Returns:
+            either a `(declination, azimuth)` pair of angles in degrees or a
+            `Future` whose result is such a pair.
+        '''
+        
         try:
-            return self._getTheodolite().readAngles()
+            
+            theodolite = self._getTheodolite()
+            
+            angles = theodolite.getPolledAngles()
+            
+            if angles is None:
+                future = theodolite.readAnglesAsync()
+                
         except Exception as e:
-            raise CommandInterpreterError('Theodolite read failed. ' + str(e))
+            _handleTheodoliteError(e)
+            
+        if angles is not None:
+            return _toDegreesPair(angles)
+        else:
+            return FutureUtils.transformFuture(future, _getDegrees)
         
         
     def _getAndSaveTheodoliteAngles(self):
-        v, h = self._getTheodoliteAngles()
-        self._savedDeclination = AngleUtils.radiansToDegrees(v) if v is not None else v
-        self._savedAzimuth = AngleUtils.radiansToDegrees(h) if h is not None else h
+        
+        # If the angles are not yet available we save the future angles rather
+        # than waiting for them, so that fixes entered while the theodolite is
+        # being read get the angles when they arrive. If the read fails, so do
+        # those fixes.
+        self._savedTheodoliteAngles = self._getTheodoliteAngles()
+        
         return self._getSavedTheodoliteAngles()
         
         
     def _getSavedTheodoliteAngles(self):
-        return (self._savedDeclination, self._savedAzimuth)
+        
+        '''
+        Gets the saved theodolite angles.
+        
+        :Returns:
+            either a `(declination, azimuth)` pair of angles in degrees or a
+            `Future` whose result is such a pair.
+        '''
+        
+        return self._savedTheodoliteAngles
+
+
+def _getDegrees(future):
+    
+    try:
+        angles = future.result()
+    except Exception as e:
+        _handleTheodoliteError(e)
+        
+    return _toDegreesPair(angles)
+
+
+def _toDegreesPair(angles):
+    v, h = angles
+    return (_toDegrees(v), _toDegrees(h))
+
+
+def _handleTheodoliteError(e):
+    raise CommandInterpreterError('Theodolite read failed. ' + str(e))
+
+
+def _toDegrees(angle):
+    return AngleUtils.radiansToDegrees(angle) if angle is not None else angle
 
 
 def _createObsNumGenerator(doc):
@@ -114,16 +174,26 @@ def _getObsNum(obs):
         
 def _createSerialNumGenerator(doc, getNum, defaultInitialNum=0):
     
-    maxNum = None
+    # Numbers are assigned in document order, so the next number follows that of
+    # the last numbered observation. We search for that observation from the end
+    # of the document rather than visiting every observation, since visiting an
+    # observation of a lazy document parses it. We skip observations that cannot
+    # be parsed, since they have no numbers.
+    observations = doc.observations
     
-    for obs in doc.observations:
+    for i in range(len(observations) - 1, -1, -1):
+        
+        try:
+            obs = observations[i]
+        except ValueError:
+            continue
         
         n = getNum(obs)
         
-        if n is not None and (maxNum is None or n > maxNum):
-            maxNum = n
+        if n is not None:
+            return SerialNumberGenerator(n + 1)
             
-    return SerialNumberGenerator(maxNum + 1 if maxNum is not None else defaultInitialNum)
+    return SerialNumberGenerator(defaultInitialNum)
         
         
 def _createCommentIdGenerator(doc):
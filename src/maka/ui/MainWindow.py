@@ -3,26 +3,29 @@
 
 
 
+from collections import deque
 import os.path
 
-from PySide2.QtCore import SIGNAL, QItemSelection, QItemSelectionModel
+from PySide2.QtCore import QItemSelection, QItemSelectionModel, QPoint, Qt, Signal
 from PySide2.QtWidgets import (
     QAbstractItemView, QAction, QApplication, QDialog, QFileDialog, QHBoxLayout,
-    QLabel, QLineEdit, QListWidget, QMainWindow,
+    QLabel, QLineEdit, QListView, QMainWindow,
     QMenuBar, QMessageBox, QVBoxLayout, QWidget)
 
 from maka.command.CommandInterpreterError import CommandInterpreterError
 from maka.data.Document import Document
 from maka.ui.ObservationDialog import ObservationDialog
+from maka.ui.ObservationListModel import ObservationListModel
 from maka.util.Preferences import preferences as prefs
+import maka.data.AngleTransforms as AngleTransforms
 import maka.format.DocumentFileFormat as DocumentFileFormat
+import maka.format.DocumentJournal as DocumentJournal
 import maka.util.ExtensionManager as ExtensionManager
  
  
 '''
 RESUME
 
-* Auto-save
 * Reminders
 * Reduction
 * Find/Replace
@@ -63,10 +66,25 @@ _EDIT_MENU_SCHEMA = '''
 class MainWindow(QMainWindow):
     
     
+    _commandCompleted = Signal(object)
+    '''
+    signal emitted with the future observation of a command when it completes.
+    
+    A future may complete on a worker thread, for example one that reads a
+    theodolite. The signal delivers the future to the GUI thread.
+    '''
+    
+    
     def __init__(self):
         
         super(MainWindow, self).__init__()
         
+        self._commandCompleted.connect(self._onCommandCompleted)
+        
+        # The observation list view reports selection changes as soon as its
+        # model is set, before we have a document.
+        self._document = None
+        
         self._setFontSize()
         
         self._createUi()
@@ -74,6 +92,8 @@ class MainWindow(QMainWindow):
         self._openFileDialogShown = False
         self._saveAsFileDialogShown = False
         
+        self._journal = None
+        
         self.statusBar()
         
         width = prefs.get('mainWindow.width', 600)
@@ -216,40 +236,113 @@ class MainWindow(QMainWindow):
         command = self._commandLine.text()
         
         try:
-            obs = self._commandInterpreter.interpretCommand(command)
+            
+            if self._commandInterpreter is None:
+                self._commandInterpreter = _getCommandInterpreter(self._document)
+                
+            # Some commands read devices, which can take seconds, so we interpret
+            # commands asynchronously and append their observations when they
+            # arrive rather than blocking the GUI.
+            future = self._commandInterpreter.interpretCommandAsync(command)
             
         except CommandInterpreterError as e:
             QMessageBox.critical(self, '', str(e))
         
         else:
             
-            editName = 'Append ' + obs.__class__.__name__
-            index = self._obsList.count()
-            self.document.edit(editName, index, index, [obs])
-            
+            # We clear the command line so the next command can be entered while
+            # this one completes, and restore the command if it fails.
             self._commandLine.clear()
-            self._obsList.scrollToItem(self._obsList.item(index))
+            
+            self._pendingObservations.append((command, future))
+            future.add_done_callback(self._commandCompleted.emit)
+        
+        
+    def _onCommandCompleted(self, future):
+        
+        # We append observations in the order in which their commands were
+        # entered, so an observation waits for those of earlier commands.
+        pending = self._pendingObservations
+        
+        while len(pending) != 0 and pending[0][1].done():
+            
+            command, future = pending.popleft()
+            
+            try:
+                
+                obs = future.result()
+                
+                editName = 'Append ' + obs.__class__.__name__
+                index = len(self.document.observations)
+                self.document.edit(editName, index, index, [obs])
+                
+            except Exception as e:
+                # We report any error, including one from a device or a bug, and
+                # go on to the observations of later commands.
+                
+                self._onCommandFailed(command, e)
+                
+            else:
+                self._obsList.scrollTo(self._getModelIndex(index))
+                
+                
+    def _onCommandFailed(self, command, e):
+        
+        # Restore the command so it can be corrected and entered again, unless
+        # another command has been typed since.
+        if self._commandLine.text() == '':
+            self._commandLine.setText(command)
+        
+        if isinstance(e, CommandInterpreterError):
+            message = str(e)
+        else:
+            message = 'Command "{:s}" failed: {:s}'.format(command, str(e))
+            
+        QMessageBox.critical(self, '', message)
         
         
     def _createObsList(self):
         
-        obsList = ObservationListWidget(self)
+        self._obsModel = ObservationListModel(self)
+        
+        # The model reports format errors while the view paints, so we report them
+        # to the user later.
+        self._obsModel.formatError.connect(self._onFormatError, Qt.QueuedConnection)
+        
+        obsList = ObservationListView(self)
+        obsList.setModel(self._obsModel)
         obsList.setAlternatingRowColors(True)
         obsList.setSelectionMode(QAbstractItemView.ContiguousSelection)
         
-        signal = SIGNAL('itemDoubleClicked(QListWidgetItem *)')
-        self.connect(obsList, signal, self._onItemDoubleClick)
+        # With uniform item sizes the view does not have to ask the model for
+        # every row to lay itself out, so only visible rows are ever formatted.
+        obsList.setUniformItemSizes(True)
+        
+        obsList.doubleClicked.connect(self._onDoubleClick)
     
         self._obsList = obsList
         
         return obsList
     
     
-    def _onItemDoubleClick(self, item):
+    def _onFormatError(self, message):
+        QMessageBox.critical(self, '', message)
+        
+        
+    def _onDoubleClick(self, modelIndex):
         
         document = self.document
-        index = self._obsList.indexFromItem(item).row()
-        obs = document.observations[index]
+        index = modelIndex.row()
+        
+        try:
+            obs = document.observations[index]
+        
+        except ValueError as e:
+            # observation of lazy document could not be parsed
+            
+            QMessageBox.critical(self, '', 'Could not read observation.\n\n' + str(e))
+            return
+        
         dialog = ObservationDialog(self, obs, document.documentFormat)
         result = dialog.exec_()
         
@@ -268,17 +361,28 @@ class MainWindow(QMainWindow):
         return self._document
     
     
-    def _setDocument(self, doc):
+    def _setDocument(self, doc, journal=None):
         
-        if hasattr(self, '_document'):
+        if self._document is not None:
             self._document.removeEditListener(self._onDocumentEdit)
+            
+        self._closeJournal()
+        self._journal = journal
+        
         self._document = doc
         self._document.addEditListener(self._onDocumentEdit)
+        self._document.editHistory.configure(**prefs.get('editHistory', {}))
+        
+        self._obsModel.setDocument(self._document)
         
-        self._obsList.clear()
-        self._insertObservations(0, len(self._document.observations))
+        # We create the command interpreter when it is first needed, since creating
+        # it examines the last observations of the document, which for a lazy
+        # document means parsing them.
+        self._commandInterpreter = None
         
-        self._commandInterpreter = _getCommandInterpreter(self._document)
+        # Observations of commands entered for the previous document are discarded.
+        # Each pending observation is a `(command, future)` pair.
+        self._pendingObservations = deque()
         
         self._updateUi()
         
@@ -286,40 +390,47 @@ class MainWindow(QMainWindow):
     def _onDocumentEdit(self, edit):
         
         startIndex = edit.startIndex
-        numObservations = len(edit.newObservations)
+        endIndex = edit.endIndex
+        numObservations = edit.numNewObservations
         
-        self._deleteObservations(startIndex, edit.endIndex)
-        self._insertObservations(startIndex, numObservations)
+        # Get index of observation we want at the top of the list after the edit.
+        scrollIndex = self._getPostEditScrollIndex(startIndex, endIndex, numObservations)
+        
+        if numObservations == endIndex - startIndex:
+            # edit replaces observations one for one
+            self._obsModel.updateRows(startIndex, endIndex)
+        else:
+            self._obsModel.replaceRows(startIndex, endIndex, numObservations)
         
+        # Scroll so desired observation is at the top of the list.
+        if scrollIndex is not None:
+            self._obsList.scrollTo(
+                self._getModelIndex(scrollIndex), QAbstractItemView.PositionAtTop)
+            
         self._selectObservations(startIndex, numObservations)
         self._updateUi()
         
         
-    def _deleteObservations(self, startIndex, endIndex):
+    def _getPostEditScrollIndex(self, startIndex, endIndex, numObservations):
         
-        # Get index of observation we want at the top of the list after the deletion.
-        scrollIndex = self._getPostDeletionScrollIndex(startIndex, endIndex)
+        index = self._obsList.indexAt(QPoint(0, 0)).row()
         
-        for _ in range(endIndex - startIndex):
-            self._obsList.takeItem(startIndex)
+        if index == -1:
+            # list is empty
             
-        # Scroll so desired observation is at the top of the list.
-        if scrollIndex is not None:
-            item = self._obsList.item(scrollIndex)
-            self._obsList.scrollToItem(item, QAbstractItemView.PositionAtTop)
-            
-        
-    def _getPostDeletionScrollIndex(self, startIndex, endIndex):
-        
-        item = self._obsList.itemAt(0, 0)
-        index = self._obsList.row(item)
+            return None
         
-        if index < startIndex or index >= endIndex:
-            # first visible item will not be deleted
+        elif index < startIndex:
+            # first visible item will not be replaced
             
             return index
             
-        elif endIndex != self._obsList.count():
+        elif index >= endIndex:
+            # first visible item will not be replaced, but may move
+            
+            return index + numObservations - (endIndex - startIndex)
+            
+        elif endIndex != self._obsModel.rowCount():
             # first visible item will be deleted, and there are items
             # after the selection that will not be deleted.
             
@@ -329,15 +440,6 @@ class MainWindow(QMainWindow):
             return None
             
         
-    def _insertObservations(self, startIndex, numObservations):
-        doc = self.document
-        format = doc.documentFormat
-        obses = doc.observations
-        endIndex = startIndex + numObservations
-        labels = [format.formatObservation(obses[i]) for i in range(startIndex, endIndex)]
-        self._obsList.insertItems(startIndex, labels)
-            
-
     def _selectObservations(self, startIndex, numObservations):
         
         if numObservations > 0:
@@ -350,14 +452,11 @@ class MainWindow(QMainWindow):
             self._obsList.selectionModel().select(selection, flags)
         
             # Ensure that first row is visible.
-            startItem = self._obsList.item(startIndex)
-            self._obsList.scrollToItem(startItem)
+            self._obsList.scrollTo(start)
             
         
     def _getModelIndex(self, i):
-        selectionModel = self._obsList.selectionModel()
-        itemModel = selectionModel.model()
-        return itemModel.createIndex(i, 0)
+        return self._obsModel.index(i)
         
         
     def _updateUi(self):
@@ -385,6 +484,9 @@ class MainWindow(QMainWindow):
         actions = self._actions
         doc = self.document
         
+        if doc is None:
+            return
+        
         save = actions['Save']
         save.setEnabled(doc.filePath is None or not doc.saved)
         
@@ -420,8 +522,7 @@ class MainWindow(QMainWindow):
             redo.setStatusTip(text)
             redo.setEnabled(name is not None)
                 
-            items = self._obsList.selectedItems()
-            itemsSelected = len(items) != 0
+            itemsSelected = self._obsList.selectionModel().hasSelection()
             for name in ('Cut', 'Copy', 'Paste', 'Paste Before', 'Paste After', 'Delete'):
                 actions[name].setEnabled(itemsSelected)
                 
@@ -472,16 +573,118 @@ class MainWindow(QMainWindow):
         
     def openDocumentFile(self, filePath):
         
+        # We close the journal of the current document before reading the new one,
+        # in case they are the same file. If reading fails, the current document
+        # remains open without a journal and its next save writes it in full.
+        self._closeJournal()
+        
         try:
             # TODO: Improve error messages, e.g. to include line numbers.
-            doc = DocumentFileFormat.readDocument(filePath)
+            result = self._readDocumentFile(filePath)
             
         except Exception as e:
             message = 'File open failed.\n\n' + str(e)
             QMessageBox.critical(self, '', message)
             
         else:
-            self._setDocument(doc)
+            if result is not None:
+                self._setDocument(*result)
+            
+            
+    def _readDocumentFile(self, filePath):
+        
+        '''
+        Reads a document file, handling its journal if it has one.
+        
+        :Returns:
+            a `(document, journal)` pair, or `None` if the user cancels.
+        '''
+        
+        # We handle a journal even if journaling is disabled, since it may hold
+        # saved edits that are not in the document file.
+        if DocumentJournal.journalExists(filePath):
+            
+            if DocumentJournal.isJournalStale(filePath):
+                
+                if not self._handleStaleJournal(filePath):
+                    return None
+                
+            else:
+                
+                result = QMessageBox.question(
+                    self, '',
+                    'The document "{:s}" has unsaved changes from an earlier session. '
+                    'Would you like to recover them?'.format(os.path.basename(filePath)),
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+                
+                if result == QMessageBox.Yes:
+                    return DocumentJournal.recoverDocument(
+                        filePath, _getJournalMaxNumEntries())
+                
+                else:
+                    DocumentJournal.foldJournal(filePath)
+                
+        if os.path.getsize(filePath) >= _getLazyDocumentMinFileSize():
+            doc = DocumentFileFormat.readLazyDocument(filePath)
+        else:
+            doc = DocumentFileFormat.readDocument(filePath)
+        
+        return (doc, _startJournal(doc))
+    
+    
+    def _handleStaleJournal(self, filePath):
+        
+        '''
+        Asks the user whether to discard or rename a stale document journal.
+        
+        :Returns:
+            `True` if the journal was discarded or renamed, or `False` if the
+            user cancelled.
+        '''
+        
+        box = QMessageBox(self)
+        box.setText(
+            'The journal of the document "{:s}" does not match the document '
+            'file.'.format(os.path.basename(filePath)))
+        box.setInformativeText(
+            'The file may have been changed by another program since the '
+            'journal was written, or Maka may have stopped while saving the '
+            'document. Would you like to discard the journal, or rename it '
+            'so that you can examine it later?')
+        
+        renameButton = box.addButton('Rename Journal', QMessageBox.AcceptRole)
+        discardButton = box.addButton('Discard Journal', QMessageBox.DestructiveRole)
+        box.addButton(QMessageBox.Cancel)
+        box.setDefaultButton(renameButton)
+        
+        box.exec_()
+        
+        button = box.clickedButton()
+        
+        if button is renameButton:
+            DocumentJournal.setAsideJournal(filePath)
+            return True
+        
+        elif button is discardButton:
+            DocumentJournal.deleteJournal(filePath)
+            return True
+        
+        else:
+            return False
+    
+    
+    def _closeJournal(self):
+        
+        if self._journal is not None:
+            
+            try:
+                self._journal.close()
+                
+            except Exception as e:
+                message = 'Could not close journal.\n\n' + str(e)
+                QMessageBox.critical(self, '', message)
+                
+            self._journal = None
 
     
     def _onSave(self):
@@ -500,7 +703,22 @@ class MainWindow(QMainWindow):
         doc = self.document
         
         try:
-            doc.fileFormat.writeDocument(doc, filePath, doc.documentFormat)
+            
+            if self._journal is not None and filePath == doc.filePath:
+                # document is journaled to this file
+                
+                # Save just the edits made since the last save.
+                self._journal.save()
+                
+            else:
+                
+                self._closeJournal()
+                
+                doc.fileFormat.writeDocument(doc, filePath, doc.documentFormat)
+                doc.filePath = filePath
+                doc.markSaved()
+                
+                self._journal = _startJournal(doc)
             
         except Exception as e:
             message = 'File save failed.\n\n' + str(e)
@@ -508,8 +726,6 @@ class MainWindow(QMainWindow):
             return False
             
         else:
-            doc.filePath = filePath
-            doc.markSaved()
             self._updateUi()
             return True
         
@@ -625,21 +841,18 @@ class MainWindow(QMainWindow):
         
         
     def _onSwapAngles(self):
-        observations = [self._swapAngles(obs) for obs in self.document.observations]
-        self.document.edit('Swap Angles', 0, len(observations), observations)
-
-
-    def _swapAngles(self, obs):
-        name = obs.__class__.__name__
-        if name == 'TheoData' or name == 'Fix':
-            return obs.copy(azimuth=obs.declination, declination=obs.azimuth)
-        else:
-            return obs.copy()
+        
+        try:
+            AngleTransforms.swapAngles(self.document)
+        except ValueError as e:
+            self._handleEditError('Swap Angles', str(e))
     
         
     def closeEvent(self, event):
         if not self._isCloseOk():
             event.ignore()
+        else:
+            self._closeJournal()
             
             
     def _isCloseOk(self):
@@ -684,6 +897,29 @@ def _parseMenuSchema(s):
     return [i.strip() for i in s.strip().split('\n')]
 
     
+def _journalingEnabled():
+    return prefs.get('documentJournal', {}).get('enabled', False)
+
+
+def _getJournalMaxNumEntries():
+    return prefs.get('documentJournal', {}).get('maxNumEntries', 1000)
+
+
+def _getLazyDocumentMinFileSize():
+    return prefs.get('lazyDocument', {}).get('minFileSize', 50000000)
+
+
+def _startJournal(doc):
+    
+    if not _journalingEnabled():
+        return None
+    
+    journal = DocumentJournal.DocumentJournal(doc, _getJournalMaxNumEntries())
+    journal.start()
+    
+    return journal
+    
+    
 def _createNewDocument():
     docFormat = _getDefaultDocumentFormat()
     docFileFormat = _getDefaultDocumentFileFormat()
@@ -692,12 +928,13 @@ def _createNewDocument():
 
 # TODO: Don't hard code default document format name.
 def _getDefaultDocumentFormat():
-    return ExtensionManager.getExtension('DocumentFormat', "'96 MMRP Grammar 1.01")()
+    return ExtensionManager.getExtensionInstance('DocumentFormat', "'96 MMRP Grammar 1.01")
 
 
 # TODO: Don't hard code default document file format name.
 def _getDefaultDocumentFileFormat():
-    return ExtensionManager.getExtension('DocumentFileFormat', 'Maka Document File Format')()
+    return ExtensionManager.getExtensionInstance(
+        'DocumentFileFormat', 'Maka Document File Format')
 
 
 def _getCommandInterpreter(doc):
@@ -709,42 +946,51 @@ def _getCommandInterpreter(doc):
         'Command interpreter not found for document format "{:s}".'.format(docFormatName))
 
 
-class ObservationListWidget(QListWidget):
+class ObservationListView(QListView):
     
 
     def __init__(self, mainWindow, *args, **kwds):
-        super(ObservationListWidget, self).__init__(*args, **kwds)
+        super(ObservationListView, self).__init__(*args, **kwds)
         self._mainWindow = mainWindow
         
         
     def selectionChanged(self, selected, deselected):
-        super(ObservationListWidget, self).selectionChanged(selected, deselected)
+        super(ObservationListView, self).selectionChanged(selected, deselected)
         self._mainWindow._updateMenuItemStates()
         
         
     @property
     def selectedRange(self):
         
-        if self.count() == 0:
+        # The selection is a list of row ranges, so we can find its extent without
+        # visiting every selected row.
+        ranges = self.selectionModel().selection()
+        
+        if ranges.isEmpty():
             return None
         
         else:
-            indices = [self.indexFromItem(i).row() for i in self.selectedItems()]
-            return (min(indices), max(indices) + 1)
+            return (min(r.top() for r in ranges), max(r.bottom() for r in ranges) + 1)
         
         
     @property
     def selectedText(self):
-        items = self.selectedItems()
-        items.sort(key=lambda i: self.indexFromItem(i).row())
-        return ''.join(i.text() + '\n' for i in items)
+        
+        selectedRange = self.selectedRange
+        
+        if selectedRange is None:
+            return ''
+        
+        else:
+            document = self._mainWindow.document
+            return ''.join(s + '\n' for s in document.getFormattedObservations(*selectedRange))
 
 
     def focusInEvent(self, event):
-        super(ObservationListWidget, self).focusInEvent(event)
+        super(ObservationListView, self).focusInEvent(event)
         self._mainWindow._updateMenuItemStates()
         
         
     def focusOutEvent(self, event):
-        super(ObservationListWidget, self).focusOutEvent(event)
+        super(ObservationListView, self).focusOutEvent(event)
         self._mainWindow._updateMenuItemStates()
@@ -0,0 +1,139 @@
+'''Module containing `ObservationListModel` class.'''
+
+
+from PySide2.QtCore import QAbstractListModel, QModelIndex, Qt, Signal
+
+
+class ObservationListModel(QAbstractListModel):
+    
+    
+    '''
+    List model whose rows are the formatted observations of a document.
+    
+    The model gets the formatted observation of a row from the document, which
+    formats it only when a view first asks for the row (for a view with uniform
+    item sizes, when the row first becomes visible) and caches it. The owner of the
+    model is responsible for telling it about document edits via the
+    `replaceRows` method, which updates views with at most one row removal
+    and one row insertion per edit, or for edits that replace observations
+    one for one via the `updateRows` method.
+    
+    A row whose observation cannot be formatted, for example because it is an
+    observation of a lazy document whose file line cannot be decoded, displays
+    an error message. Since a view cannot handle exceptions, the model reports
+    the first such error for a document with the `formatError` signal. The
+    owner of the model should connect to the signal with a queued connection,
+    since the model emits it while a view is painting.
+    '''
+    
+    
+    formatError = Signal(str)
+    
+    
+    def __init__(self, parent=None):
+        super(ObservationListModel, self).__init__(parent)
+        self._document = None
+        self._formatErrorReported = False
+        
+        # We keep our own row count rather than using the length of the document's
+        # observation list, since views must see the old count until we tell them
+        # about an edit, which the document has already performed.
+        self._numRows = 0
+    
+    
+    @property
+    def document(self):
+        return self._document
+    
+    
+    def setDocument(self, document):
+        self.beginResetModel()
+        self._document = document
+        self._numRows = len(document.observations)
+        self._formatErrorReported = False
+        self.endResetModel()
+    
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._numRows
+    
+    
+    def data(self, index, role=Qt.DisplayRole):
+        
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        
+        row = index.row()
+        
+        try:
+            return self._document.getFormattedObservation(row)
+        
+        except ValueError as e:
+            
+            message = _getErrorMessage(e, row)
+            
+            if not self._formatErrorReported:
+                self._formatErrorReported = True
+                self.formatError.emit(message)
+                
+            return '<' + message + '>'
+    
+    
+    def updateRows(self, startIndex, endIndex):
+        
+        '''
+        Updates a range of rows of this model whose observations have changed.
+        
+        This is cheaper for views than replacing the rows, and preserves their
+        selection.
+        
+        :Parameters:
+            startIndex : `int`
+                the index of the first row to update.
+            
+            endIndex : `int`
+                the index of the row following the last row to update.
+        '''
+        
+        if endIndex > startIndex:
+            self.dataChanged.emit(self.index(startIndex), self.index(endIndex - 1))
+    
+    
+    def replaceRows(self, startIndex, endIndex, numRows):
+        
+        '''
+        Replaces a range of rows of this model with new rows.
+        
+        :Parameters:
+            startIndex : `int`
+                the index of the first row to replace.
+            
+            endIndex : `int`
+                the index of the row following the last row to replace.
+            
+            numRows : `int`
+                the number of new rows, formatted from the document observations
+                starting at `startIndex`.
+        '''
+        
+        parent = QModelIndex()
+        
+        if endIndex > startIndex:
+            self.beginRemoveRows(parent, startIndex, endIndex - 1)
+            self._numRows -= endIndex - startIndex
+            self.endRemoveRows()
+        
+        if numRows > 0:
+            self.beginInsertRows(parent, startIndex, startIndex + numRows - 1)
+            self._numRows += numRows
+            self.endInsertRows()
+
+
+def _getErrorMessage(e, row):
+    
+    lineNum = getattr(e, 'lineNum', None)
+    
+    if lineNum is not None:
+        return 'Could not format observation of line {:d}: {:s}'.format(lineNum, str(e))
+    else:
+        return 'Could not format observation {:d}: {:s}'.format(row, str(e))
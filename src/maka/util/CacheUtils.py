@@ -0,0 +1,23 @@
+'''Utility functions pertaining to Maka cache files.'''
+
+
+import os
+
+from maka.util.Preferences import preferences as prefs
+
+
+def getCacheDirPath():
+    
+    '''
+    Gets the path of the Maka cache directory.
+    
+    The directory is specified by the `"cache.dirPath"` preference, and defaults
+    to the `.maka/cache` subdirectory of the user's home directory.
+    '''
+    
+    dirPath = prefs.get('cache.dirPath')
+    
+    if dirPath is None:
+        dirPath = os.path.join(os.path.expanduser('~'), '.maka', 'cache')
+    
+    return dirPath
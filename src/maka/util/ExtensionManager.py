@@ -20,8 +20,48 @@ Perhaps every extension class should be a subclass of an `Extension` class.
 '''
 
 
+import importlib
+
+
+_EXTENSIONS = (
+    ('DocumentFileFormat', 'Maka Columnar Cache File Format',
+     'maka.format.ColumnarCacheFileFormat', 'ColumnarCacheFileFormat'),
+    ('DocumentFileFormat', 'Maka Document File Format',
+     'maka.format.MakaDocumentFileFormat', 'MakaDocumentFileFormat'),
+    ('DocumentFormat', "'96 MMRP Grammar 1.01",
+     'maka.mmrp.MmrpDocumentFormat101', 'MmrpDocumentFormat101'),
+    ('CommandInterpreter', 'MMRP Command Interpreter 1.01',
+     'maka.mmrp.MmrpCommandInterpreter101', 'MmrpCommandInterpreter101'),
+    ('Device', 'Dummy Theodolite',
+     'maka.device.DummyTheodolite', 'DummyTheodolite'),
+    ('Device', 'Sokkia DT4 Theodolite',
+     'maka.device.SokkiaTheodolite', 'SokkiaDt4Theodolite'),
+    ('Device', 'Sokkia DT500 Theodolite',
+     'maka.device.SokkiaTheodolite', 'SokkiaDt500Theodolite')
+)
+'''
+`(typeName, extensionName, moduleName, className)` tuples describing the
+application extensions.
+
+We describe extensions rather than importing them so that each extension's
+module is imported only when the extension is first used. Some extension modules
+take a while to import, or depend on optional packages (for example, the Sokkia
+theodolite module depends on PySerial), and most programs need only a few
+extensions.
+'''
+
+
 _extensions = None
-'''mapping from extension type names to sets of extensions.'''
+'''
+mapping from extension type names to mappings from extension names to extensions.
+
+An extension is represented by a `(moduleName, className)` pair until it is
+first used, and by its class thereafter.
+'''
+
+
+_instances = {}
+'''mapping from `(typeName, extensionName)` pairs to extension instances.'''
 
 
 def _initializeIfNeeded():
@@ -33,30 +73,88 @@ def _initializeIfNeeded():
         
     _extensions = {}
     
-    from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
-    _addExtensions('DocumentFileFormat', [MakaDocumentFileFormat])
-    
-    from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
-    _addExtensions('DocumentFormat', [MmrpDocumentFormat101])
+    for typeName, extensionName, moduleName, className in _EXTENSIONS:
+        _extensions.setdefault(typeName, {})[extensionName] = (moduleName, className)
     
-    from maka.mmrp.MmrpCommandInterpreter101 import MmrpCommandInterpreter101
-    _addExtensions('CommandInterpreter', [MmrpCommandInterpreter101])
     
-    from maka.device.SokkiaTheodolite import SokkiaDt4Theodolite, SokkiaDt500Theodolite
-    from maka.device.DummyTheodolite import DummyTheodolite
-    _addExtensions('Device', [DummyTheodolite, SokkiaDt4Theodolite, SokkiaDt500Theodolite])
+def _loadExtension(typeName, extensionName):
     
+    extensions = _extensions[typeName]
+    extension = extensions[extensionName]
     
-def _addExtensions(typeName, extensions):
-    global _extensions
-    _extensions[typeName] = dict((e.extensionName, e) for e in extensions)
+    if isinstance(extension, tuple):
+        # extension not yet loaded
+        
+        moduleName, className = extension
+        extension = getattr(importlib.import_module(moduleName), className)
+        
+        if extension.extensionName != extensionName:
+            raise ValueError(
+                ('Extension class "{:s}.{:s}" has extension name "{:s}" rather than '
+                 'expected name "{:s}".').format(
+                    moduleName, className, extension.extensionName, extensionName))
+            
+        extensions[extensionName] = extension
+        
+    return extension
 
 
 def getExtension(typeName, extensionName):
+    
+    _initializeIfNeeded()
+    
+    if extensionName not in _extensions.get(typeName, {}):
+        return None
+    
+    return _loadExtension(typeName, extensionName)
+
+
+def getExtensionNames(typeName):
+    
+    '''
+    Gets the names of the extensions of the specified type.
+    
+    Unlike `getExtensions`, this function does not load the extensions.
+    '''
+    
     _initializeIfNeeded()
-    return _extensions.get(typeName, {}).get(extensionName)
+    return frozenset(_extensions.get(typeName, {}).keys())
 
 
 def getExtensions(typeName):
     _initializeIfNeeded()
-    return frozenset(iter(_extensions.get(typeName, {}).values()))
+    return frozenset(
+        _loadExtension(typeName, name) for name in _extensions.get(typeName, {}))
+
+
+def getExtensionInstance(typeName, extensionName):
+    
+    '''
+    Gets the shared instance of the specified extension.
+    
+    The instance is created by calling the extension class with no arguments the
+    first time it is requested, and the same instance is returned thereafter. Use
+    this function for extensions whose instances are not modified after they are
+    created, such as document formats and document file formats, so that their
+    possibly expensive initialization is performed only once.
+    
+    :Returns:
+        the extension instance, or `None` if there is no such extension.
+    '''
+    
+    key = (typeName, extensionName)
+    
+    try:
+        return _instances[key]
+    
+    except KeyError:
+        
+        extension = getExtension(typeName, extensionName)
+        
+        if extension is None:
+            return None
+        
+        instance = extension()
+        _instances[key] = instance
+        
+        return instance
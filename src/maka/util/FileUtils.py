@@ -0,0 +1,59 @@
+'''Utility functions pertaining to files.'''
+
+
+import os
+
+
+def writeFileAtomically(filePath, data):
+    
+    '''
+    Writes a binary file atomically, creating its parent directory if needed.
+    
+    The data are written to a temporary file in the same directory as the file,
+    which then replaces the file. A reader of the file thus sees either the old
+    contents of the file or the new ones, never a mixture.
+    
+    :Parameters:
+        filePath : `str`
+            the path of the file to write.
+        
+        data : `bytes`
+            the data to write.
+    '''
+    
+    dirPath = os.path.dirname(os.path.abspath(filePath))
+    os.makedirs(dirPath, exist_ok=True)
+    
+    # We import `tempfile` here rather than at the top of this module since it
+    # takes a while to import and programs that only read files do not need it.
+    import tempfile
+    
+    fd, tempFilePath = tempfile.mkstemp(dir=dirPath, suffix='.tmp')
+    
+    try:
+        
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            
+        # Give the new file the permissions of the file it replaces, or the default
+        # permissions for a new file. (`mkstemp` creates a file that only its owner
+        # can read and write.)
+        os.chmod(tempFilePath, _getFileMode(filePath))
+        
+        os.replace(tempFilePath, filePath)
+    
+    except BaseException:
+        os.remove(tempFilePath)
+        raise
+
+
+
+def _getFileMode(filePath):
+    
+    try:
+        return os.stat(filePath).st_mode & 0o7777
+    
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
@@ -0,0 +1,107 @@
+'''
+Utility functions pertaining to `concurrent.futures.Future` objects.
+
+The functions create futures whose results are derived from the results of
+other futures, so that asynchronous operations can be composed without waiting
+for them. Note that the callbacks of a future are invoked by the thread that
+completes it, so a future derived from another completes on that thread too.
+'''
+
+
+from concurrent.futures import Future
+import threading
+
+
+def createCompletedFuture(result):
+    
+    '''Creates a future that has already completed with the specified result.'''
+    
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def transformFuture(future, function):
+    
+    '''
+    Creates a future whose result is derived from that of another future.
+    
+    :Parameters:
+        future : `Future`
+            the future from which to derive the new future.
+        
+        function : callable
+            a function that takes the completed `future` and returns the result
+            of the new future. The function typically calls `future.result()`,
+            and may raise an exception, for example to translate an exception of
+            `future` into another kind. Any exception raised by the function
+            becomes the exception of the new future.
+    
+    :Returns:
+        the new `Future`.
+    '''
+    
+    newFuture = Future()
+    
+    def onDone(future):
+        
+        try:
+            result = function(future)
+        
+        except Exception as e:
+            newFuture.set_exception(e)
+        
+        else:
+            newFuture.set_result(result)
+    
+    future.add_done_callback(onDone)
+    
+    return newFuture
+
+
+def combineFutures(futures):
+    
+    '''
+    Creates a future whose result is a tuple of the results of other futures.
+    
+    If any of the other futures fails, the new future fails with the exception
+    of the first of them (in sequence order) that failed.
+    
+    :Parameters:
+        futures : sequence of `Future`
+            the futures to combine.
+    
+    :Returns:
+        the new `Future`.
+    '''
+    
+    futures = tuple(futures)
+    
+    if len(futures) == 0:
+        return createCompletedFuture(())
+    
+    newFuture = Future()
+    lock = threading.Lock()
+    numPending = [len(futures)]
+    
+    def onDone(_):
+        
+        # The futures may complete on different threads.
+        with lock:
+            numPending[0] -= 1
+            if numPending[0] != 0:
+                return
+        
+        try:
+            results = tuple(f.result() for f in futures)
+        
+        except Exception as e:
+            newFuture.set_exception(e)
+        
+        else:
+            newFuture.set_result(results)
+    
+    for future in futures:
+        future.add_done_callback(onDone)
+    
+    return newFuture
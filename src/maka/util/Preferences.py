@@ -16,6 +16,23 @@ def _loadPreferences():
     "mainWindow.width": 600,
     "mainWindow.height": 500,
     "observationDialog.width": 400,
+    "documentJournal": {
+        "enabled": true,
+        "maxNumEntries": 1000
+    },
+    "editHistory": {
+        "maxNumEdits": 1000,
+        "maxSize": 50000000,
+        "spill": true,
+        "coalesce": true
+    },
+    "lazyDocument": {
+        "minFileSize": 50000000
+    },
+    "documentCache": {
+        "enabled": true,
+        "maxSize": 500000000
+    },
 #    "defaultDocumentFilePath": "/Users/Harold/Desktop/Stuff/Maka/Test Document.txt",
 #    "openFileDialog.dirPath": "/Users/Harold/Desktop/Stuff/Maka",
 #    "saveAsFileDialog.dirPath": "/Users/Harold/Desktop/Stuff/Maka",
@@ -24,6 +41,7 @@ def _loadPreferences():
 #            "deviceType": "Dummy Theodolite"
             "deviceType": "Sokkia DT500 Theodolite",
             "deviceConfig": { "serialPortName": "/dev/cu.usbserial" }
+#            , "polling": { "interval": 1, "maxReadingAge": 2 }
         }
     }
 }
@@ -12,7 +12,6 @@ _SPACE = r'\s*'
 # Within the token, double quotes and backslashes must be escaped with
 # backslashes.
 _QUOTED = r'"(?:[^"\\]*\\\\|[^"\\]*\\")*[^"\\]*"'
-_QUOTED_RE = re.compile(r'({:s}){:s}'.format(_QUOTED, _SPACE))
 
 # An unterminated quoted token is just like a quoted token except that it
 # extends to the end of the string being tokenized and has no closing quote.
@@ -21,7 +20,15 @@ _UNTERMINATED_QUOTED_RE = re.compile(_QUOTED[:-1] + '$')
 # An unquoted token comprises a non-whitespace, non-quote character followed
 # by zero or more non-whitespace characters.
 _UNQUOTED = r'[^"\s]\S*'
-_UNQUOTED_RE = re.compile(r'({:s}){:s}'.format(_UNQUOTED, _SPACE))
+
+# A token is either a quoted token or an unquoted token, followed by optional
+# space. Since an unquoted token cannot start with a quote, at most one of the
+# two alternatives can match at any given position, and the index of the group
+# that matched tells us which kind of token we found.
+_TOKEN_RE = re.compile(r'(?:({:s})|({:s})){:s}'.format(_QUOTED, _UNQUOTED, _SPACE))
+_QUOTED_GROUP_INDEX = 1
+
+_SPACE_RE = re.compile(_SPACE)
 
 
 # TODO: Document how labor of observation and command parsing is divided between
@@ -34,62 +41,105 @@ _UNQUOTED_RE = re.compile(r'({:s}){:s}'.format(_UNQUOTED, _SPACE))
 
 def tokenizeString(s):
     
-    inputLength = len(s)
+    '''
+    Splits a string into tokens.
     
-    # Ignore leading space.
-    s = s.lstrip()
+    :Raises ValueError:
+        if the string cannot be tokenized. The `column` attribute of the exception
+        is set to the one-based character position of the problem.
+    '''
+    
+    # We scan the string in a single pass, matching each token at the position
+    # where the previous one ended rather than slicing off the matched text, so
+    # tokenization takes time linear in the length of the string.
+    
+    inputLength = len(s)
+    match = _TOKEN_RE.match
     
     tokens = []
     
-    while len(s) != 0:
+    # Ignore leading space.
+    pos = _SPACE_RE.match(s).end()
+    
+    while pos != inputLength:
         
-        if s[0] == '"':
-            # next token starts with a quote
-            
-            regExp = _QUOTED_RE
-            quoted = True
-            
-        else:
-            # next token does not start with a quote
-            
-            regExp = _UNQUOTED_RE
-            quoted = False
-            
-        m = regExp.match(s)
-            
-        if m is not None:
-            # match succeeded
-            
-            matchedText = m.group(0)
-            token = m.group(1)
-            
-            n = len(matchedText)
-            
-            if n != len(s) and n == len(token):
-                # not all remaining text was matched but no trailing whitespace was matched
-                
-                prefix = 'Quoted token' if quoted else 'Token'
-                startIndex = inputLength - len(s) + 1
-                endIndex = startIndex + len(token) - 1
-                
-                raise ValueError(
-                    '{:s} from characters {:d} through {:d} is not followed by space.'.format(
-                        prefix, startIndex, endIndex))
-
-            tokens.append(token)
-            s = s[len(matchedText):]
-            
-        else:
+        m = match(s, pos)
+        
+        if m is None:
             # match failed
             
-            if quoted and _UNTERMINATED_QUOTED_RE.match(s):
-                prefix = 'Unterminated quoted'
-                
-            else:
-                prefix = 'Could not parse' + (' quoted' if quoted else '')
-                
-            startIndex = inputLength - len(s) + 1
+            _raiseMatchError(s, pos)
+            
+        groupIndex = m.lastindex
+        end = m.end()
+        
+        if end == m.end(groupIndex) and end != inputLength:
+            # not all remaining text was matched but no trailing whitespace was matched
             
-            raise ValueError('{:s} token starting at character {:d}.'.format(prefix, startIndex))
+            _raiseSpaceError(m, groupIndex)
             
+        tokens.append(m.group(groupIndex))
+        pos = end
+        
     return tokens
+
+
+def getTokenColumns(s):
+    
+    '''
+    Gets the columns of the tokens of a string.
+    
+    :Returns:
+        a list of the one-based character positions at which the tokens of
+        the string start.
+        
+    :Raises ValueError:
+        if the string cannot be tokenized.
+    '''
+    
+    columns = []
+    pos = _SPACE_RE.match(s).end()
+    
+    while pos != len(s):
+        
+        m = _TOKEN_RE.match(s, pos)
+        
+        if m is None:
+            _raiseMatchError(s, pos)
+            
+        columns.append(pos + 1)
+        pos = m.end()
+        
+    return columns
+
+
+def _raiseMatchError(s, pos):
+    
+    quoted = s[pos] == '"'
+    
+    if quoted and _UNTERMINATED_QUOTED_RE.match(s, pos):
+        prefix = 'Unterminated quoted'
+        
+    else:
+        prefix = 'Could not parse' + (' quoted' if quoted else '')
+        
+    _raiseError(
+        '{:s} token starting at character {:d}.'.format(prefix, pos + 1), pos + 1)
+
+
+def _raiseSpaceError(m, groupIndex):
+    
+    prefix = 'Quoted token' if groupIndex == _QUOTED_GROUP_INDEX else 'Token'
+    startIndex = m.start(groupIndex) + 1
+    endIndex = m.end(groupIndex)
+    
+    _raiseError(
+        '{:s} from characters {:d} through {:d} is not followed by space.'.format(
+            prefix, startIndex, endIndex),
+        endIndex + 1)
+    
+    
+def _raiseError(message, column):
+    e = ValueError(message)
+    e.column = column
+    raise e
@@ -0,0 +1,44 @@
+from maka.data.AngleTransforms import getAngleObservationClasses, swapAngles
+import maka.format.DocumentFileFormat as DocumentFileFormat
+
+from MakaTests import TestCase, SAMPLE_LINES, SURVEY_LINES
+
+
+# a TheoData observation followed by two fixes and a comment
+_LINES = [SURVEY_LINES[2]] + SAMPLE_LINES
+
+
+class AngleTransformsTests(TestCase):
+    
+    
+    def setUp(self):
+        filePath = self._writeDocumentFile(self._createTempDir(), 'Test.txt', _LINES)
+        self._document = DocumentFileFormat.readDocument(filePath)
+        
+        
+    def testGetAngleObservationClasses(self):
+        
+        # Documents read from files are plain documents, whose observation
+        # classes are those of their formats.
+        self.assertIsNone(self._document.observationClasses)
+        
+        names = [c.__name__ for c in getAngleObservationClasses(self._document)]
+        self.assertEqual(names, ['Fix', 'TheoData'])
+        
+        
+    def testSwapAngles(self):
+        
+        document = self._document
+        observations = list(document.observations)
+        
+        self.assertEqual(swapAngles(document), 3)
+        
+        angles = [(obs.azimuth, obs.declination) for obs in observations[:3]]
+        swapped = [(obs.declination, obs.azimuth) for obs in document.observations[:3]]
+        self.assertEqual(swapped, angles)
+        self.assertEqual(swapped[1], (2.5, 91.))
+        self.assertIs(document.observations[3], observations[3])
+        self.assertEqual(document.undoName, 'Swap Angles')
+        
+        document.undo()
+        self.assertEqual(document.observations, observations)
@@ -0,0 +1,86 @@
+'''
+Benchmark comparing reading a document from a text file with reading it from a
+columnar cache file.
+
+Run this script with the Maka `src` directory on the Python path. It writes a large
+MMRP document file and its cache to a temporary directory, checks that the document
+read from the cache equals the document read from the text file, and then reports
+the time each read takes.
+'''
+
+
+import os
+import shutil
+import tempfile
+import time
+
+from maka.format.ColumnarCacheFileFormat import ColumnarCacheFileFormat
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+
+
+_HEADER = '''aardvark data
+grammar "'96 MMRP Grammar 1.01"
+
+'''
+
+_LINES = [
+    '{:05d} 1/01/12 7:02:13 StartScan 1 Visibility 2 Beaufort 3 Swell 1.5 Vessels 0 Pods 2',
+    '{:05d} 1/01/12 7:02:40 TheoData Dec 91:12:30 Az 231:45:10',
+    '{:05d} 1/01/12 7:02:41 Fix Dec 91:12:30 Az 231:45:10 Pod 1 State trav',
+    '{:05d} 1/01/12 7:03:05 Behavior b Blow Pod 1 ""',
+    '{:05d} 1/01/12 7:03:30 Comment 1 "Pod \\"A\\" is traveling north"'
+]
+
+_NUM_OBSERVATIONS = 100000
+_NUM_REPETITIONS = 3
+
+
+def _main():
+    
+    dirPath = tempfile.mkdtemp()
+    
+    try:
+        
+        filePath = os.path.join(dirPath, 'Test.txt')
+        _writeFile(filePath)
+        
+        textFormat = MakaDocumentFileFormat()
+        cacheFormat = ColumnarCacheFileFormat(os.path.join(dirPath, 'Cache'))
+        
+        document = textFormat.readDocument(filePath)
+        cacheFormat.writeCache(document, filePath)
+        
+        if cacheFormat.readDocument(filePath).observations != document.observations:
+            raise AssertionError('Cached document differs from text document.')
+        
+        print('Cached document equals text document.')
+        
+        _benchmark('text', textFormat, filePath)
+        _benchmark('cache', cacheFormat, filePath)
+    
+    finally:
+        shutil.rmtree(dirPath)
+
+
+def _writeFile(filePath):
+    with open(filePath, 'w') as file:
+        file.write(_HEADER)
+        for i in range(_NUM_OBSERVATIONS):
+            file.write(_LINES[i % len(_LINES)].format(i) + '\n')
+
+
+def _benchmark(name, fileFormat, filePath):
+    
+    times = []
+    
+    for _ in range(_NUM_REPETITIONS):
+        startTime = time.perf_counter()
+        fileFormat.readDocument(filePath)
+        times.append(time.perf_counter() - startTime)
+    
+    print('{:s}: {:.3f} seconds for {:d} observations'.format(
+        name, min(times), _NUM_OBSERVATIONS))
+
+
+if __name__ == '__main__':
+    _main()
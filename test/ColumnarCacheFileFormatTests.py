@@ -0,0 +1,188 @@
+import datetime
+import os
+import shutil
+
+from maka.data.Document import Document
+from maka.format.ColumnarCacheFileFormat import ColumnarCacheFileFormat
+from maka.format.DocumentFileFormat import UnrecognizedFileFormatError
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+from maka.mmrp.MmrpDocument101 import Behavior, Comment, Fix
+import maka.format.DocumentFileFormat as DocumentFileFormat
+
+from MakaTests import SURVEY_LINES, SURVEY_SETUP_LINES, TestCase
+
+
+_LINES = SURVEY_SETUP_LINES + SURVEY_LINES
+
+
+class ColumnarCacheFileFormatTests(TestCase):
+    
+    
+    def setUp(self):
+        
+        self._dirPath = self._createTempDir()
+        self._filePath = self._writeFile(_LINES)
+        
+        self._textFormat = MakaDocumentFileFormat()
+        self._cacheFormat = ColumnarCacheFileFormat()
+    
+    
+    def _writeFile(self, lines):
+        return self._writeDocumentFile(self._dirPath, 'Test.txt', lines)
+    
+    
+    def _writeCache(self):
+        document = self._textFormat.readDocument(self._filePath)
+        self.assertTrue(self._cacheFormat.writeCache(document, self._filePath))
+        return document
+    
+    
+    def testReadDocument(self):
+        
+        expected = self._writeCache()
+        
+        self.assertTrue(self._cacheFormat.isFileRecognized(self._filePath))
+        
+        document = self._cacheFormat.readDocument(self._filePath)
+        
+        self.assertEqual(document.observations, expected.observations)
+        self.assertEqual(
+            [obs.__class__ for obs in document.observations],
+            [obs.__class__ for obs in expected.observations])
+        self.assertTrue(all(obs.frozen for obs in document.observations))
+        
+        self.assertEqual(document.filePath, self._filePath)
+        self.assertIsInstance(document.fileFormat, MakaDocumentFileFormat)
+        self.assertEqual(
+            document.documentFormat.extensionName, expected.documentFormat.extensionName)
+    
+    
+    def testNoneValues(self):
+        
+        date = datetime.date(2013, 2, 1)
+        time = datetime.time(1, 23, 45, 500000)
+        
+        observations = [
+            Fix(observationNum=1, date=date, time=time, declination=91., azimuth=None,
+                objectType='Pod', objectId=None, behavioralState=None),
+            Comment(observationNum=None, date=None, time=None, id=1, text=None),
+            Behavior(observationNum=3, date=date, time=time, code='b', behavior='Blow',
+                     podId=1, individualId=None)
+        ]
+        
+        expected = self._textFormat.readDocument(self._filePath)
+        document = Document(
+            observations, documentFormat=expected.documentFormat, fileFormat=self._textFormat)
+        
+        self.assertTrue(self._cacheFormat.writeCache(document, self._filePath))
+        
+        document = self._cacheFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, observations)
+    
+    
+    def testOutOfDateCache(self):
+        
+        self._writeCache()
+        
+        # Change file contents and size.
+        self._writeFile(_LINES[:-1])
+        
+        self.assertFalse(self._cacheFormat.isFileRecognized(self._filePath))
+        self._assertRaises(
+            UnrecognizedFileFormatError, self._cacheFormat.readDocument, self._filePath)
+    
+    
+    def testChangedContentsWithSameSizeAndTime(self):
+        
+        self._writeCache()
+        
+        status = os.stat(self._filePath)
+        self._writeFile(_LINES[:-1] + [_LINES[-1].replace('north', 'south')])
+        os.utime(self._filePath, ns=(status.st_atime_ns, status.st_mtime_ns))
+        
+        # The size and modification time of the file match the cache, but its hash
+        # does not.
+        self.assertTrue(self._cacheFormat.isFileRecognized(self._filePath))
+        self._assertRaises(
+            UnrecognizedFileFormatError, self._cacheFormat.readDocument, self._filePath)
+    
+    
+    def testMissingCache(self):
+        self.assertFalse(self._cacheFormat.isFileRecognized(self._filePath))
+        self._assertRaises(
+            UnrecognizedFileFormatError, self._cacheFormat.readDocument, self._filePath)
+    
+    
+    def testSourceStateBeforeRead(self):
+        
+        # A cache written with the state of its file from before the document
+        # was read is out of date if the file changed during the read.
+        sourceState = self._cacheFormat.getSourceState(self._filePath)
+        document = self._textFormat.readDocument(self._filePath)
+        self._writeFile(_LINES[:-1])
+        
+        self.assertTrue(self._cacheFormat.writeCache(document, self._filePath, sourceState))
+        self.assertFalse(self._cacheFormat.isFileRecognized(self._filePath))
+    
+    
+    def testEviction(self):
+        
+        filePaths = [os.path.join(self._dirPath, 'Test{:d}.txt'.format(i)) for i in range(3)]
+        
+        for filePath in filePaths:
+            shutil.copyfile(self._filePath, filePath)
+        
+        document = self._textFormat.readDocument(self._filePath)
+        
+        # We use a cache directory of our own, so that only our cache files
+        # are evicted.
+        cacheDirPath = os.path.join(self._dirPath, 'Cache')
+        cacheFormat = ColumnarCacheFileFormat(cacheDirPath)
+        
+        self.assertTrue(cacheFormat.writeCache(document, filePaths[0]))
+        cacheSize = os.path.getsize(cacheFormat.getCacheFilePath(filePaths[0]))
+        
+        cacheFormat = ColumnarCacheFileFormat(cacheDirPath, 2 * cacheSize)
+        self.assertTrue(cacheFormat.writeCache(document, filePaths[1]))
+        
+        # Make the first cache file the most recently used one.
+        os.utime(cacheFormat.getCacheFilePath(filePaths[1]), ns=(0, 0))
+        self.assertIsNotNone(cacheFormat.readDocument(filePaths[0]))
+        
+        self.assertTrue(cacheFormat.writeCache(document, filePaths[2]))
+        
+        self.assertTrue(cacheFormat.isFileRecognized(filePaths[0]))
+        self.assertFalse(cacheFormat.isFileRecognized(filePaths[1]))
+        self.assertTrue(cacheFormat.isFileRecognized(filePaths[2]))
+        
+        # A cache file larger than the maximum size is not written.
+        cacheFormat = ColumnarCacheFileFormat(cacheDirPath, cacheSize - 1)
+        self.assertFalse(cacheFormat.writeCache(document, self._filePath))
+        self.assertTrue(cacheFormat.isFileRecognized(filePaths[0]))
+    
+    
+    def testModuleReadDocumentWithoutCache(self):
+        DocumentFileFormat.readDocument(self._filePath, writeCache=False)
+        self.assertFalse(self._cacheFormat.isFileRecognized(self._filePath))
+    
+    
+    def testModuleReadDocument(self):
+        
+        expected = self._textFormat.readDocument(self._filePath)
+        
+        # first read parses text and writes cache
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, expected.observations)
+        self.assertTrue(self._cacheFormat.isFileRecognized(self._filePath))
+        
+        # second read reads cache
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, expected.observations)
+        self.assertIsInstance(document.fileFormat, MakaDocumentFileFormat)
+        
+        # out-of-date cache falls back to text
+        status = os.stat(self._filePath)
+        self._writeFile(_LINES[:-1] + [_LINES[-1].replace('north', 'south')])
+        os.utime(self._filePath, ns=(status.st_atime_ns, status.st_mtime_ns))
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations[-1].text, 'Pod "A" is traveling \\ south')
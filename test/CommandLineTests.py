@@ -0,0 +1,139 @@
+from contextlib import redirect_stdout
+import csv
+import io
+import json
+import os
+
+from maka.__main__ import _main
+from maka.format.ColumnarCacheFileFormat import ColumnarCacheFileFormat
+from maka.format.DocumentJournal import DocumentJournal
+import maka.format.DocumentFileFormat as DocumentFileFormat
+
+from MakaTests import SAMPLE_LINES as _LINES, TestCase, formatDocument
+
+
+class CommandLineTests(TestCase):
+
+
+    def setUp(self):
+
+        self._dirPath = self._createTempDir()
+        self._outputDirPath = os.path.join(self._dirPath, 'Output')
+        os.mkdir(self._outputDirPath)
+
+
+    def _writeFile(self, name, lines):
+        return self._writeDocumentFile(self._dirPath, name, lines)
+
+
+    def _run(self, *args):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = _main(list(args))
+        return (status, output.getvalue().splitlines())
+
+
+    def testValidate(self):
+
+        lines = list(_LINES)
+        lines[1] = 'Bobo'
+        lines[2] = lines[2].replace('2/1/13', '2/31/13')
+        badPath = self._writeFile('Bad.txt', lines)
+        goodPath = self._writeFile('Good.txt', _LINES)
+
+        status, output = self._run('validate', goodPath, badPath)
+
+        self.assertEqual(status, 1)
+        self.assertEqual(len(output), 2)
+        self.assertEqual(output[0], badPath + ':5: Observation type could not be determined.')
+        self.assertTrue(output[1].startswith(badPath + ':6:7: For observation field "date"'))
+
+        status, output = self._run('validate', goodPath)
+        self.assertEqual((status, output), (0, []))
+
+
+    def testFormat(self):
+
+        filePath = self._writeFile('Test.txt', [line.replace(' 1:23', ' 01:23') for line in _LINES])
+
+        self.assertEqual(self._run('format', '-o', self._outputDirPath, filePath), (0, []))
+
+        with open(os.path.join(self._outputDirPath, 'Test.txt')) as file:
+            lines = _LINES[:2] + [_LINES[2].replace('"Bobo"', 'Bobo')]
+            self.assertEqual(file.read(), formatDocument(lines))
+
+
+    def testConvert(self):
+
+        filePath = self._writeFile('Test.txt', _LINES)
+
+        self.assertEqual(self._run('convert', '--to', 'json', '-o', self._outputDirPath, filePath), (0, []))
+
+        with open(os.path.join(self._outputDirPath, 'Test.json')) as file:
+            data = json.load(file)
+
+        self.assertEqual(
+            [obs['type'] for obs in data['observations']], ['Fix', 'Fix', 'Comment'])
+        self.assertEqual(data['observations'][1]['fields']['azimuth'], 2.75)
+        self.assertEqual(data['observations'][2]['fields']['date'], '2013-02-01')
+
+        self.assertEqual(self._run('convert', '--to', 'csv', '-o', self._outputDirPath, filePath), (0, []))
+
+        with open(os.path.join(self._outputDirPath, 'Test.Fix.csv'), newline='') as file:
+            rows = list(csv.reader(file))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][rows[0].index('behavioralState')], '')
+        self.assertEqual(rows[2][rows[0].index('time')], '01:23:50')
+
+
+    def testSummarize(self):
+
+        filePaths = [self._writeFile(name, _LINES) for name in ('One.txt', 'Two.txt')]
+
+        status, output = self._run('--jobs', '2', 'summarize', *filePaths)
+
+        self.assertEqual(status, 0)
+        self.assertEqual(output[0], filePaths[0] + ': 3 observations from 2013-02-01 to 2013-02-01')
+        self.assertEqual(output[1:3], ['    Comment: 1', '    Fix: 2'])
+        self.assertEqual(output[-3:], ['Total: 6 observations', '    Comment: 2', '    Fix: 4'])
+
+
+    def testJournal(self):
+
+        filePath = self._writeFile('Test.txt', _LINES)
+
+        document = DocumentFileFormat.readDocument(filePath)
+        journal = DocumentJournal(document)
+        journal.start()
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+
+        # Commands see the saved edits of the journal.
+        status, output = self._run('summarize', filePath)
+        self.assertEqual(output[0], filePath + ': 2 observations from 2013-02-01 to 2013-02-01')
+
+        journal.close()
+
+
+    def testReadError(self):
+
+        filePath = os.path.join(self._dirPath, 'Missing.txt')
+
+        status, output = self._run('summarize', filePath)
+
+        self.assertEqual(status, 1)
+        self.assertTrue(output[0].startswith(filePath + ': error: '))
+
+
+    def testNoCacheWritten(self):
+
+        filePath = self._writeFile('Test.txt', _LINES)
+
+        self._run('validate', filePath)
+        self._run('format', '-o', self._outputDirPath, filePath)
+        self._run('convert', '--to', 'json', '-o', self._outputDirPath, filePath)
+        self._run('summarize', filePath)
+
+        self.assertFalse(
+            os.path.exists(ColumnarCacheFileFormat().getCacheFilePath(filePath)))
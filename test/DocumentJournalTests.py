@@ -0,0 +1,231 @@
+import os
+
+from maka.format.DocumentFileFormat import FileFormatError
+from maka.format.DocumentJournal import DocumentJournal
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
+import maka.format.DocumentFileFormat as DocumentFileFormat
+import maka.format.DocumentJournal as DocumentJournal_
+
+from MakaTests import SAMPLE_LINES, TestCase
+
+
+class DocumentJournalTests(TestCase):
+    
+    
+    def setUp(self):
+        
+        self._filePath = self._writeDocumentFile(
+            self._createTempDir(), 'Test.txt', SAMPLE_LINES)
+        
+        self._fileFormat = MakaDocumentFileFormat()
+        self._observations = MmrpDocumentFormat101().parseDocument(SAMPLE_LINES)
+    
+    
+    def _startJournal(self, maxNumEntries=1000):
+        document = self._fileFormat.readDocument(self._filePath)
+        journal = DocumentJournal(document, maxNumEntries)
+        journal.start()
+        return (document, journal)
+    
+    
+    def _readObservations(self):
+        return self._fileFormat.readDocument(self._filePath).observations
+    
+    
+    def _crash(self, journal):
+        # Simulate an application crash by abandoning the journal without closing it.
+        journal._file.close()
+    
+    
+    def testSave(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        document.edit('Edit', 1, 2, [obs[2].copy(text='Fred')])
+        journal.save()
+        
+        self.assertTrue(document.saved)
+        self.assertEqual(journal.numEntries, 3)
+        self.assertEqual(self._readObservations(), obs)
+        
+        journal.close()
+        
+        self.assertFalse(os.path.exists(journal.filePath))
+        self.assertEqual(self._readObservations(), [obs[1], obs[2].copy(text='Fred')])
+    
+    
+    def testCloseDiscardsUnsavedEdits(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        document.edit('Delete', 0, 1, [])
+        
+        journal.close()
+        
+        self.assertFalse(os.path.exists(journal.filePath))
+        self.assertEqual(self._readObservations(), obs[1:])
+    
+    
+    def testCompaction(self):
+        
+        document, journal = self._startJournal(maxNumEntries=2)
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        self.assertEqual(self._readObservations(), obs)
+        
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        self.assertEqual(journal.numEntries, 0)
+        self.assertTrue(document.saved)
+        self.assertEqual(self._readObservations(), obs[2:])
+        
+        journal.close()
+        self.assertEqual(self._readObservations(), obs[2:])
+    
+    
+    def testRecovery(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        document.edit('Insert', 2, 2, [obs[0]])
+        document.undo()
+        document.edit('Edit', 0, 1, [obs[1].copy(azimuth=3.)])
+        
+        expected = list(document.observations)
+        self._crash(journal)
+        
+        # Append an incomplete entry, as if the crash occurred while writing it.
+        with open(journal.filePath, 'a') as file:
+            file.write('edit 0 0 1\n' + SAMPLE_LINES[0][:10])
+        
+        self.assertTrue(DocumentJournal_.journalExists(self._filePath))
+        document, journal = DocumentJournal_.recoverDocument(self._filePath)
+        
+        self.assertEqual(document.observations, expected)
+        self.assertFalse(document.saved)
+        
+        # saved edits were folded into the document file
+        self.assertEqual(self._readObservations(), obs[1:])
+        
+        # unsaved edits can be undone
+        for _ in range(3):
+            document.undo()
+        self.assertTrue(document.saved)
+        self.assertEqual(document.observations, obs[1:])
+        
+        # recovered journal records edits
+        document.redo()
+        journal.save()
+        journal.close()
+        self.assertEqual(self._readObservations(), obs[1:] + [obs[0]])
+    
+    
+    def testFoldJournal(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        document.edit('Delete', 0, 1, [])
+        self._crash(journal)
+        
+        DocumentJournal_.foldJournal(self._filePath)
+        
+        self.assertFalse(DocumentJournal_.journalExists(self._filePath))
+        self.assertEqual(self._readObservations(), obs[1:])
+    
+    
+    def testStaleJournal(self):
+        
+        document, journal = self._startJournal()
+        document.edit('Delete', 0, 1, [])
+        self._crash(journal)
+        
+        with open(self._filePath, 'a') as file:
+            file.write('\n')
+        
+        self._assertRaises(FileFormatError, DocumentJournal_.recoverDocument, self._filePath)
+        self._assertRaises(FileFormatError, DocumentJournal_.foldJournal, self._filePath)
+        
+        # The document can still be read, without the edits of the stale journal.
+        self.assertTrue(DocumentJournal_.isJournalStale(self._filePath))
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, self._observations)
+        
+        # A stale journal can be set aside.
+        journalFilePath = DocumentJournal_.setAsideJournal(self._filePath)
+        self.assertEqual(journalFilePath, journal.filePath + '.stale')
+        self.assertFalse(DocumentJournal_.journalExists(self._filePath))
+        
+        document, journal = self._startJournal()
+        self._crash(journal)
+        self.assertFalse(DocumentJournal_.isJournalStale(self._filePath))
+        self.assertEqual(
+            DocumentJournal_.setAsideJournal(self._filePath), journal.filePath + '.stale.2')
+    
+    
+    def testReadDocument(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        document.edit('Delete', 0, 1, [])
+        
+        # Reading the document file applies the saved edits of its journal.
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, obs[1:])
+        self.assertTrue(all(obs.frozen for obs in document.observations))
+        self.assertTrue(document.saved)
+        
+        document = DocumentFileFormat.readDocument(self._filePath, applyJournal=False)
+        self.assertEqual(document.observations, obs)
+        
+        journal.close()
+    
+    
+    def testCompactionCrash(self):
+        
+        document, journal = self._startJournal()
+        
+        obs = self._observations
+        document.edit('Delete', 0, 1, [])
+        journal.save()
+        
+        # Simulate a crash during compaction, after the document file is written
+        # but before the new journal is started.
+        document.fileFormat.writeDocument(document, self._filePath, document.documentFormat)
+        self._crash(journal)
+        
+        # The stale journal's saved edits are in the document file, and are not
+        # applied again.
+        self.assertTrue(DocumentJournal_.isJournalStale(self._filePath))
+        document = DocumentFileFormat.readDocument(self._filePath)
+        self.assertEqual(document.observations, obs[1:])
+        
+        DocumentJournal_.deleteJournal(self._filePath)
+        self.assertFalse(DocumentJournal_.journalExists(self._filePath))
+    
+    
+    def testBadJournal(self):
+        
+        document, journal = self._startJournal()
+        self._crash(journal)
+        
+        with open(journal.filePath, 'a') as file:
+            file.write('bobo\n')
+        
+        self._assertRaises(FileFormatError, DocumentJournal_.recoverDocument, self._filePath)
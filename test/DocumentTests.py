@@ -1,8 +1,11 @@
 
 
-from maka.data.Document import Document
+import sys
+
+from maka.data.Document import Document, FieldChange
 from maka.data.Field import Integer
 from maka.data.Observation import Observation
+from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
 
 from MakaTests import TestCase
 
@@ -71,6 +74,304 @@ class DocumentTests(TestCase):
             self._assertRaises(ValueError, self.document.edit, 'Edit', i, n, [])
             
             
+    def testEditSharesObservations(self):
+        
+        self._edit(0, 0, [0, 1, 2, 3])
+        observations = list(self.document.observations)
+        self.assertTrue(all(obs.frozen for obs in observations))
+        
+        obs = observations[1].copy(x=10)
+        self.document.edit('Edit', 1, 2, [obs])
+        self.assertIs(self.document.observations[1], obs)
+        self.assertTrue(obs.frozen)
+        self.assertIs(self.edit.oldObservations[0], observations[1])
+        
+        self.document.undo()
+        self.assertEqual(self.document.observations, observations)
+        for a, b in zip(self.document.observations, observations):
+            self.assertIs(a, b)
+            
+        self.document.redo()
+        self.assertIs(self.document.observations[1], obs)
+        self._assertObservations([0, 10, 2, 3])
+        
+        
+    def testCoalescedInsertions(self):
+        
+        self.document.editHistory.configure(coalesce=True)
+        
+        self._edit(0, 0, [0])
+        self.document.markSaved()
+        
+        for i in range(1, 4):
+            self._edit(i, i, [i])
+            
+        self._edit(1, 1, [10])
+        self._edit(0, 1, [20])
+        
+        self.assertEqual(self.document.editHistory.numEdits, 4)
+        
+        self.document.undo()
+        self.document.undo()
+        self.assertEqual(self.document.undoName, 'Insert 3 Observations')
+        self.document.undo()
+        self._assertObservations([0])
+        self.assertTrue(self.document.saved)
+        
+        self.document.redo()
+        self._assertObservations([0, 1, 2, 3])
+        
+        
+    def testSpilledEdits(self):
+        
+        lines = [
+            '00010 2/1/13 1:23:45 Fix Dec 91:00:00 Az 2:30:00 Pod 1 State ""',
+            '00011 2/1/13 1:23:50 Fix Dec 91:00:00 Az 2:45:00 Pod 1 State ""',
+            '00012 2/1/13 1:23:55 Comment 1 "Bobo"'
+        ]
+        
+        documentFormat = MmrpDocumentFormat101()
+        observations = documentFormat.parseDocument(lines)
+        
+        document = Document(documentFormat=documentFormat)
+        document.editHistory.configure(maxSize=0, spill=True)
+        
+        document.edit('Insert', 0, 0, observations)
+        document.edit('Edit', 1, 2, [observations[1].copy(azimuth=3.)])
+        document.edit('Delete', 0, 1, [])
+        
+        # All but the most recent edit are spilled.
+        self.assertEqual(document.editHistory.size, document.editHistory._edits[-1].size)
+        self.assertEqual(
+            [edit.spilled for edit in document.editHistory._edits], [True, True, False])
+        
+        expected = [observations[1].copy(azimuth=3.), observations[2]]
+        self.assertEqual(document.observations, expected)
+        
+        document.undo()
+        document.undo()
+        self.assertEqual(document.observations, observations)
+        
+        document.undo()
+        self.assertEqual(document.observations, [])
+        
+        document.redo()
+        document.redo()
+        document.redo()
+        self.assertEqual(document.observations, expected)
+        self.assertTrue(all(obs.frozen for obs in document.observations))
+        
+        
+    def testSpilledEditsExact(self):
+        
+        # Angles that formatting as degrees, minutes, and seconds would round.
+        documentFormat = MmrpDocumentFormat101()
+        fix = documentFormat.parseDocument(
+            ['00010 2/1/13 1:23:45 Fix Dec 91:00:00 Az 2:30:00 Pod 1 State ""'])[0]
+        observations = [fix.copy(declination=91.123456789, azimuth=1. / 3)]
+        
+        document = Document(documentFormat=documentFormat)
+        document.editHistory.configure(maxSize=0, spill=True)
+        
+        document.edit('Insert', 0, 0, observations)
+        document.edit('Edit', 0, 1, [fix])
+        document.edit('Edit', 0, 1, [observations[0].copy(azimuth=2. / 3)])
+        
+        self.assertTrue(document.editHistory._edits[1].spilled)
+        
+        document.undo()
+        document.undo()
+        self.assertEqual(document.observations, observations)
+        self.assertEqual(document.observations[0].azimuth, 1. / 3)
+        
+        document.undo()
+        document.redo()
+        self.assertEqual(document.observations, observations)
+        self.assertTrue(document.observations[0].frozen)
+        
+        
+    def testDiscardedSpilledEdits(self):
+        
+        document = Document()
+        history = document.editHistory
+        history.configure(maxNumEdits=2, maxSize=0, spill=True)
+        
+        for i in range(10):
+            document.edit('Insert', i, i, _createObservations(range(i * 100, (i + 1) * 100)))
+            
+        # Only the one spilled edit that the history keeps is in the edit log.
+        self.assertEqual([edit.spilled for edit in history._edits], [True, False])
+        edit = history._edits[0]
+        self.assertEqual(history._log.fileSize, len(history._log.read(edit._logKey)))
+        
+        history.clear()
+        self.assertEqual(history._log.fileSize, 0)
+        
+        
+    def testEditSize(self):
+        
+        observations = _createObservations(range(1000))
+        document = Document(observations)
+        
+        document.edit('Edit', 0, 1000, observations[:500] + _createObservations(range(500)))
+        edit = document.editHistory._edits[-1]
+        
+        # The size of an edit is that of its old observations plus that of the new
+        # observations it does not share with them.
+        obsSize = (edit.size - 2 * sys.getsizeof(observations)) / 1500
+        self.assertEqual(edit.size, 2 * sys.getsizeof(observations) + 1500 * obsSize)
+        self.assertGreater(obsSize, sys.getsizeof(observations[0]))
+        
+        
+    def testFormattedObservations(self):
+        
+        documentFormat = _CountingDocumentFormat()
+        observations = _createObservations([0, 1, 2, 3])
+        document = Document(observations, documentFormat=documentFormat)
+        
+        self.assertEqual(document.getFormattedObservations(1, 3), ['1', '2'])
+        self.assertEqual(documentFormat.count, 2)
+        
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '1', '2', '3'])
+        self.assertEqual(documentFormat.count, 4)
+        
+        # An edit that keeps some of the observations it replaces invalidates only
+        # the formatted versions of the new ones.
+        document.edit('Edit', 1, 3, [observations[1], Obs(x=10)])
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '1', '10', '3'])
+        self.assertEqual(documentFormat.count, 5)
+        
+        document.edit('Delete', 0, 1, [])
+        self.assertEqual(document.getFormattedObservations(0, 3), ['1', '10', '3'])
+        self.assertEqual(document.getFormattedObservation(2), '3')
+        self.assertEqual(documentFormat.count, 5)
+        
+        document.undo()
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '1', '10', '3'])
+        self.assertEqual(documentFormat.count, 6)
+        
+        
+    def testFormattedObservationsOneForOne(self):
+        
+        # The main window updates rows in place for edits that replace
+        # observations one for one, so their formatted versions must not be stale.
+        
+        documentFormat = _CountingDocumentFormat()
+        document = Document(_createObservations([0, 1, 2, 3]), documentFormat=documentFormat)
+        changes = []
+        document.addFieldChangeListener(changes.extend)
+        
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '1', '2', '3'])
+        
+        document.edit('Edit', 1, 3, _createObservations([10, 11]))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '10', '11', '3'])
+        self.assertEqual(documentFormat.count, 6)
+        
+        document.undo()
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '1', '2', '3'])
+        
+        document.redo()
+        self.assertEqual(document.getFormattedObservations(0, 4), ['0', '10', '11', '3'])
+        
+        
+    def testFieldChangeListeners(self):
+        
+        class Other(Observation):
+            x = Integer
+            
+        changes = []
+        document = Document(_createObservations([0, 1, 2, 3]))
+        document.addFieldChangeListener(changes.append)
+        
+        document.edit('Edit', 1, 3, [document.observations[1], Obs(x=12)])
+        self.assertEqual(changes, [[FieldChange(2, 'x', 2, 12)]])
+        
+        document.undo()
+        document.redo()
+        self.assertEqual(changes[1:], [[FieldChange(2, 'x', 12, 2)], [FieldChange(2, 'x', 2, 12)]])
+        
+        # Edits that insert, delete, or change the classes of observations, and
+        # edits that change no field values, are not reported.
+        del changes[:]
+        document.edit('Insert', 0, 0, [Obs(x=10)])
+        document.edit('Delete', 0, 1, [])
+        document.edit('Edit', 0, 1, [Other(x=0)])
+        document.edit('Edit', 1, 2, [Obs(x=1)])
+        self.assertEqual(changes, [])
+        
+        document.removeFieldChangeListener(changes.append)
+        document.edit('Edit', 1, 2, [Obs(x=11)])
+        self.assertEqual(changes, [])
+        
+        
+    def testTransaction(self):
+        
+        document = self.document
+        self._edit(0, 0, [0, 1, 2, 3, 4, 5])
+        
+        with document.transaction('Bobo'):
+            self._edit(4, 5, [14])
+            self._edit(1, 1, [10, 11])
+            self._edit(7, 8, [])
+            self._edit(0, 1, [20])
+            self.assertEqual(self.edit.name, 'Edit')
+            self._assertObservations([20, 10, 11, 1, 2, 3, 14])
+            
+        self._assertObservations([20, 10, 11, 1, 2, 3, 14])
+        self.assertEqual(self.edit.name, 'Bobo')
+        self.assertEqual(
+            (self.edit.startIndex, self.edit.endIndex, self.edit.numNewObservations), (0, 6, 7))
+        self.assertTrue(all(obs.frozen for obs in document.observations))
+        
+        self.assertEqual(document.undoName, 'Bobo')
+        document.undo()
+        self._assertObservations([0, 1, 2, 3, 4, 5])
+        document.redo()
+        self._assertObservations([20, 10, 11, 1, 2, 3, 14])
+        
+        
+    def testTransactionNotification(self):
+        
+        edits = []
+        changes = []
+        document = Document(_createObservations([0, 1, 2, 3]))
+        document.addEditListener(edits.append)
+        document.addFieldChangeListener(changes.append)
+        
+        with document.transaction('Outer'):
+            document.edit('Edit', 0, 1, [Obs(x=10)])
+            with document.transaction('Inner'):
+                document.edit('Edit', 3, 4, [Obs(x=13)])
+            self.assertEqual(edits, [])
+            
+        self.assertEqual([edit.name for edit in edits], ['Outer'])
+        self.assertEqual(changes, [[FieldChange(0, 'x', 0, 10), FieldChange(3, 'x', 3, 13)]])
+        
+        # A transaction without edits records nothing.
+        with document.transaction('Empty'):
+            pass
+        self.assertEqual(len(edits), 1)
+        self.assertEqual(document.undoName, 'Outer')
+        
+        
+    def testTransactionRollback(self):
+        
+        document = self.document
+        self._edit(0, 0, [0, 1, 2, 3])
+        
+        with self.assertRaises(ValueError):
+            with document.transaction('Bobo'):
+                self._edit(1, 3, [])
+                self._edit(0, 1, [10])
+                self._assertObservations([10, 3])
+                document.undo()
+                
+        self._assertObservations([0, 1, 2, 3])
+        self.assertEqual(document.undoName, 'Edit')
+        self.assertEqual(self.edit.name, 'Edit')
+        
+        
     def _assertObservations(self, ints):
         obses = self.document.observations
         self.assertEqual(len(obses), len(ints))
@@ -80,3 +381,15 @@ class DocumentTests(TestCase):
         
     def editListener(self, edit):
         self.edit = edit
+
+
+class _CountingDocumentFormat(object):
+    
+    
+    def __init__(self):
+        self.count = 0
+        
+        
+    def formatObservation(self, obs):
+        self.count += 1
+        return str(obs.x)
@@ -1,4 +1,4 @@
-from maka.data.EditHistory import Edit, EditHistory
+from maka.data.EditHistory import Edit, EditHistory, EditLog
 
 from MakaTests import TestCase
 
@@ -23,6 +23,18 @@ class ListEdit(Edit):
     def do(self):
         self._list[self._index] = self._newValue
         
+        
+    @property
+    def size(self):
+        return 10
+    
+    
+    def merge(self, edit):
+        if edit.name == self.name and edit._index == self._index:
+            return ListEdit(self.name, self._list, self._index, self._oldValue, edit._newValue)
+        else:
+            return None
+        
     
 class EditHistoryTests(TestCase):
     
@@ -120,3 +132,121 @@ class EditHistoryTests(TestCase):
         h.redo()
         self.assertFalse(h.documentSaved)
         
+        
+    def testMaxNumEdits(self):
+        
+        h = self._history
+        h.configure(maxNumEdits=2)
+        
+        self._edit('one', 1, 21)
+        self._edit('two', 2, 22)
+        h.markDocumentSaved()
+        self._edit('three', 3, 23)
+        self.assertEqual(h.numEdits, 2)
+        self.assertFalse(h.documentSaved)
+        
+        h.undo()
+        self.assertTrue(h.documentSaved)
+        h.undo()
+        self._assertState(None, 'two', [0, 21, 2, 3])
+        self.assertFalse(h.documentSaved)
+        
+        h.redo()
+        h.redo()
+        self._edit('four', 0, 20)
+        self._assertState('four', None, [20, 21, 22, 23])
+        
+        h.undo()
+        h.undo()
+        self._assertState(None, 'three', [0, 21, 22, 3])
+        self.assertTrue(h.documentSaved)
+        self._assertRaises(IndexError, h.undo)
+        
+        # saved state is no longer reachable
+        h.redo()
+        h.redo()
+        self._edit('five', 0, 30)
+        self.assertFalse(h.documentSaved)
+        h.undo()
+        h.undo()
+        self.assertFalse(h.documentSaved)
+        
+        
+    def testMaxSize(self):
+        
+        h = self._history
+        h.configure(maxSize=25)
+        
+        for i in range(4):
+            self._edit(str(i), i, 20 + i)
+            
+        self.assertEqual(h.numEdits, 2)
+        self.assertEqual(h.size, 20)
+        
+        # most recent edit is kept even when it exceeds the maximum size
+        h.configure(maxSize=5)
+        self.assertEqual(h.numEdits, 1)
+        self._assertState('3', None, [20, 21, 22, 23])
+        
+        
+    def testCoalesce(self):
+        
+        h = self._history
+        h.configure(coalesce=True)
+        
+        self._edit('one', 1, 21)
+        self._edit('one', 1, 31)
+        self._edit('two', 1, 41)
+        self.assertEqual(h.numEdits, 2)
+        
+        h.undo()
+        self._assertState('one', 'two', [0, 31, 2, 3])
+        h.undo()
+        self._assertState(None, 'one', [0, 1, 2, 3])
+        h.redo()
+        self._assertState('one', 'two', [0, 31, 2, 3])
+        
+        # edits are not merged across a save
+        h.markDocumentSaved()
+        self._edit('one', 1, 51)
+        self.assertEqual(h.numEdits, 2)
+        h.undo()
+        self.assertTrue(h.documentSaved)
+        
+        
+    def testConfigureErrors(self):
+        h = self._history
+        self._assertRaises(ValueError, h.configure, maxNumEdits=0)
+        self._assertRaises(ValueError, h.configure, maxSize=-1)
+        
+        
+    def testEditLog(self):
+        
+        log = EditLog()
+        data = [bytes([i]) * 600000 for i in range(3)]
+        
+        try:
+            
+            keys = [log.write(d) for d in data]
+            self.assertEqual(log.fileSize, 1800000)
+            
+            # Releasing one record leaves less released space than the minimum
+            # compaction size.
+            log.release(keys[0])
+            self.assertEqual(log.fileSize, 1800000)
+            
+            # Releasing another compacts the log.
+            log.release(keys[1])
+            self.assertEqual(log.fileSize, 600000)
+            self.assertEqual(log.read(keys[2]), data[2])
+            
+            # Releasing the last record empties the log.
+            log.release(keys[2])
+            self.assertEqual(log.fileSize, 0)
+            
+            key = log.write(data[0])
+            self.assertEqual(log.read(key), data[0])
+            
+        finally:
+            log.close()
+
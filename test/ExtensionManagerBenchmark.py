@@ -0,0 +1,55 @@
+'''
+Benchmark measuring the time taken to import and look up Maka extensions.
+
+Run this script with the Maka `src` directory on the Python path. For each of
+several extension lookups, it runs a new Python process that times importing
+the extension manager and performing the lookup, and reports the shortest time
+of several runs. Looking up all extensions takes about as long as the extension
+manager's first use did when it imported every extension module eagerly.
+'''
+
+
+import os
+import subprocess
+import sys
+
+
+_LOOKUPS = [
+    ('Maka document file format',
+     "ExtensionManager.getExtension('DocumentFileFormat', 'Maka Document File Format')"),
+    ('all document file formats',
+     "ExtensionManager.getExtensions('DocumentFileFormat')"),
+    ('MMRP document format',
+     "ExtensionManager.getExtension('DocumentFormat', \"'96 MMRP Grammar 1.01\")"),
+    ('dummy theodolite',
+     "ExtensionManager.getExtension('Device', 'Dummy Theodolite')"),
+    ('all extensions',
+     "[ExtensionManager.getExtensions(t) for t in "
+     "('DocumentFileFormat', 'DocumentFormat', 'CommandInterpreter', 'Device')]")
+]
+
+_SCRIPT = '''
+import time
+startTime = time.perf_counter()
+import maka.util.ExtensionManager as ExtensionManager
+{:s}
+print(time.perf_counter() - startTime)
+'''
+
+_NUM_REPETITIONS = 5
+
+
+def _main():
+    for name, lookup in _LOOKUPS:
+        times = [_runScript(_SCRIPT.format(lookup)) for _ in range(_NUM_REPETITIONS)]
+        print('{:s}: {:.1f} ms'.format(name, min(times) * 1000))
+
+
+def _runScript(script):
+    output = subprocess.check_output(
+        [sys.executable, '-c', script], env=os.environ, universal_newlines=True)
+    return float(output)
+
+
+if __name__ == '__main__':
+    _main()
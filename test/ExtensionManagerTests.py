@@ -0,0 +1,120 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
+import maka.format.DocumentFileFormat as DocumentFileFormat
+import maka.util.ExtensionManager as ExtensionManager
+
+from MakaTests import TestCase
+
+
+_DOCUMENT = '''aardvark data
+grammar "'96 MMRP Grammar 1.01"
+
+00010 2/1/13 1:23:45 Fix Dec 91:00:00 Az 2:30:00 Pod 1 State ""
+'''
+
+
+class ExtensionManagerTests(TestCase):
+
+
+    def testGetExtension(self):
+
+        self.assertIs(
+            ExtensionManager.getExtension('DocumentFileFormat', 'Maka Document File Format'),
+            MakaDocumentFileFormat)
+
+        self.assertIs(
+            ExtensionManager.getExtension('DocumentFormat', "'96 MMRP Grammar 1.01"),
+            MmrpDocumentFormat101)
+
+        self.assertIsNone(ExtensionManager.getExtension('DocumentFormat', 'Bobo'))
+        self.assertIsNone(ExtensionManager.getExtension('Bobo', 'Bobo'))
+
+
+    def testGetExtensions(self):
+
+        extensions = ExtensionManager.getExtensions('DocumentFileFormat')
+
+        self.assertIn(MakaDocumentFileFormat, extensions)
+        self.assertEqual(
+            frozenset(e.extensionName for e in extensions),
+            ExtensionManager.getExtensionNames('DocumentFileFormat'))
+
+        self.assertEqual(ExtensionManager.getExtensions('Bobo'), frozenset())
+
+
+    def testGetExtensionInstance(self):
+
+        docFormat = ExtensionManager.getExtensionInstance(
+            'DocumentFormat', "'96 MMRP Grammar 1.01")
+
+        self.assertIsInstance(docFormat, MmrpDocumentFormat101)
+        self.assertIs(
+            ExtensionManager.getExtensionInstance('DocumentFormat', "'96 MMRP Grammar 1.01"),
+            docFormat)
+
+        self.assertIsNone(ExtensionManager.getExtensionInstance('DocumentFormat', 'Bobo'))
+
+
+    def testSharedDocumentFormats(self):
+
+        dirPath = tempfile.mkdtemp()
+
+        try:
+
+            fileFormat = MakaDocumentFileFormat()
+
+            filePaths = [os.path.join(dirPath, name) for name in ('One.txt', 'Two.txt')]
+            for filePath in filePaths:
+                with open(filePath, 'w') as file:
+                    file.write(_DOCUMENT)
+
+            documents = [fileFormat.readDocument(filePath) for filePath in filePaths]
+
+            self.assertIs(documents[0].documentFormat, documents[1].documentFormat)
+            self.assertIs(
+                DocumentFileFormat.getDocumentFileFormat(filePaths[0]),
+                ExtensionManager.getExtensionInstance(
+                    'DocumentFileFormat', 'Maka Document File Format'))
+
+        finally:
+            shutil.rmtree(dirPath)
+
+
+    def testLazyLoading(self):
+
+        # We check which modules are imported in a new process, since this one
+        # has probably imported all of them already.
+        script = '\n'.join([
+            'import sys',
+            'import maka.util.ExtensionManager as ExtensionManager',
+            "ExtensionManager.getExtensions('DocumentFileFormat')",
+            "ExtensionManager.getExtension('Device', 'Dummy Theodolite')",
+            "ExtensionManager.getExtensionNames('Device')",
+            "print(' '.join(sorted(sys.modules)))"
+        ])
+
+        modules = _runScript(script).split()
+
+        self.assertIn('maka.format.MakaDocumentFileFormat', modules)
+        self.assertIn('maka.device.DummyTheodolite', modules)
+        self.assertNotIn('maka.device.SokkiaTheodolite', modules)
+        self.assertNotIn('maka.mmrp.MmrpDocumentFormat101', modules)
+        self.assertNotIn('serial', modules)
+
+
+def _runScript(script):
+
+    srcDirPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [srcDirPath] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+
+    return subprocess.check_output(
+        [sys.executable, '-c', script], env=env, universal_newlines=True)
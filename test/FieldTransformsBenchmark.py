@@ -0,0 +1,95 @@
+'''
+Benchmark of bulk field transforms of document observations.
+
+Run this script with the Maka `src` directory on the Python path. It creates a
+document of MMRP fixes and comments, and reports the time it takes to swap the
+angles of all of the fixes and to offset their azimuths, both by copying each
+fix in a Python loop as the Swap Angles command once did and with the
+`Document.transformFields` method, with and (if NumPy is installed) without
+NumPy. Each transform is one undoable edit, which the benchmark undoes.
+'''
+
+
+import time
+
+from maka.data.Document import Document
+from maka.data.FieldTransforms import _transformObservations
+from maka.mmrp.MmrpDocument101 import Comment, Fix
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_NUM_OBSERVATIONS = 100000
+_NUM_REPETITIONS = 3
+
+
+def _main():
+    
+    document = Document(_createObservations())
+    
+    _benchmark('Swap by copying', document, _swapByCopying)
+    
+    for name, transform in [('Swap', _swap), ('Offset', _offset)]:
+        
+        _benchmark(name + ' with transformFields', document,
+                   lambda d: d.transformFields(name, Fix, transform))
+        
+        if numpy is not None:
+            _benchmark(name + ' without NumPy', document,
+                       lambda d: _transformWithoutNumpy(d, name, transform))
+            
+            
+def _createObservations():
+    return [Fix(declination=90 + (i % 60) / 10., azimuth=(i % 3600) / 10.) if i % 10 != 0
+            else Comment(text='Bobo')
+            for i in range(_NUM_OBSERVATIONS)]
+    
+    
+def _swap(columns):
+    return {'azimuth': columns['declination'], 'declination': columns['azimuth']}
+
+
+def _offset(columns):
+    return {'azimuth': (columns['azimuth'] + 12.5) % 360}
+
+
+def _swapByCopying(document):
+    
+    observations = [
+        obs.copy(azimuth=obs.declination, declination=obs.azimuth)
+        if obs.__class__ is Fix else obs
+        for obs in document.observations]
+    
+    document.edit('Swap', 0, len(observations), observations)
+    
+    
+def _transformWithoutNumpy(document, name, transform):
+    
+    changes = _transformObservations(document.observations, Fix, transform, None, None)
+    
+    observations = list(document.observations)
+    for i, obs in changes:
+        observations[i] = obs
+        
+    document.edit(name, 0, len(observations), observations)
+    
+    
+def _benchmark(name, document, function):
+    
+    times = []
+    
+    for _ in range(_NUM_REPETITIONS):
+        startTime = time.perf_counter()
+        function(document)
+        times.append(time.perf_counter() - startTime)
+        document.undo()
+        
+    print('{:s}: {:.1f} ms for {:d} observations'.format(
+        name, 1000 * min(times), len(document.observations)))
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,139 @@
+from maka.data.Document import Document
+from maka.data.Field import Float, Integer, String
+from maka.data.FieldTransforms import _transformObservations
+from maka.data.Observation import Observation
+from MakaTests import TestCase
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Angles(Observation):
+    azimuth = Float(min=0, max=360, maxInclusive=False)
+    declination = Float(min=0, max=360, maxInclusive=False)
+    count = Integer
+    
+    
+class Comment(Observation):
+    text = String
+    count = Integer
+    
+    
+def _createObservations():
+    return [
+        Angles(azimuth=10., declination=90., count=1),
+        Comment(text='bobo', count=2),
+        Angles(azimuth=20., declination=None, count=3),
+        Angles(azimuth=30., declination=95., count=4)
+    ]
+    
+    
+class FieldTransformsTests(TestCase):
+    
+    
+    def _transform(self, observations, obsClasses, transform, predicate=None):
+        
+        # The NumPy and per-observation implementations should agree.
+        results = [
+            _transformObservations(observations, obsClasses, transform, predicate, n)
+            for n in self._numpyModules]
+        
+        for result in results[1:]:
+            self.assertEqual(result, results[0])
+            
+        return results[0]
+    
+    
+    @property
+    def _numpyModules(self):
+        return [None] if numpy is None else [None, numpy]
+    
+    
+    def testSwap(self):
+        
+        observations = _createObservations()
+        
+        changes = self._transform(
+            observations, Angles,
+            lambda c: {'azimuth': c['declination'], 'declination': c['azimuth']})
+        
+        self.assertEqual([i for i, _ in changes], [0, 2, 3])
+        self.assertEqual(changes[0][1], Angles(azimuth=90., declination=10., count=1))
+        self.assertEqual(changes[1][1], Angles(azimuth=None, declination=20., count=3))
+        self.assertTrue(all(obs.frozen for _, obs in changes))
+        
+        
+    def testOffsetWithPredicate(self):
+        
+        observations = _createObservations()
+        
+        changes = self._transform(
+            observations, Angles, lambda c: {'azimuth': (c['azimuth'] + 345) % 360},
+            lambda c: c['count'] > 1)
+        
+        self.assertEqual([(i, obs.azimuth) for i, obs in changes], [(2, 5.), (3, 15.)])
+        
+        
+    def testConstantValue(self):
+        
+        observations = _createObservations()
+        
+        changes = self._transform(observations, (Angles, Comment), lambda c: {'count': 3})
+        
+        self.assertEqual([(i, obs.count) for i, obs in changes], [(0, 3), (1, 3), (3, 3)])
+        self.assertIs(changes[0][1].count.__class__, int)
+        
+        changes = self._transform(observations, [Comment], lambda c: {'text': 'fred'})
+        self.assertEqual(changes, [(1, Comment(text='fred', count=2))])
+        
+        
+    def testErrors(self):
+        
+        observations = _createObservations()
+        
+        for n in self._numpyModules:
+            
+            with self.assertRaises(ValueError) as cm:
+                _transformObservations(
+                    observations, Angles, lambda c: {'azimuth': c['azimuth'] * 12}, None, n)
+            self.assertIn('360', str(cm.exception))
+            
+            self.assertRaises(
+                ValueError, _transformObservations,
+                observations, (Angles, Comment), lambda c: {'azimuth': 0.}, None, n)
+            
+            self.assertRaises(
+                TypeError, _transformObservations,
+                observations, Angles, lambda c: {'count': c['count'] + .5}, None, n)
+            
+            
+    def testTransformFields(self):
+        
+        observations = _createObservations()
+        document = Document(list(observations))
+        
+        edits = []
+        document.addEditListener(edits.append)
+        
+        numChanged = document.transformFields(
+            'Offset', Angles, lambda c: {'azimuth': c['azimuth'] + 1},
+            lambda c: c['declination'] >= 90)
+        
+        self.assertEqual(numChanged, 2)
+        self.assertEqual(len(edits), 1)
+        self.assertEqual((edits[0].startIndex, edits[0].endIndex), (0, 4))
+        self.assertEqual([getattr(obs, 'azimuth', None) for obs in document.observations],
+                         [11., None, 20., 31.])
+        self.assertIs(document.observations[2], observations[2])
+        
+        document.undo()
+        self.assertEqual(document.observations, observations)
+        
+        self.assertEqual(document.transformFields('Bobo', Angles, lambda c: {}), 0)
+        self.assertEqual(len(edits), 2)
+        
+        with self.assertRaises(ValueError):
+            document.transformFields('Bobo', Angles, lambda c: {'azimuth': -1})
+        self.assertEqual(document.observations, observations)
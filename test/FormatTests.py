@@ -378,6 +378,27 @@ class FormatTests(TestCase):
                 self.assertEqual(getattr(obs, k), v)
                 
                 
+    def testObsParseErrors(self):
+        
+        import maka.mmrp.MmrpDocumentFormat101 as mmrpDocFormat
+        
+        f = SimpleObservationFormat(
+            'float* {f} integer {i} string {s}', Obs, mmrpDocFormat._fieldFormats)
+        
+        cases = [
+            ('float 1.23 integer 2',
+             'Observation "float 1.23 integer 2" of type "Obs" has wrong number of tokens '
+             '(4 instead of 6).'),
+            ('float bobo integer 2 string Hello',
+             'For observation field "f": Could not parse "bobo" as a floating point number.')
+        ]
+        
+        for s, message in cases:
+            with self.assertRaises(ValueError) as cm:
+                f.parseObservation(s)
+            self.assertEqual(str(cm.exception), message)
+                
+                
     def testFormatAndParseDocument(self):
         
         from datetime import date, time
@@ -404,6 +425,26 @@ class FormatTests(TestCase):
         self.assertEqual(f.parseDocument(formattedObservations), observations)
         
         
+    def testParseDocumentDispatch(self):
+        
+        from maka.mmrp.MmrpDocument101 import Comment, Observer, TheoData
+        from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
+        
+        f = MmrpDocumentFormat101()
+        
+        lines = [
+            'Observer asf "Adam Frankel"',
+            '00000 1/1/12 0:00:00 Comment 0 "White marker is 315:20:30"',
+            '00001 1/1/12 0:00:10 TheoData Dec 91:00:00 Az 2:30:00'
+        ]
+        
+        classes = [obs.__class__ for obs in f.parseDocument(lines)]
+        self.assertEqual(classes, [Observer, Comment, TheoData])
+        
+        for line in ['Bobo', '00002 1/1/12 0:00:20 Bobo', '00003 1/1/12 Fix']:
+            self._assertRaises(ValueError, f.parseDocument, [line])
+        
+        
     def testFormatObservation(self):
         
         from maka.mmrp.MmrpDocument101 import Pod
@@ -434,5 +475,10 @@ class FormatTests(TestCase):
         self.assertEqual(f.fieldOrder, ('id', 'numWhales', 'numCalves', 'numSingers'))
         
         
+    def testBadObservationFormatItem(self):
+        from maka.mmrp.MmrpDocumentFormat101 import _fieldFormats
+        self._assertRaises(ValueError, SimpleObservationFormat, 'one* {bobo}', Obs, _fieldFormats)
+        
+        
 def _swap(pairs):
     return [(b, a) for (a, b) in pairs]
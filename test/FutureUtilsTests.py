@@ -0,0 +1,48 @@
+from concurrent.futures import Future
+
+import maka.util.FutureUtils as FutureUtils
+
+from MakaTests import TestCase
+
+
+class FutureUtilsTests(TestCase):
+    
+    
+    def testCreateCompletedFuture(self):
+        future = FutureUtils.createCompletedFuture(1)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 1)
+        
+        
+    def testTransformFuture(self):
+        
+        future = Future()
+        newFuture = FutureUtils.transformFuture(future, lambda f: f.result() + 1)
+        
+        self.assertFalse(newFuture.done())
+        future.set_result(1)
+        self.assertEqual(newFuture.result(), 2)
+        
+        future = Future()
+        newFuture = FutureUtils.transformFuture(future, lambda f: f.result() + 1)
+        future.set_exception(ValueError('Bobo.'))
+        self.assertIsInstance(newFuture.exception(), ValueError)
+        
+        
+    def testCombineFutures(self):
+        
+        futures = [Future(), Future()]
+        newFuture = FutureUtils.combineFutures(futures)
+        
+        futures[1].set_result(2)
+        self.assertFalse(newFuture.done())
+        futures[0].set_result(1)
+        self.assertEqual(newFuture.result(), (1, 2))
+        
+        futures = [Future(), Future()]
+        newFuture = FutureUtils.combineFutures(futures)
+        futures[1].set_exception(ValueError('Two.'))
+        futures[0].set_exception(TypeError('One.'))
+        self.assertIsInstance(newFuture.exception(), TypeError)
+        
+        self.assertEqual(FutureUtils.combineFutures([]).result(), ())
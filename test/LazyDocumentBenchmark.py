@@ -0,0 +1,88 @@
+'''
+Benchmark comparing reading a document with reading a lazy document.
+
+Run this script with the Maka `src` directory on the Python path. It writes a large
+MMRP document file to a temporary directory, checks that the lazy document read
+from the file equals the document read from it, and then reports the time each
+read takes and the memory allocated for each document.
+'''
+
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+
+
+_HEADER = '''aardvark data
+grammar "'96 MMRP Grammar 1.01"
+
+'''
+
+_LINES = [
+    '{:05d} 1/01/12 7:02:13 StartScan 1 Visibility 2 Beaufort 3 Swell 1.5 Vessels 0 Pods 2',
+    '{:05d} 1/01/12 7:02:40 TheoData Dec 91:12:30 Az 231:45:10',
+    '{:05d} 1/01/12 7:02:41 Fix Dec 91:12:30 Az 231:45:10 Pod 1 State trav',
+    '{:05d} 1/01/12 7:03:05 Behavior b Blow Pod 1 ""',
+    '{:05d} 1/01/12 7:03:30 Comment 1 "Pod \\"A\\" is traveling north"'
+]
+
+_NUM_OBSERVATIONS = 100000
+_NUM_REPETITIONS = 3
+
+
+def _main():
+    
+    dirPath = tempfile.mkdtemp()
+    
+    try:
+        
+        filePath = os.path.join(dirPath, 'Test.txt')
+        _writeFile(filePath)
+        
+        fileFormat = MakaDocumentFileFormat()
+        
+        document = fileFormat.readDocument(filePath)
+        
+        if fileFormat.readLazyDocument(filePath).observations != document.observations:
+            raise AssertionError('Lazy document differs from document.')
+        
+        print('Lazy document equals document.')
+        
+        _benchmark('eager', fileFormat.readDocument, filePath)
+        _benchmark('lazy', fileFormat.readLazyDocument, filePath)
+    
+    finally:
+        shutil.rmtree(dirPath)
+
+
+def _writeFile(filePath):
+    with open(filePath, 'w') as file:
+        file.write(_HEADER)
+        for i in range(_NUM_OBSERVATIONS):
+            file.write(_LINES[i % len(_LINES)].format(i) + '\n')
+
+
+def _benchmark(name, readDocument, filePath):
+    
+    times = []
+    
+    for _ in range(_NUM_REPETITIONS):
+        startTime = time.perf_counter()
+        readDocument(filePath)
+        times.append(time.perf_counter() - startTime)
+    
+    tracemalloc.start()
+    document = readDocument(filePath)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    print('{:s}: {:.3f} seconds and {:.1f} MB for {:d} observations'.format(
+        name, min(times), size / 1e6, len(document.observations)))
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,147 @@
+from maka.data.LazyDocument import LazyDocument
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+import maka.format.DocumentFileFormat as DocumentFileFormat
+
+from MakaTests import DOCUMENT_HEADER, SURVEY_LINES as _LINES, TestCase, formatDocument
+
+
+class LazyDocumentTests(TestCase):
+    
+    
+    def setUp(self):
+        self._fileFormat = MakaDocumentFileFormat()
+        self._filePath = self._writeDocumentFile(self._createTempDir(), 'Test.txt', _LINES)
+    
+    
+    def _writeFile(self, text):
+        with open(self._filePath, 'wb') as file:
+            file.write(text.encode('utf-8'))
+    
+    
+    def _readDocuments(self, cacheSize=None):
+        expected = self._fileFormat.readDocument(self._filePath)
+        document = self._fileFormat.readLazyDocument(self._filePath, cacheSize)
+        self.assertIsInstance(document, LazyDocument)
+        return (document, expected)
+    
+    
+    def testReadLazyDocument(self):
+        
+        document, expected = self._readDocuments()
+        
+        self.assertEqual(len(document.observations), len(_LINES))
+        self.assertEqual(document.observations, expected.observations)
+        self.assertEqual(document.observations[1:3], expected.observations[1:3])
+        self.assertEqual(document.observations[-1], expected.observations[-1])
+        self.assertTrue(all(obs.frozen for obs in document.observations))
+        
+        self.assertEqual(document.filePath, self._filePath)
+        self.assertIs(document.fileFormat, self._fileFormat)
+        self.assertEqual(
+            document.documentFormat.extensionName, expected.documentFormat.extensionName)
+    
+    
+    def testModuleReadLazyDocument(self):
+        
+        # Reading a document writes its cache, but reading a lazy document should
+        # not read the cache.
+        DocumentFileFormat.readDocument(self._filePath)
+        
+        document = DocumentFileFormat.readLazyDocument(self._filePath)
+        self.assertIsInstance(document, LazyDocument)
+    
+    
+    def testBlankLinesAndCarriageReturns(self):
+        
+        self._writeFile(
+            (DOCUMENT_HEADER + '\n'.join(_LINES[:3]) + '\n\n\n' + '\n'.join(_LINES[3:]))
+                .replace('\n', '\r\n'))
+        
+        document, expected = self._readDocuments()
+        
+        self.assertEqual(len(document.observations), len(_LINES))
+        self.assertEqual(document.observations, expected.observations)
+        self.assertEqual(document.getFormattedObservations(0, 1), [_LINES[0]])
+    
+    
+    def testCacheSize(self):
+        
+        document, expected = self._readDocuments(cacheSize=2)
+        
+        self.assertEqual(document.observations, expected.observations)
+        self.assertEqual(len(document.observations._cache), 2)
+        
+        # The cache holds the most recently accessed observations.
+        obs = document.observations[-1]
+        self.assertIs(document.observations[-1], obs)
+    
+    
+    def testEdits(self):
+        
+        document, expected = self._readDocuments(cacheSize=2)
+        
+        original = list(expected.observations)
+        obs = original[4].copy(behavior='Breach')
+        
+        for doc in (document, expected):
+            doc.edit('Edit', 4, 5, [obs])
+            doc.edit('Delete', 0, 2, [])
+            doc.edit('Insert', 1, 1, original[:1])
+        
+        self.assertEqual(document.observations, expected.observations)
+        
+        for _ in range(3):
+            document.undo()
+        
+        self.assertEqual(document.observations, original)
+        
+        for _ in range(3):
+            document.redo()
+        
+        self.assertEqual(document.observations, expected.observations)
+    
+    
+    def testGetFormattedObservations(self):
+        
+        document, _ = self._readDocuments()
+        
+        self.assertEqual(document.getFormattedObservations(0, len(_LINES)), _LINES)
+        
+        obs = document.observations[4].copy(behavior='Breach')
+        document.edit('Edit', 4, 5, [obs])
+        
+        self.assertEqual(
+            document.getFormattedObservations(3, 5),
+            [_LINES[3], document.documentFormat.formatObservation(obs)])
+    
+    
+    def testParseError(self):
+        
+        self._writeFile(formatDocument(_LINES[:2] + ['bobo']))
+        
+        document = self._fileFormat.readLazyDocument(self._filePath)
+        
+        self.assertEqual(len(document.observations), 3)
+        
+        try:
+            document.observations[2]
+        except ValueError as e:
+            self.assertEqual(e.lineNum, 6)
+            self.assertEqual(e.filePath, self._filePath)
+        else:
+            self.fail('Parse error not raised.')
+    
+    
+    def testWriteDocumentToOwnFile(self):
+        
+        document, expected = self._readDocuments()
+        
+        document.edit('Delete', 0, 1, [])
+        self._fileFormat.writeDocument(document, self._filePath, document.documentFormat)
+        
+        # The document still reads its observations from the original file contents.
+        self.assertEqual(document.observations, expected.observations[1:])
+        
+        self.assertEqual(
+            self._fileFormat.readDocument(self._filePath).observations,
+            expected.observations[1:])
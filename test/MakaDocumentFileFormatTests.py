@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+
+from maka.format.Diagnostic import Diagnostic
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
+import maka.util.ExtensionManager as ExtensionManager
+
+from MakaTests import TestCase
+
+
+_HEADER = '''aardvark data
+grammar "'96 MMRP Grammar 1.01"
+
+'''
+
+
+_LINES = [
+    'Pod 1 Whales 2 Calves 1 Singers 0',
+    '00010 2/1/13 1:23:45 Fix Dec 91:00:00 Az 2:30:00 Pod 1 State ""',
+    '',
+    '00011 2/1/13 1:23:50 Fix Dec 91:00:00 Az 2:45:00 Pod 1 State ""'
+]
+
+
+class MakaDocumentFileFormatTests(TestCase):
+
+
+    def setUp(self):
+        self._dirPath = tempfile.mkdtemp()
+        self._fileFormat = MakaDocumentFileFormat()
+
+
+    def tearDown(self):
+        shutil.rmtree(self._dirPath)
+
+
+    def _writeFile(self, lines, newline='\n'):
+        filePath = os.path.join(self._dirPath, 'Test.txt')
+        with open(filePath, 'w', newline='') as file:
+            file.write((_HEADER + ''.join(line + '\n' for line in lines)).replace('\n', newline))
+        return filePath
+
+
+    def testReadDocument(self):
+
+        filePath = self._writeFile(_LINES)
+
+        document = self._fileFormat.readDocument(filePath)
+
+        expected = MmrpDocumentFormat101().parseDocument(_LINES)
+        self.assertEqual(document.observations, expected)
+        self.assertEqual(document.filePath, filePath)
+
+
+    def testReadObservations(self):
+
+        for newline in ['\n', '\r', '\r\n']:
+
+            filePath = self._writeFile(_LINES, newline)
+
+            pairs = list(self._fileFormat.readObservations(filePath))
+
+            self.assertEqual([lineNum for lineNum, _ in pairs], [4, 5, 7])
+            expected = MmrpDocumentFormat101().parseDocument(_LINES)
+            self.assertEqual([obs for _, obs in pairs], expected)
+
+
+    def testReadObservationsError(self):
+
+        filePath = self._writeFile(_LINES[:2] + ['Bobo'])
+
+        observations = self._fileFormat.readObservations(filePath)
+
+        self.assertEqual(next(observations)[0], 4)
+        self.assertEqual(next(observations)[0], 5)
+
+        with self.assertRaises(ValueError) as cm:
+            next(observations)
+
+        self.assertEqual(cm.exception.lineNum, 6)
+        self.assertEqual(cm.exception.filePath, filePath)
+
+
+    def testReadDocumentError(self):
+
+        filePath = self._writeFile(_LINES[:2] + ['Bobo'])
+
+        with self.assertRaises(ValueError) as cm:
+            self._fileFormat.readDocument(filePath)
+
+        self.assertEqual(cm.exception.lineNum, 6)
+        self.assertEqual(cm.exception.filePath, filePath)
+
+
+    def testParallelParse(self):
+
+        docFormat = MmrpDocumentFormat101()
+        lines = _LINES * 6250
+
+        expected = docFormat.parseDocument(lines, 3, numJobs=1)
+        observations = docFormat.parseDocument(lines, 3, numJobs=2)
+
+        self.assertEqual(len(observations), 3 * 6250)
+        self.assertEqual(observations, expected)
+
+
+    def testParallelParseError(self):
+
+        docFormat = MmrpDocumentFormat101()
+
+        # Bad lines in two different chunks. The error should be that of the
+        # first one, as for a serial parse.
+        lines = _LINES * 6250
+        lines[12345] = 'Bobo'
+        lines[23456] = 'Bobo'
+
+        for numJobs in [1, 2]:
+
+            with self.assertRaises(ValueError) as cm:
+                docFormat.parseDocument(lines, 3, numJobs=numJobs)
+
+            self.assertEqual(cm.exception.lineNum, 12349)
+
+
+    def testValidateDocument(self):
+
+        lines = list(_LINES)
+        lines[1] = lines[1].replace('Dec 91:00:00', 'Dec 91:xx:00')
+        lines[2] = 'Bobo'
+        filePath = self._writeFile(lines)
+
+        document, diagnostics = self._fileFormat.validateDocument(filePath)
+
+        expected = MmrpDocumentFormat101().parseDocument([_LINES[0], _LINES[3]])
+        self.assertEqual(document.observations, expected)
+        self.assertEqual([d[:2] for d in diagnostics], [(5, 30), (6, None)])
+        self.assertTrue(diagnostics[0].message.startswith('For observation field "declination"'))
+        self.assertEqual(
+            diagnostics[1],
+            Diagnostic(6, None, 'Observation type could not be determined.'))
+
+
+    def testParallelValidate(self):
+
+        docFormat = MmrpDocumentFormat101()
+
+        lines = _LINES * 6250
+        lines[12345] = 'Bobo'
+        lines[23456] = 'Bobo'
+
+        expected = docFormat.validateDocument(lines, 3, numJobs=1)
+        observations, diagnostics = docFormat.validateDocument(lines, 3, numJobs=2)
+
+        self.assertEqual(observations, expected[0])
+        self.assertEqual(diagnostics, expected[1])
+        self.assertEqual([d.lineNum for d in diagnostics], [12349, 23460])
+
+
+    def testExtensionResolvedOnce(self):
+
+        docFormat = MmrpDocumentFormat101()
+        getExtension = ExtensionManager.getExtension
+        names = []
+
+        def getExtensionAndRecord(typeName, extensionName):
+            names.append(extensionName)
+            return getExtension(typeName, extensionName)
+
+        ExtensionManager.getExtension = getExtensionAndRecord
+
+        try:
+            for _ in range(3):
+                docFormat.parseDocument(list(_LINES))
+        finally:
+            ExtensionManager.getExtension = getExtension
+
+        self.assertEqual(names, [docFormat.extensionName])
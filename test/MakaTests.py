@@ -1,8 +1,59 @@
 
 
+import atexit
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 
+from maka.util.Preferences import preferences as prefs
+
+
+# Keep cache files written by the tests out of the user's cache directory.
+_cacheDirPath = tempfile.mkdtemp()
+prefs['cache.dirPath'] = _cacheDirPath
+atexit.register(shutil.rmtree, _cacheDirPath, True)
+
+
+DOCUMENT_HEADER = '''aardvark data
+grammar "'96 MMRP Grammar 1.01"
+
+'''
+'''the header of the Maka document files that tests write.'''
+
+
+SAMPLE_LINES = [
+    '00010 2/1/13 1:23:45 Fix Dec 91:00:00 Az 2:30:00 Pod 1 State ""',
+    '00011 2/1/13 1:23:50 Fix Dec 91:00:00 Az 2:45:00 Pod 1 State ""',
+    '00012 2/1/13 1:23:55 Comment 1 "Bobo"'
+]
+'''the lines of a small sample document.'''
+
+
+SURVEY_SETUP_LINES = [
+    'Station 1 "Old Ruins" Lat 20 4.925283850520 Lon -155 51.794984516976 El 65.6 MagDec 10:16:00',
+    'Theodolite 1 "Sokkia DT500 S/N 13303" AzOffset 0:00:00 DecOffset 0:00:00',
+    'Reference 1 "White Marker" Azimuth 315:20:30',
+    'Observer asf "Adam Frankel"'
+]
+'''the untimed observation lines that set up a sample survey.'''
+
+
+SURVEY_LINES = [
+    '00000 1/01/12 00:00:00 Comment 0 "White marker is 315:20:30"',
+    '00001 1/01/12 7:02:13 StartScan 1 Visibility 2 Beaufort 3 Swell 1.5 Vessels 0 Pods 2',
+    '00002 1/01/12 7:02:40 TheoData Dec 91:12:30 Az 231:45:10',
+    '00003 1/01/12 7:02:41 Fix Dec 91:12:30 Az 231:45:10 Pod 1 State trav',
+    '00004 1/01/12 7:03:05 Behavior b Blow Pod 1 ""',
+    '00005 1/01/12 7:03:30 Comment 1 "Pod \\"A\\" is traveling \\\\ north"'
+]
+'''the timed observation lines of a sample survey, one of each of several types.'''
+
+
+def formatDocument(lines):
+    return DOCUMENT_HEADER + ''.join(line + '\n' for line in lines)
+
 
 class TestCase(unittest.TestCase):
     
@@ -13,3 +64,24 @@ class TestCase(unittest.TestCase):
             callable(*args, **kwds)
             
         print(str(cm.exception), file=sys.stderr)
+        
+        
+    def _createTempDir(self):
+        
+        '''Creates a temporary directory that is deleted after the test.'''
+        
+        dirPath = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dirPath)
+        return dirPath
+    
+    
+    def _writeDocumentFile(self, dirPath, name, lines):
+        
+        '''Writes a Maka document file with the specified observation lines.'''
+        
+        filePath = os.path.join(dirPath, name)
+        
+        with open(filePath, 'w', encoding='utf-8') as file:
+            file.write(formatDocument(lines))
+            
+        return filePath
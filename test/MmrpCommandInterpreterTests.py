@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+
+from maka.command.CommandInterpreterError import CommandInterpreterError
+from maka.data.Document import Document
+from maka.device.Theodolite import Theodolite
+from maka.device.TheodoliteError import TheodoliteError
+from maka.mmrp.MmrpCommandInterpreter101 import MmrpCommandInterpreter101
+from maka.mmrp.MmrpDocument101 import Comment, Fix, TheoData
+from maka.format.MakaDocumentFileFormat import MakaDocumentFileFormat
+from maka.mmrp.MmrpDocumentFormat101 import MmrpDocumentFormat101
+
+from MakaTests import SURVEY_LINES, TestCase
+
+
+_TIMEOUT = 5
+
+
+class _Theodolite(Theodolite):
+    
+    '''Theodolite whose reads complete only when a test allows them to.'''
+    
+    
+    def __init__(self, angles):
+        super(_Theodolite, self).__init__()
+        self.angles = angles
+        self.readAllowed = threading.Event()
+    
+    
+    def readAngles(self):
+        
+        self.readAllowed.wait(_TIMEOUT)
+        
+        if isinstance(self.angles, Exception):
+            raise self.angles
+        else:
+            return self.angles
+
+
+class MmrpCommandInterpreterTests(TestCase):
+    
+    
+    def setUp(self):
+        document = Document(documentFormat=MmrpDocumentFormat101())
+        self._interpreter = MmrpCommandInterpreter101(document)
+        self._theodolite = _Theodolite((math.pi / 2, math.pi / 4))
+        self._interpreter._theodolite = self._theodolite
+    
+    
+    def testInterpretCommandAsync(self):
+        
+        interpreter = self._interpreter
+        
+        theoData = interpreter.interpretCommandAsync('z')
+        fix = interpreter.interpretCommandAsync('p 1 trav')
+        comment = interpreter.interpretCommandAsync('c Bobo')
+        
+        # The commands that need theodolite angles wait for them, but others do not.
+        self.assertFalse(theoData.done())
+        self.assertFalse(fix.done())
+        self.assertIsInstance(comment.result(), Comment)
+        
+        self._theodolite.readAllowed.set()
+        
+        obs = theoData.result(_TIMEOUT)
+        self.assertIsInstance(obs, TheoData)
+        self.assertEqual((obs.declination, obs.azimuth), (90, 45))
+        
+        obs = fix.result(_TIMEOUT)
+        self.assertIsInstance(obs, Fix)
+        self.assertEqual((obs.declination, obs.azimuth), (90, 45))
+        self.assertEqual((obs.objectId, obs.behavioralState), (1, 'trav'))
+    
+    
+    def testInterpretCommand(self):
+        
+        self._theodolite.readAllowed.set()
+        
+        obs = self._interpreter.interpretCommand('z')
+        
+        self.assertIsInstance(obs, TheoData)
+        self.assertEqual((obs.declination, obs.azimuth), (90, 45))
+    
+    
+    def testPolledAngles(self):
+        
+        theodolite = self._theodolite
+        theodolite.readAllowed.set()
+        theodolite.startPolling(interval=.01, maxReadingAge=_TIMEOUT)
+        
+        try:
+            
+            endTime = time.monotonic() + _TIMEOUT
+            while theodolite.getPolledAngles() is None and time.monotonic() < endTime:
+                time.sleep(.01)
+                
+            # With a fresh polled reading, a theodolite command completes at once.
+            theodolite.readAllowed.clear()
+            future = self._interpreter.interpretCommandAsync('z')
+            self.assertTrue(future.done())
+            
+            obs = future.result()
+            self.assertEqual((obs.declination, obs.azimuth), (90, 45))
+            
+        finally:
+            theodolite.readAllowed.set()
+            theodolite.stopPolling()
+        
+        
+    def testTheodoliteError(self):
+        
+        self._theodolite.angles = TheodoliteError('Bobo.')
+        self._theodolite.readAllowed.set()
+        
+        future = self._interpreter.interpretCommandAsync('z')
+        
+        with self.assertRaises(CommandInterpreterError) as cm:
+            future.result(_TIMEOUT)
+        
+        self.assertEqual(str(cm.exception), 'Theodolite read failed. Bobo.')
+        
+        # A fix needs the angles of the failed read, so it fails too.
+        self._assertRaises(CommandInterpreterError, self._interpreter.interpretCommand, 'p 1 trav')
+    
+    
+    def testCommandError(self):
+        
+        # Errors in command text are raised immediately.
+        self._assertRaises(
+            CommandInterpreterError, self._interpreter.interpretCommandAsync, 'bobo')
+    
+    
+    def testLazyDocumentNumbers(self):
+        
+        filePath = self._writeDocumentFile(
+            self._createTempDir(), 'Test.txt', ['bobo'] + SURVEY_LINES + ['bobo'])
+        document = MakaDocumentFileFormat().readLazyDocument(filePath)
+        
+        interpreter = MmrpCommandInterpreter101(document)
+        
+        self.assertEqual(interpreter._getNextObsNum(), 6)
+        self.assertEqual(interpreter._getNextCommentId(), 2)
+        
+        # The interpreter parsed only the last observations of the document, and
+        # skipped the one that could not be parsed.
+        self.assertEqual(len(document.observations._cache), 1)
+
@@ -0,0 +1,103 @@
+import unittest
+
+from maka.data.Document import Document
+from maka.data.Field import Integer
+from maka.data.Observation import Observation
+
+from MakaTests import TestCase
+
+try:
+    from PySide2.QtCore import Qt
+    from maka.ui.ObservationListModel import ObservationListModel
+except ImportError:
+    ObservationListModel = None
+
+
+class Obs(Observation):
+    x = Integer
+
+
+def _createObservations(ints):
+    return [Obs(x=i) for i in ints]
+
+
+@unittest.skipIf(ObservationListModel is None, 'PySide2 is not available')
+class ObservationListModelTests(TestCase):
+
+
+    def setUp(self):
+
+        self.documentFormat = _CountingDocumentFormat()
+        self.document = Document(
+            _createObservations([0, 1, 2, 3]), documentFormat=self.documentFormat)
+
+        self.model = ObservationListModel()
+        self.model.setDocument(self.document)
+
+        self.changedRows = []
+        self.model.dataChanged.connect(
+            lambda topLeft, bottomRight, roles=None:
+                self.changedRows.append((topLeft.row(), bottomRight.row())))
+
+
+    def _getRows(self):
+        model = self.model
+        return [model.data(model.index(i), Qt.DisplayRole) for i in range(model.rowCount())]
+
+
+    def testUpdateRows(self):
+
+        self.assertEqual(self._getRows(), ['0', '1', '2', '3'])
+
+        # This is what the main window does for an edit that replaces
+        # observations one for one.
+        self.document.edit('Edit', 1, 3, _createObservations([10, 11]))
+        self.model.updateRows(1, 3)
+
+        self.assertEqual(self.changedRows, [(1, 2)])
+        self.assertEqual(self._getRows(), ['0', '10', '11', '3'])
+        self.assertEqual(self.documentFormat.count, 6)
+
+        self.document.undo()
+        self.model.updateRows(1, 3)
+
+        self.assertEqual(self.changedRows, [(1, 2), (1, 2)])
+        self.assertEqual(self._getRows(), ['0', '1', '2', '3'])
+
+
+    def testReplaceRows(self):
+
+        self.document.edit('Edit', 1, 3, _createObservations([10]))
+        self.model.replaceRows(1, 3, 1)
+
+        self.assertEqual(self._getRows(), ['0', '10', '3'])
+
+
+    def testFormatError(self):
+
+        messages = []
+        self.model.formatError.connect(messages.append)
+
+        self.documentFormat.badValue = 2
+        rows = self._getRows() + self._getRows()
+
+        self.assertEqual(rows[:2], ['0', '1'])
+        self.assertTrue(rows[2].startswith('<Could not format observation 2: '))
+        self.assertEqual(len(messages), 1)
+
+
+class _CountingDocumentFormat(object):
+
+
+    def __init__(self):
+        self.count = 0
+        self.badValue = None
+
+
+    def formatObservation(self, obs):
+
+        if obs.x == self.badValue:
+            raise ValueError('Bad value.')
+
+        self.count += 1
+        return str(obs.x)
@@ -189,4 +189,99 @@ class ObservationTests(TestCase):
         self.assertEqual(a.y, 1)
         
         
+    def testCopyWithBadModification(self):
+        
+        class P(Observation):
+            x = String
+            y = Integer(min=0)
+            
+        a = P(x='bobo', y=1)
+        
+        self._assertRaises(ValueError, a.copy, y=-1)
+        self._assertRaises(TypeError, a.copy, x=1)
+        
+        
+    def testFieldValues(self):
+        
+        class P(Observation):
+            y = Integer
+            x = String
+            
+        class Q(P):
+            w = Float
+            
+        self.assertEqual(P(x='bobo', y=1).fieldValues, ('bobo', 1))
+        self.assertEqual(Q(x='bobo', y=1, w=2).fieldValues, (2., 'bobo', 1))
+        
+        
+    def testNoInstanceDictionary(self):
+        
+        class P(Observation):
+            x = String
+            
+        class Q(Observation):
+            y = Integer
+            
+        class R(P, Q):
+            z = Integer
+            
+        for obs in [P(x='bobo'), R(x='bobo', y=1, z=2)]:
+            self.assertFalse(hasattr(obs, '__dict__'))
+            self.assertRaises(AttributeError, setattr, obs, 'bobo', 1)
+            
+            
+    def testFreeze(self):
+        
+        class P(Observation):
+            x = String
+            y = Integer
+            
+        a = P(x='bobo', y=1)
+        self.assertFalse(a.frozen)
+        
+        b = a.copy()
+        self.assertIs(a.freeze(), a)
+        self.assertTrue(a.frozen)
+        self.assertEqual(a, b)
+        self.assertEqual(b, a)
+        
+        self._assertRaises(AttributeError, setattr, a, 'x', 'fred')
+        self._assertRaises(AttributeError, setattr, a, 'y', 2)
+        self.assertEqual(a.fieldValues, ('bobo', 1))
+        
+        c = a.copy(y=2)
+        self.assertFalse(c.frozen)
+        c.y = 3
+        self.assertEqual(c.y, 3)
+        self.assertEqual(a.y, 1)
+        
+        
+    def testFieldChangeListeners(self):
+        
+        class P(Observation):
+            x = String
+            y = Integer
+            
+        changes = []
+        listener = lambda *args: changes.append(args)
+        
+        obs = P(x='bobo', y=1)
+        obs.addFieldChangeListener(listener)
+        
+        obs.x = 'fred'
+        obs.y = 1
+        obs.y = 2
+        self.assertEqual(changes, [(obs, 'x', 'bobo', 'fred'), (obs, 'y', 1, 2)])
+        
+        # A copy does not share the listeners of the original.
+        obs.copy().x = 'bobo'
+        self.assertEqual(len(changes), 2)
+        
+        obs.removeFieldChangeListener(listener)
+        obs.x = 'bobo'
+        self.assertEqual(len(changes), 2)
+        
+        self._assertRaises(ValueError, obs.removeFieldChangeListener, listener)
+        
+        
     # TODO: Elicit all error messages.
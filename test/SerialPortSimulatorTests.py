@@ -0,0 +1,85 @@
+import os
+import time
+import unittest
+
+from maka.device.SokkiaTheodolite import SokkiaDt4Theodolite, SokkiaDt500Theodolite
+from maka.device.SokkiaTheodolite import _TILT_ERROR_MESSAGE
+from maka.device.TheodoliteError import TheodoliteError
+from MakaTests import TestCase
+import maka.util.AngleUtils as AngleUtils
+
+if hasattr(os, 'openpty'):
+    from maka.device.SerialPortSimulator import SerialPortSimulator
+
+
+_DT4_REPLY = b'0001234 0900000 0453000\r\n'
+_DT500_REPLY = b'0900000 0453000\r\n'
+_ERROR_REPLY = b'E114\r\n'
+
+
+@unittest.skipUnless(hasattr(os, 'openpty'), 'pseudoterminals are not available')
+class SerialPortSimulatorTests(TestCase):
+    
+    
+    def _readAngles(self, theodolite, numReads):
+        for _ in range(numReads):
+            v, h = theodolite.readAngles()
+            self.assertAlmostEqual(AngleUtils.radiansToDegrees(v), 90)
+            self.assertAlmostEqual(AngleUtils.radiansToDegrees(h), 45.5)
+            
+            
+    def testDt4(self):
+        with SerialPortSimulator([(b'\x00', _DT4_REPLY)] * 3) as simulator:
+            self._readAngles(SokkiaDt4Theodolite(simulator.portName), 3)
+        self.assertEqual(simulator.unexpectedData, [])
+        
+        
+    def testDt500(self):
+        with SerialPortSimulator([(b'\x00', _DT500_REPLY)], repeat=True) as simulator:
+            self._readAngles(SokkiaDt500Theodolite(simulator.portName), 3)
+        self.assertEqual(simulator.unexpectedData, [])
+            
+            
+    def testBaudRate(self):
+        
+        # Back-to-back reads also exercise discarding the line terminator of
+        # one reply when it arrives after the next read has started.
+        with SerialPortSimulator([(b'\x00', _DT500_REPLY)] * 2, baudRate=1200) as simulator:
+            theodolite = SokkiaDt500Theodolite(simulator.portName)
+            startTime = time.perf_counter()
+            self._readAngles(theodolite, 2)
+            elapsedTime = time.perf_counter() - startTime
+            
+        # At 1200 baud and ten bits per byte each command byte and the fifteen
+        # frame bytes of each reply take 1/120 second.
+        self.assertGreaterEqual(elapsedTime, 2 * 16 / 120.)
+        
+        
+    def testErrors(self):
+        
+        recording = [(b'\x00', _ERROR_REPLY), (b'\x00', None), (b'\x00', _DT500_REPLY)]
+        
+        with SerialPortSimulator(recording) as simulator:
+            
+            theodolite = SokkiaDt500Theodolite(simulator.portName, readTimeout=.2)
+            
+            with self.assertRaises(TheodoliteError) as cm:
+                theodolite.readAngles()
+            self.assertEqual(
+                str(cm.exception), 'Theodolite read returned error 114. ' + _TILT_ERROR_MESSAGE)
+            
+            with self.assertRaises(TheodoliteError) as cm:
+                theodolite.readAngles()
+            self.assertEqual(
+                str(cm.exception), 'Theodolite read timed out. No data were received.')
+            
+            self._readAngles(theodolite, 1)
+            
+            
+    def testUnexpectedData(self):
+        with SerialPortSimulator([(b'\x00', None)]) as simulator:
+            theodolite = SokkiaDt500Theodolite(simulator.portName, readTimeout=.1)
+            for _ in range(2):
+                with self.assertRaises(TheodoliteError):
+                    theodolite.readAngles()
+        self.assertEqual(simulator.unexpectedData, [b'\x00'])
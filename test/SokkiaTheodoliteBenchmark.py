@@ -0,0 +1,58 @@
+'''
+Benchmark of reading angles from Sokkia theodolites.
+
+Run this script with the Maka `src` directory on the Python path on a system
+with pseudoterminals. It replays recorded DT4 and DT500 replies with a serial
+port simulator and reports the latency of each read, both at the theodolites'
+1200 baud, where serial line time dominates, and without serial line timing,
+where the overhead of opening the port and parsing replies dominates. It also
+reports the read throughput without serial line timing.
+'''
+
+
+import time
+
+from maka.device.SerialPortSimulator import SerialPortSimulator
+from maka.device.SokkiaTheodolite import SokkiaDt4Theodolite, SokkiaDt500Theodolite
+
+
+_THEODOLITES = [
+    ('DT4', SokkiaDt4Theodolite, b'0001234 0900000 0453000\r\n'),
+    ('DT500', SokkiaDt500Theodolite, b'0900000 0453000\r\n')
+]
+
+_BAUD_RATE = 1200
+_NUM_TIMED_READS = 20
+_NUM_UNTIMED_READS = 500
+
+
+def _main():
+    
+    for name, theodoliteClass, reply in _THEODOLITES:
+        for baudRate, numReads in [(_BAUD_RATE, _NUM_TIMED_READS), (None, _NUM_UNTIMED_READS)]:
+            _benchmark(name, theodoliteClass, reply, baudRate, numReads)
+
+
+def _benchmark(name, theodoliteClass, reply, baudRate, numReads):
+    
+    with SerialPortSimulator([(b'\x00', reply)], baudRate, repeat=True) as simulator:
+        
+        theodolite = theodoliteClass(simulator.portName)
+        
+        times = []
+        
+        for _ in range(numReads):
+            startTime = time.perf_counter()
+            theodolite.readAngles()
+            times.append(time.perf_counter() - startTime)
+            
+    times.sort()
+    
+    print(('{:s} at {:s}: median {:.2f} ms, maximum {:.2f} ms, '
+           '{:.0f} reads per second').format(
+        name, 'no baud rate' if baudRate is None else '{:d} baud'.format(baudRate),
+        1000 * times[len(times) // 2], 1000 * times[-1], len(times) / sum(times)))
+
+
+if __name__ == '__main__':
+    _main()
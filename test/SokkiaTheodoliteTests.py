@@ -1,6 +1,8 @@
 from maka.device.SokkiaTheodolite import SokkiaTheodolite as Theodolite
+from maka.device.SokkiaTheodolite import _TILT_ERROR_MESSAGE
 from maka.device.TheodoliteError import TheodoliteError
 from MakaTests import TestCase
+import maka.util.AngleUtils as AngleUtils
 
 
 _initParams = {
@@ -60,3 +62,67 @@ class SokkiaTheodoliteTests(TestCase):
     def testWriteTimeoutErrors(self):
         for timeout in ['bobo', -1]:
             self._testBadInit(writeTimeout=timeout)
+            
+    def testReadAngles(self):
+        t, port = _createTheodolite(b'0900000 0453000\r\n')
+        v, h = t.readAngles()
+        self.assertAlmostEqual(AngleUtils.radiansToDegrees(v), 45.5)
+        self.assertAlmostEqual(AngleUtils.radiansToDegrees(h), 90)
+        self.assertEqual(port.written, [b'\x00'])
+        self.assertEqual(port.numOpens, 1)
+        self.assertFalse(port.isOpen)
+        
+    def testDistanceDataFormat(self):
+        t, _ = _createTheodolite(b'0001234 0900000 0453000', dataFormat='dvh')
+        v, h = t.readAngles()
+        self.assertAlmostEqual(AngleUtils.radiansToDegrees(v), 90)
+        self.assertAlmostEqual(AngleUtils.radiansToDegrees(h), 45.5)
+        
+    def testReadErrors(self):
+        cases = [
+            (b'', 'Theodolite read timed out. No data were received.'),
+            (b'0900000 04', 'Theodolite read timed out. Data received were "0900000 04".'),
+            (b'E114', 'Theodolite read returned error 114. ' + _TILT_ERROR_MESSAGE),
+            (b'0900000 E999', 'Theodolite read returned error 999. '
+                              'No further explanation is available.'),
+            (b'09x0000 0453000', 'Bad horizontal angle "09x0000" in string '
+                                 '"09x0000 0453000" received from theodolite.')
+        ]
+        for reply, message in cases:
+            t, _ = _createTheodolite(reply)
+            with self.assertRaises(TheodoliteError) as cm:
+                t.readAngles()
+            self.assertEqual(str(cm.exception), message)
+            
+            
+class _SerialPort(object):
+    
+    '''Serial port that replies to every write with the same data.'''
+    
+    def __init__(self, reply):
+        self.reply = reply
+        self.isOpen = False
+        self.numOpens = 0
+        self.written = []
+        
+    def open(self):
+        self.isOpen = True
+        self.numOpens += 1
+        
+    def close(self):
+        self.isOpen = False
+        
+    def write(self, data):
+        self.written.append(data)
+        
+    def readInto(self, buffer):
+        n = min(len(buffer), len(self.reply))
+        buffer[:n] = self.reply[:n]
+        return n
+    
+    
+def _createTheodolite(reply, **kwds):
+    t = Theodolite(**_params(**kwds))
+    port = _SerialPort(reply)
+    t._serialPort = port
+    return (t, port)
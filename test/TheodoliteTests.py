@@ -0,0 +1,96 @@
+import threading
+import time
+
+from maka.device.Theodolite import Theodolite
+from maka.device.TheodoliteError import TheodoliteError
+
+from MakaTests import TestCase
+
+
+_TIMEOUT = 5
+
+
+class _Theodolite(Theodolite):
+    
+    '''Theodolite that counts its reads.'''
+    
+    
+    def __init__(self):
+        super(_Theodolite, self).__init__()
+        self.numReads = 0
+        self.failing = False
+        self.readDone = threading.Event()
+        
+        
+    def readAngles(self):
+        
+        self.numReads += 1
+        self.readDone.set()
+        
+        if self.failing:
+            raise TheodoliteError('Bobo.')
+        else:
+            return (1., 2.)
+        
+        
+class TheodoliteTests(TestCase):
+    
+    
+    def setUp(self):
+        self._theodolite = _Theodolite()
+        
+        
+    def tearDown(self):
+        self._theodolite.stopPolling()
+        
+        
+    def testReadAnglesAsync(self):
+        future = self._theodolite.readAnglesAsync()
+        self.assertEqual(future.result(_TIMEOUT), (1., 2.))
+        
+        
+    def testPolling(self):
+        
+        t = self._theodolite
+        
+        self.assertFalse(t.polling)
+        self.assertIsNone(t.getPolledAngles())
+        
+        t.startPolling(interval=.01, maxReadingAge=_TIMEOUT)
+        self.assertTrue(t.polling)
+        
+        self.assertTrue(t.readDone.wait(_TIMEOUT))
+        self._waitForReads(3)
+        self.assertEqual(t.getPolledAngles(), (1., 2.))
+        
+        t.stopPolling()
+        self.assertFalse(t.polling)
+        self.assertIsNone(t.getPolledAngles())
+        
+        
+    def _waitForReads(self, numReads):
+        
+        endTime = time.monotonic() + _TIMEOUT
+        
+        while self._theodolite.numReads < numReads and time.monotonic() < endTime:
+            time.sleep(.01)
+            
+        self.assertGreaterEqual(self._theodolite.numReads, numReads)
+        
+        
+    def testReadingAge(self):
+        
+        t = self._theodolite
+        
+        # A reading is not returned once it is older than the maximum reading age,
+        # for example because later reads fail.
+        t.startPolling(interval=.01, maxReadingAge=.05)
+        self._waitForReads(1)
+        t.failing = True
+        time.sleep(.1)
+        self.assertIsNone(t.getPolledAngles())
+        
+        
+    def testPollingErrors(self):
+        for kwds in [{'interval': 0}, {'interval': 'bobo'}, {'maxReadingAge': -1}]:
+            self._assertRaises(ValueError, self._theodolite.startPolling, **kwds)
@@ -0,0 +1,143 @@
+'''
+Benchmark comparing `TokenUtils.tokenizeString` with the slicing tokenizer it replaced.
+
+Run this script with the Maka `src` directory on the Python path. It checks that the
+two tokenizers produce identical tokens and error messages for a set of MMRP lines,
+and then reports the time each takes to tokenize them.
+'''
+
+
+import re
+import timeit
+
+import maka.util.TokenUtils as TokenUtils
+
+
+_LINES = [
+    'Station 1 "Old Ruins" Lat 20 4.925283850520 Lon -155 51.794984516976 El 65.6 MagDec 10:16:00',
+    'Theodolite 1 "Sokkia DT500 S/N 13303" AzOffset 0:00:00 DecOffset 0:00:00',
+    'Reference 1 "White Marker" Azimuth 315:20:30',
+    'Observer asf "Adam Frankel"',
+    '00000 1/01/12 00:00:00 Comment 0 "White marker is 315:20:30"',
+    '00001 1/01/12 7:02:13 StartScan 1 Visibility 2 Beaufort 3 Swell 1.5 Vessels 0 Pods 2',
+    '00002 1/01/12 7:02:40 TheoData Dec 91:12:30 Az 231:45:10',
+    '00003 1/01/12 7:02:41 Fix Dec 91:12:30 Az 231:45:10 Pod 1 State trav',
+    '00004 1/01/12 7:03:05 Behavior b Blow Pod 1 ""',
+    '00005 1/01/12 7:03:30 Comment 1 "Pod \\"A\\" is traveling \\\\ north"'
+]
+
+_BAD_LINES = [
+    '00006 1/01/12 7:04:00 Comment 2 "Unterminated',
+    '00007 1/01/12 7:04:00 Comment 3 "Unseparated""tokens"',
+    '00008 1/01/12 7:04:00 Comment 4 "Bad \\n escape"'
+]
+
+_NUM_REPETITIONS = 5
+_NUM_ITERATIONS = 2000
+
+
+# The following is the tokenizer that `TokenUtils.tokenizeString` replaced, which slices
+# matched text off the front of the string after each token.
+
+_SPACE = r'\s*'
+_QUOTED = r'"(?:[^"\\]*\\\\|[^"\\]*\\")*[^"\\]*"'
+_QUOTED_RE = re.compile(r'({:s}){:s}'.format(_QUOTED, _SPACE))
+_UNTERMINATED_QUOTED_RE = re.compile(_QUOTED[:-1] + '$')
+_UNQUOTED = r'[^"\s]\S*'
+_UNQUOTED_RE = re.compile(r'({:s}){:s}'.format(_UNQUOTED, _SPACE))
+
+
+def _tokenizeStringBySlicing(s):
+
+    inputLength = len(s)
+
+    s = s.lstrip()
+
+    tokens = []
+
+    while len(s) != 0:
+
+        if s[0] == '"':
+            regExp = _QUOTED_RE
+            quoted = True
+        else:
+            regExp = _UNQUOTED_RE
+            quoted = False
+
+        m = regExp.match(s)
+
+        if m is not None:
+
+            matchedText = m.group(0)
+            token = m.group(1)
+
+            n = len(matchedText)
+
+            if n != len(s) and n == len(token):
+                prefix = 'Quoted token' if quoted else 'Token'
+                startIndex = inputLength - len(s) + 1
+                endIndex = startIndex + len(token) - 1
+                raise ValueError(
+                    '{:s} from characters {:d} through {:d} is not followed by space.'.format(
+                        prefix, startIndex, endIndex))
+
+            tokens.append(token)
+            s = s[len(matchedText):]
+
+        else:
+
+            if quoted and _UNTERMINATED_QUOTED_RE.match(s):
+                prefix = 'Unterminated quoted'
+            else:
+                prefix = 'Could not parse' + (' quoted' if quoted else '')
+
+            startIndex = inputLength - len(s) + 1
+
+            raise ValueError('{:s} token starting at character {:d}.'.format(prefix, startIndex))
+
+    return tokens
+
+
+def _main():
+    _checkEquivalence()
+    _benchmark('slicing tokenizer', _tokenizeStringBySlicing)
+    _benchmark('single-pass tokenizer', TokenUtils.tokenizeString)
+
+
+def _checkEquivalence():
+
+    for line in _LINES + _BAD_LINES:
+
+        results = [_tokenize(tokenize, line)
+                   for tokenize in (_tokenizeStringBySlicing, TokenUtils.tokenizeString)]
+
+        if results[0] != results[1]:
+            raise AssertionError(
+                'Tokenizers disagree for line "{:s}": {:s} != {:s}'.format(
+                    line, repr(results[0]), repr(results[1])))
+
+    print('Tokenizers agree for all {:d} lines.'.format(len(_LINES) + len(_BAD_LINES)))
+
+
+def _tokenize(tokenize, line):
+    try:
+        return tokenize(line)
+    except ValueError as e:
+        return str(e)
+
+
+def _benchmark(name, tokenize):
+
+    def run():
+        for line in _LINES:
+            tokenize(line)
+
+    times = timeit.repeat(run, repeat=_NUM_REPETITIONS, number=_NUM_ITERATIONS)
+
+    numLines = len(_LINES) * _NUM_ITERATIONS
+
+    print('{:s}: {:.2f} microseconds per line'.format(name, 1e6 * min(times) / numLines))
+
+
+if __name__ == '__main__':
+    _main()
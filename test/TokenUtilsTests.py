@@ -38,3 +38,46 @@ class TokenUtilsTests(TestCase):
         
         for case in cases:
             self._assertRaises(ValueError, TokenUtils.tokenizeString, case)
+            
+            
+    def testTokenizationErrorMessages(self):
+        
+        cases = [
+            ('one "two ', 'Unterminated quoted token starting at character 5.'),
+            ('"\\"', 'Unterminated quoted token starting at character 1.'),
+            ('one "two \\ three"', 'Could not parse quoted token starting at character 5.'),
+            ('"\\t"', 'Could not parse quoted token starting at character 1.'),
+            (' "one""two" ', 'Quoted token from characters 2 through 6 is not followed by space.'),
+            ('a "b\\""c', 'Quoted token from characters 3 through 7 is not followed by space.')
+        ]
+        
+        for input, expected in cases:
+            with self.assertRaises(ValueError) as cm:
+                TokenUtils.tokenizeString(input)
+            self.assertEqual(str(cm.exception), expected)
+            
+            
+    def testTokenizationErrorColumns(self):
+        
+        cases = [
+            ('one "two ', 5),
+            ('one "two \\ three"', 5),
+            (' "one""two" ', 7)
+        ]
+        
+        for input, expected in cases:
+            with self.assertRaises(ValueError) as cm:
+                TokenUtils.tokenizeString(input)
+            self.assertEqual(cm.exception.column, expected)
+            
+            
+    def testGetTokenColumns(self):
+        
+        cases = [
+            ('', []),
+            ('   one two three   ', [4, 8, 12]),
+            ('"one two" \\ "three"', [1, 11, 13])
+        ]
+        
+        for input, expected in cases:
+            self.assertEqual(TokenUtils.getTokenColumns(input), expected)